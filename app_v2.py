@@ -1,24 +1,46 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
 import plotly.graph_objects as go
+from plotly.colors import qualitative
 from datetime import datetime
 import time
 import os
 import asyncio
-import concurrent.futures
 
 # Импорт из наших модулей
 from utils import (
     load_temperature_data,
+    save_temperature_data,
+    data_fingerprint,
     generate_realistic_temperature_data,
+    synthetic_seasonal_temperatures,
+    open_history_store,
     TemperatureAnalyzer,
+    ParallelAnalyzer,
+    analyze_cities,
     WeatherAPIHandler,
-    DataVisualizer
+    MemoryResponseCache,
+    downsample_timeseries,
+    DataVisualizer,
+    FigureCache,
+    MAD_TO_SIGMA,
+    metrics
+)
+from config import (
+    MONTH_TO_SEASON, SEASON_NAMES_RU, DATA_FILE_PATH, METRICS_PORT,
+    ANOMALY_SIGMA_THRESHOLD, CLIMATOLOGY_WINDOW_DAYS
+)
+
+# Подписи методов обнаружения аномалий строятся из тех же констант,
+# что использует анализатор (порог и полуширина окна нормы дня года)
+ANOMALY_METHOD_LABELS = {
+    'global': f"Среднее города ± {ANOMALY_SIGMA_THRESHOLD:g}σ",
+    'climatology': f"Норма дня года (медиана ± {ANOMALY_SIGMA_THRESHOLD:g}·σ̂, σ̂ = {MAD_TO_SIGMA:g}·MAD)"
+}
+CLIMATOLOGY_HELP = (
+    f"Медиана ± {ANOMALY_SIGMA_THRESHOLD:g}·σ̂ (σ̂ = {MAD_TO_SIGMA:g}·MAD) измерений "
+    f"всех лет в окне ±{CLIMATOLOGY_WINDOW_DAYS} дней"
 )
-from config import MONTH_TO_SEASON, SEASON_NAMES_RU
 
 # Настройка страницы
 st.set_page_config(
@@ -31,17 +53,49 @@ st.set_page_config(
 st.title("🌡️ Анализ температурных данных и мониторинг текущей температуры через OpenWeatherMap API")
 st.markdown("Задача решалась в рамках учебного проекта магистратуры 'Искусственный интеллект'")
 
+@st.cache_resource(max_entries=2)
+def get_analyzer(_df, data_key):
+    """Общий для всех сессий и перезапусков анализатор (без копирования данных)"""
+    return TemperatureAnalyzer(_df, copy=False)
+
+@st.cache_resource
+def get_figure_cache():
+    """Общий кэш готовых графиков (ключи включают отпечаток данных)"""
+    return FigureCache()
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """HTTP-эндпоинт /metrics для Prometheus (один на процесс, если задан порт)"""
+    return metrics.serve(port=METRICS_PORT) if METRICS_PORT else None
+
+@st.cache_resource
+def load_history():
+    """
+    История из memory-mapped хранилища: рабочие процессы приложения
+    читают одни и те же страницы файлов вместо собственных копий
+    """
+    try:
+        if not os.path.exists(DATA_FILE_PATH):
+            save_temperature_data(generate_realistic_temperature_data())
+        return open_history_store().to_frame()
+    except Exception as e:
+        print(f"Хранилище истории недоступно: {e}. Данные загружаются в память.")
+        return load_temperature_data(compact=True)
+
 # Инициализация данных и обработчиков
 if 'df' not in st.session_state:
-    st.session_state.df = load_temperature_data()
+    st.session_state.df = load_history()
 
 if 'api_handler' not in st.session_state:
-    st.session_state.api_handler = WeatherAPIHandler()
+    st.session_state.api_handler = WeatherAPIHandler(cache=MemoryResponseCache())
 
 df = st.session_state.df
 api_handler = st.session_state.api_handler
-analyzer = TemperatureAnalyzer(df)
+data_key = data_fingerprint(df)
+analyzer = get_analyzer(df, data_key)
 visualizer = DataVisualizer()
+figure_cache = get_figure_cache()
+start_metrics_endpoint()
 
 # Создание вкладок
 tab1, tab2, tab3, tab4 = st.tabs([
@@ -84,12 +138,22 @@ with tab1:
     # Обнаружение аномалий
     st.subheader("Обнаружение аномалий")
     
-    anomaly_result = analyzer.detect_anomalies(selected_city)
+    anomaly_method = st.radio(
+        "Метод:",
+        ['global', 'climatology'],
+        format_func=ANOMALY_METHOD_LABELS.get,
+        horizontal=True,
+        key="anomaly_method"
+    )
+    anomaly_result = analyzer.detect_anomalies(selected_city, method=anomaly_method)
     
     col1, col2, col3 = st.columns(3)
     with col1:
         bounds = anomaly_result['bounds']
-        st.metric("Нормальный диапазон", f"{bounds['lower']:.1f}...{bounds['upper']:.1f}°C")
+        if anomaly_method == 'climatology':
+            st.metric("Нормальный диапазон", "по дню года", help=CLIMATOLOGY_HELP)
+        else:
+            st.metric("Нормальный диапазон", f"{bounds['lower']:.1f}...{bounds['upper']:.1f}°C")
     with col2:
         st.metric("Всего аномалий", anomaly_result['stats']['n_anomalies'])
     with col3:
@@ -147,6 +211,12 @@ with tab2:
                         weather_data = result['data']
                         
                         st.success(f"Данные получены {result['method']} за {result['elapsed_time']:.2f} секунд")
+                        cache_stats = api_handler.cache_stats()
+                        if cache_stats:
+                            st.caption(
+                                f"Кэш ответов: попаданий {cache_stats['hits']}, "
+                                f"промахов {cache_stats['misses']}"
+                            )
                         
                         # Отображение данных
                         col1, col2 = st.columns(2)
@@ -191,10 +261,17 @@ with tab2:
                                     st.success("✅ Температура в норме")
                             
                             # График сравнения
-                            fig = visualizer.plot_current_temp_comparison(
-                                current_analysis, weather_city, current_season
+                            png = figure_cache.matplotlib_png(
+                                'current_temp_comparison',
+                                lambda: visualizer.plot_current_temp_comparison(
+                                    current_analysis, weather_city, current_season
+                                ),
+                                city=weather_city,
+                                params={'season': current_season,
+                                        'temperature': current_analysis['current_temp']},
+                                fingerprint=data_key
                             )
-                            st.pyplot(fig)
+                            st.image(png)
                         
                     else:
                         st.error(f"❌ Ошибка {result.get('error_code', '')}: {result['error_message']}")
@@ -227,70 +304,87 @@ with tab3:
     # 1. Линейный график температуры со скользящим средним
     st.subheader("📊 Линейный график температуры со скользящим средним")
     
-    # Вычисляем скользящее среднее
-    city_data_sorted = city_data.sort_values('timestamp')
+    # Скользящее среднее (кэшируется анализатором по городу и окну)
     window_size = st.slider("Размер окна для скользящего среднего (дни):", 7, 90, 30, key="ma_window_viz")
+    # Период графика: при сужении периода прореженный ряд снова показывает детали
+    date_min = city_data['timestamp'].min().date()
+    date_max = city_data['timestamp'].max().date()
+    period = st.slider("Период графика:", min_value=date_min, max_value=date_max,
+                       value=(date_min, date_max), key="ts_period")
+    
+    def build_timeseries_figure():
+        city_data_sorted = analyzer.calculate_moving_average(graph_city, window_size)
+        
+        city_data_sorted = city_data_sorted[
+            (city_data_sorted['timestamp'] >= pd.Timestamp(period[0])) &
+            (city_data_sorted['timestamp'] < pd.Timestamp(period[1]) + pd.Timedelta(days=1))
+        ]
+        # Экстремумы ищутся по всем точкам периода, линии строятся по прореженным
+        plot_data = downsample_timeseries(city_data_sorted)
+        
+        # Создаем график
+        fig = go.Figure()
+        
+        # Температура (тонкая линия)
+        fig.add_trace(go.Scatter(
+            x=plot_data['timestamp'],
+            y=plot_data['temperature'],
+            mode='lines',
+            name='Температура',
+            line=dict(color='lightblue', width=1),
+            opacity=0.5,
+            hovertemplate='%{x|%Y-%m-%d}<br>Температура: %{y:.1f}°C<extra></extra>'
+        ))
+        
+        # Скользящее среднее (толстая линия)
+        fig.add_trace(go.Scatter(
+            x=plot_data['timestamp'],
+            y=plot_data['moving_avg'],
+            mode='lines',
+            name=f'Скользящее среднее ({window_size} дней)',
+            line=dict(color='red', width=3),
+            hovertemplate='%{x|%Y-%m-%d}<br>Скользящее среднее: %{y:.1f}°C<extra></extra>'
+        ))
+        
+        # Находим экстремальные значения
+        max_temp_idx = city_data_sorted['temperature'].idxmax()
+        min_temp_idx = city_data_sorted['temperature'].idxmin()
+        
+        # Максимальная температура
+        fig.add_trace(go.Scatter(
+            x=[city_data_sorted.loc[max_temp_idx, 'timestamp']],
+            y=[city_data_sorted.loc[max_temp_idx, 'temperature']],
+            mode='markers',
+            name='Максимум',
+            marker=dict(color='darkred', size=12, symbol='triangle-up'),
+            hovertemplate='%{x|%Y-%m-%d}<br>Максимум: %{y:.1f}°C<extra></extra>'
+        ))
+        
+        # Минимальная температура
+        fig.add_trace(go.Scatter(
+            x=[city_data_sorted.loc[min_temp_idx, 'timestamp']],
+            y=[city_data_sorted.loc[min_temp_idx, 'temperature']],
+            mode='markers',
+            name='Минимум',
+            marker=dict(color='darkblue', size=12, symbol='triangle-down'),
+            hovertemplate='%{x|%Y-%m-%d}<br>Минимум: %{y:.1f}°C<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            title=f'Температура в {graph_city} со скользящим средним',
+            xaxis_title='Дата',
+            yaxis_title='Температура (°C)',
+            hovermode='x unified',
+            template='plotly_white',  # Используем стандартный шаблон
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            height=500
+        )
+        
+        return fig
     
-    city_data_sorted['moving_avg'] = city_data_sorted['temperature'].rolling(
-        window=window_size, center=True, min_periods=1
-    ).mean()
-    
-    # Создаем график
-    fig = go.Figure()
-    
-    # Температура (тонкая линия)
-    fig.add_trace(go.Scatter(
-        x=city_data_sorted['timestamp'],
-        y=city_data_sorted['temperature'],
-        mode='lines',
-        name='Температура',
-        line=dict(color='lightblue', width=1),
-        opacity=0.5,
-        hovertemplate='%{x|%Y-%m-%d}<br>Температура: %{y:.1f}°C<extra></extra>'
-    ))
-    
-    # Скользящее среднее (толстая линия)
-    fig.add_trace(go.Scatter(
-        x=city_data_sorted['timestamp'],
-        y=city_data_sorted['moving_avg'],
-        mode='lines',
-        name=f'Скользящее среднее ({window_size} дней)',
-        line=dict(color='red', width=3),
-        hovertemplate='%{x|%Y-%m-%d}<br>Скользящее среднее: %{y:.1f}°C<extra></extra>'
-    ))
-    
-    # Находим экстремальные значения
-    max_temp_idx = city_data_sorted['temperature'].idxmax()
-    min_temp_idx = city_data_sorted['temperature'].idxmin()
-    
-    # Максимальная температура
-    fig.add_trace(go.Scatter(
-        x=[city_data_sorted.loc[max_temp_idx, 'timestamp']],
-        y=[city_data_sorted.loc[max_temp_idx, 'temperature']],
-        mode='markers',
-        name='Максимум',
-        marker=dict(color='darkred', size=12, symbol='triangle-up'),
-        hovertemplate='%{x|%Y-%m-%d}<br>Максимум: %{y:.1f}°C<extra></extra>'
-    ))
-    
-    # Минимальная температура
-    fig.add_trace(go.Scatter(
-        x=[city_data_sorted.loc[min_temp_idx, 'timestamp']],
-        y=[city_data_sorted.loc[min_temp_idx, 'temperature']],
-        mode='markers',
-        name='Минимум',
-        marker=dict(color='darkblue', size=12, symbol='triangle-down'),
-        hovertemplate='%{x|%Y-%m-%d}<br>Минимум: %{y:.1f}°C<extra></extra>'
-    ))
-    
-    fig.update_layout(
-        title=f'Температура в {graph_city} со скользящим средним',
-        xaxis_title='Дата',
-        yaxis_title='Температура (°C)',
-        hovermode='x unified',
-        template='plotly_white',  # Используем стандартный шаблон
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-        height=500
+    fig = figure_cache.plotly_figure(
+        'timeseries', build_timeseries_figure, city=graph_city,
+        params={'window': window_size, 'period': period}, fingerprint=data_key
     )
     
     st.plotly_chart(fig, use_container_width=True)
@@ -301,39 +395,15 @@ with tab3:
     with col1:
         st.subheader("📊 Распределение температур")
         
-        # Создаем гистограмму вручную, так как visualizer использует PLOTLY_TEMPLATE
-        fig_hist = go.Figure()
-        
-        fig_hist.add_trace(go.Histogram(
-            x=city_data['temperature'],
-            nbinsx=50,
-            name='Распределение',
-            marker_color='lightblue',
-            opacity=0.7,
-            hovertemplate='Температура: %{x:.1f}°C<br>Количество дней: %{y}<extra></extra>'
-        ))
-        
-        # Добавляем статистические линии
-        mean_temp = city_data['temperature'].mean()
-        std_temp = city_data['temperature'].std()
-        
-        fig_hist.add_vline(
-            x=mean_temp, 
-            line_dash="dash", 
-            line_color="red",
-            annotation_text=f"Средняя: {mean_temp:.1f}°C",
-            annotation_position="top right"
-        )
-        
-        fig_hist.add_vline(x=mean_temp - 2*std_temp, line_dash="dot", line_color="orange")
-        fig_hist.add_vline(x=mean_temp + 2*std_temp, line_dash="dot", line_color="orange")
-        
-        fig_hist.update_layout(
-            title=f'Распределение температур в {graph_city}',
-            xaxis_title='Температура (°C)',
-            yaxis_title='Количество дней',
-            template='plotly_white',
-            showlegend=False
+        # Гистограмма из счетчиков, посчитанных и закэшированных анализатором
+        fig_hist = figure_cache.plotly_figure(
+            'histogram',
+            lambda: visualizer.plot_histogram_summary(
+                analyzer.get_temperature_histogram(graph_city),
+                title=f'Распределение температур в {graph_city}',
+                color='lightblue'
+            ),
+            city=graph_city, fingerprint=data_key
         )
         
         st.plotly_chart(fig_hist, use_container_width=True)
@@ -341,34 +411,16 @@ with tab3:
     with col2:
         st.subheader("📦 Распределение по сезонам")
         
-        # Создаем боксплот вручную
-        city_data_display = city_data.copy()
-        city_data_display['season_ru'] = city_data_display['season'].map(
-            lambda x: SEASON_NAMES_RU.get(x, x)
-        )
-        
-        fig_box = go.Figure()
-        
-        # Добавляем боксплот для каждого сезона
-        seasons_ru = ['Зима', 'Весна', 'Лето', 'Осень']
-        colors = ['lightblue', 'lightgreen', 'lightcoral', 'wheat']
-        
-        for season_ru, color in zip(seasons_ru, colors):
-            season_data = city_data_display[city_data_display['season_ru'] == season_ru]['temperature']
-            if len(season_data) > 0:
-                fig_box.add_trace(go.Box(
-                    y=season_data,
-                    name=season_ru,
-                    marker_color=color,
-                    boxmean=True  # Показываем среднее значение
-                ))
-        
-        fig_box.update_layout(
-            title=f'Распределение температур по сезонам в {graph_city}',
-            yaxis_title='Температура (°C)',
-            xaxis_title='Сезон',
-            template='plotly_white',
-            showlegend=False
+        # Боксплот из квартилей и усов, посчитанных анализатором по сезонам
+        fig_box = figure_cache.plotly_figure(
+            'seasonal_box',
+            lambda: visualizer.plot_box_summaries(
+                {SEASON_NAMES_RU[season]: analyzer.get_box_stats(graph_city, season) for season in seasons},
+                title=f'Распределение температур по сезонам в {graph_city}',
+                xaxis_title='Сезон',
+                colors=['lightblue', 'lightgreen', 'lightcoral', 'wheat']
+            ),
+            city=graph_city, fingerprint=data_key
         )
         
         st.plotly_chart(fig_box, use_container_width=True)
@@ -384,14 +436,18 @@ with tab3:
         mean_temp = season_data['temperature'].mean()
         std_temp = season_data['temperature'].std()
         
-        lower_bound = mean_temp - 2 * std_temp
-        upper_bound = mean_temp + 2 * std_temp
-        
-        # Определяем аномалии
-        season_data['is_anomaly'] = (
-            (season_data['temperature'] < lower_bound) | 
-            (season_data['temperature'] > upper_bound)
-        )
+        # Определяем аномалии методом, выбранным на вкладке анализа
+        if anomaly_method == 'climatology':
+            # Границы нормы дня года для каждой строки (см. detect_anomalies)
+            climatology_data = analyzer.detect_anomalies(graph_city, method='climatology')['city_data']
+            season_data = climatology_data[climatology_data['season'] == selected_season].copy()
+        else:
+            lower_bound = mean_temp - ANOMALY_SIGMA_THRESHOLD * std_temp
+            upper_bound = mean_temp + ANOMALY_SIGMA_THRESHOLD * std_temp
+            season_data['is_anomaly'] = (
+                (season_data['temperature'] < lower_bound) | 
+                (season_data['temperature'] > upper_bound)
+            )
         
         anomalies = season_data[season_data['is_anomaly']]
         n_anomalies = len(anomalies)
@@ -408,69 +464,96 @@ with tab3:
         with col4:
             st.metric("Процент аномалий", f"{percent_anomalies:.1f}%")
         
-        # Создаем график аномалий
-        fig_anomalies = go.Figure()
-        
-        # Нормальные точки
-        normal_data = season_data[~season_data['is_anomaly']]
-        if not normal_data.empty:
+        # Создаем график аномалий (кэшируется по городу и сезону)
+        def build_anomalies_figure():
+            fig_anomalies = go.Figure()
+            
+            # Нормальные точки
+            normal_data = season_data[~season_data['is_anomaly']]
+            if not normal_data.empty:
+                fig_anomalies.add_trace(go.Scatter(
+                    x=normal_data['timestamp'],
+                    y=normal_data['temperature'],
+                    mode='markers',
+                    name='Нормальные значения',
+                    marker=dict(color='blue', size=6, opacity=0.5),
+                    hovertemplate='%{x|%Y-%m-%d}<br>Температура: %{y:.1f}°C<extra></extra>'
+                ))
+            
+            # Аномальные точки
+            if not anomalies.empty:
+                fig_anomalies.add_trace(go.Scatter(
+                    x=anomalies['timestamp'],
+                    y=anomalies['temperature'],
+                    mode='markers',
+                    name='Аномалии',
+                    marker=dict(color='red', size=10, symbol='circle'),
+                    hovertemplate='%{x|%Y-%m-%d}<br>Аномалия: %{y:.1f}°C<extra></extra>'
+                ))
+            
+            # Линии границ и центра: по дню года или постоянные для сезона
+            if anomaly_method == 'climatology':
+                # Дни вне сезона становятся пропусками и разрывают линии между годами
+                daily_bounds = season_data.set_index('timestamp')[
+                    ['upper', 'lower', 'climatology_median']
+                ].resample('D').first()
+                bounds_x = daily_bounds.index
+                upper_y, lower_y, center_y = (
+                    daily_bounds['upper'], daily_bounds['lower'], daily_bounds['climatology_median']
+                )
+                upper_name = f'Верхняя граница (медиана + {ANOMALY_SIGMA_THRESHOLD:g}·σ̂)'
+                lower_name = f'Нижняя граница (медиана - {ANOMALY_SIGMA_THRESHOLD:g}·σ̂)'
+                center_name = 'Норма дня года (медиана)'
+            else:
+                bounds_x = [season_data['timestamp'].min(), season_data['timestamp'].max()]
+                upper_y, lower_y, center_y = [upper_bound] * 2, [lower_bound] * 2, [mean_temp] * 2
+                upper_name = f'Верхняя граница (среднее + {ANOMALY_SIGMA_THRESHOLD:g}σ)'
+                lower_name = f'Нижняя граница (среднее - {ANOMALY_SIGMA_THRESHOLD:g}σ)'
+                center_name = f'Среднее = {mean_temp:.1f}°C'
+            
             fig_anomalies.add_trace(go.Scatter(
-                x=normal_data['timestamp'],
-                y=normal_data['temperature'],
-                mode='markers',
-                name='Нормальные значения',
-                marker=dict(color='blue', size=6, opacity=0.5),
-                hovertemplate='%{x|%Y-%m-%d}<br>Температура: %{y:.1f}°C<extra></extra>'
+                x=bounds_x,
+                y=upper_y,
+                mode='lines',
+                name=upper_name,
+                line=dict(color='green', dash='dash', width=1),
+                opacity=0.7
             ))
-        
-        # Аномальные точки
-        if not anomalies.empty:
+            
             fig_anomalies.add_trace(go.Scatter(
-                x=anomalies['timestamp'],
-                y=anomalies['temperature'],
-                mode='markers',
-                name='Аномалии',
-                marker=dict(color='red', size=10, symbol='circle'),
-                hovertemplate='%{x|%Y-%m-%d}<br>Аномалия: %{y:.1f}°C<extra></extra>'
+                x=bounds_x,
+                y=lower_y,
+                mode='lines',
+                name=lower_name,
+                line=dict(color='orange', dash='dash', width=1),
+                opacity=0.7
             ))
+            
+            # Средняя линия
+            fig_anomalies.add_trace(go.Scatter(
+                x=bounds_x,
+                y=center_y,
+                mode='lines',
+                name=center_name,
+                line=dict(color='black', width=2),
+                opacity=0.5
+            ))
+            
+            fig_anomalies.update_layout(
+                title=f'Аномалии температуры в городе {graph_city} ({SEASON_NAMES_RU[selected_season]})',
+                xaxis_title='Дата',
+                yaxis_title='Температура (°C)',
+                hovermode='closest',
+                template='plotly_white',
+                height=500,
+                showlegend=True
+            )
+            
+            return fig_anomalies
         
-        # Линии границ
-        fig_anomalies.add_trace(go.Scatter(
-            x=[season_data['timestamp'].min(), season_data['timestamp'].max()],
-            y=[upper_bound, upper_bound],
-            mode='lines',
-            name='Верхняя граница (среднее + 2σ)',
-            line=dict(color='green', dash='dash', width=1),
-            opacity=0.7
-        ))
-        
-        fig_anomalies.add_trace(go.Scatter(
-            x=[season_data['timestamp'].min(), season_data['timestamp'].max()],
-            y=[lower_bound, lower_bound],
-            mode='lines',
-            name='Нижняя граница (среднее - 2σ)',
-            line=dict(color='orange', dash='dash', width=1),
-            opacity=0.7
-        ))
-        
-        # Средняя линия
-        fig_anomalies.add_trace(go.Scatter(
-            x=[season_data['timestamp'].min(), season_data['timestamp'].max()],
-            y=[mean_temp, mean_temp],
-            mode='lines',
-            name=f'Среднее = {mean_temp:.1f}°C',
-            line=dict(color='black', width=2),
-            opacity=0.5
-        ))
-        
-        fig_anomalies.update_layout(
-            title=f'Аномалии температуры в городе {graph_city} ({SEASON_NAMES_RU[selected_season]})',
-            xaxis_title='Дата',
-            yaxis_title='Температура (°C)',
-            hovermode='closest',
-            template='plotly_white',
-            height=500,
-            showlegend=True
+        fig_anomalies = figure_cache.plotly_figure(
+            'season_anomalies', build_anomalies_figure, city=graph_city,
+            params={'season': selected_season, 'method': anomaly_method}, fingerprint=data_key
         )
         
         st.plotly_chart(fig_anomalies, use_container_width=True)
@@ -480,9 +563,15 @@ with tab3:
             with st.expander("Показать детали аномалий"):
                 anomalies_display = anomalies[['timestamp', 'temperature']].copy()
                 anomalies_display['timestamp'] = anomalies_display['timestamp'].dt.strftime('%Y-%m-%d')
-                anomalies_display['deviation'] = (anomalies_display['temperature'] - mean_temp).round(1)
-                anomalies_display.columns = ['Дата', 'Температура (°C)', 'Отклонение от среднего (°C)']
-                st.dataframe(anomalies_display.sort_values('Отклонение от среднего (°C)', ascending=False))
+                if anomaly_method == 'climatology':
+                    center = anomalies['climatology_median']
+                    deviation_column = 'Отклонение от нормы дня года (°C)'
+                else:
+                    center = mean_temp
+                    deviation_column = 'Отклонение от среднего (°C)'
+                anomalies_display['deviation'] = (anomalies_display['temperature'] - center).round(1)
+                anomalies_display.columns = ['Дата', 'Температура (°C)', deviation_column]
+                st.dataframe(anomalies_display.sort_values(deviation_column, ascending=False))
     else:
         st.info(f"Нет данных для города {graph_city} в сезон {SEASON_NAMES_RU[selected_season]}")
     
@@ -499,53 +588,24 @@ with tab3:
     if len(compare_cities) > 1:
         compare_data = df[df['city'].isin(compare_cities)]
         
-        # Боксплот для сравнения
-        fig_comparison = go.Figure()
-        
-        colors = px.colors.qualitative.Set3
-        
-        for i, city in enumerate(compare_cities):
-            city_temp_data = compare_data[compare_data['city'] == city]['temperature']
-            fig_comparison.add_trace(go.Box(
-                y=city_temp_data,
-                name=city,
-                marker_color=colors[i % len(colors)],
-                boxmean=True
-            ))
-        
-        fig_comparison.update_layout(
-            title='Сравнение распределения температур',
-            yaxis_title='Температура (°C)',
-            xaxis_title='Город',
-            template='plotly_white',
-            showlegend=False
+        # Боксплот для сравнения (статистика городов кэшируется анализатором)
+        fig_comparison = figure_cache.plotly_figure(
+            'city_comparison',
+            lambda: visualizer.plot_box_summaries(
+                {city: analyzer.get_box_stats(city) for city in compare_cities},
+                title='Сравнение распределения температур',
+                xaxis_title='Город',
+                colors=qualitative.Set3
+            ),
+            params={'cities': compare_cities}, fingerprint=data_key
         )
         
         st.plotly_chart(fig_comparison, use_container_width=True)
         
         # Линейный график средних по месяцам
-        if not pd.api.types.is_datetime64_any_dtype(compare_data['timestamp']):
-            compare_data = compare_data.copy()
-            compare_data['timestamp'] = pd.to_datetime(compare_data['timestamp'])
-        
-        compare_data['month'] = compare_data['timestamp'].dt.month
-        monthly_avg = compare_data.groupby(['city', 'month'])['temperature'].mean().reset_index()
-        
-        fig_monthly = px.line(
-            monthly_avg,
-            x='month',
-            y='temperature',
-            color='city',
-            title='Средняя температура по месяцам',
-            labels={'month': 'Месяц', 'temperature': 'Температура (°C)', 'city': 'Город'},
-            markers=True
-        )
-        
-        fig_monthly.update_layout(
-            template='plotly_white',
-            xaxis=dict(tickmode='array', tickvals=list(range(1, 13)), 
-                      ticktext=['Янв', 'Фев', 'Мар', 'Апр', 'Май', 'Июн', 
-                               'Июл', 'Авг', 'Сен', 'Окт', 'Ноя', 'Дек'])
+        fig_monthly = figure_cache.plotly_figure(
+            'monthly_averages', lambda: visualizer.plot_monthly_averages(compare_data.copy()),
+            params={'cities': compare_cities}, fingerprint=data_key
         )
         
         st.plotly_chart(fig_monthly, use_container_width=True)
@@ -555,7 +615,7 @@ with tab3:
             comparison_stats = []
             for city in compare_cities:
                 city_stats = analyzer.get_basic_stats(city)
-                anomaly_result = analyzer.detect_anomalies(city)
+                anomaly_result = analyzer.detect_anomalies(city, method=anomaly_method)
                 
                 comparison_stats.append({
                     'Город': city,
@@ -575,19 +635,13 @@ with tab3:
     
     if st.button("Найти город с наибольшим процентом аномалий", key="find_top_anomaly"):
         with st.spinner("Анализируем данные по всем городам..."):
-            # Собираем статистику по всем городам
-            all_anomaly_stats = []
-            
-            for city in cities:
-                anomaly_result = analyzer.detect_anomalies(city)
-                all_anomaly_stats.append({
-                    'Город': city,
-                    'Процент аномалий': anomaly_result['stats']['percent_anomalies'],
-                    'Количество аномалий': anomaly_result['stats']['n_anomalies'],
-                    'Средняя температура': anomaly_result['stats']['mean']
-                })
-            
-            anomaly_df = pd.DataFrame(all_anomaly_stats)
+            # Статистика аномалий по всем городам за один проход
+            anomaly_df = analyzer.detect_anomalies_all(by='city').rename(columns={
+                'city': 'Город',
+                'percent_anomalies': 'Процент аномалий',
+                'n_anomalies': 'Количество аномалий',
+                'mean': 'Средняя температура'
+            })
             top_city_row = anomaly_df.loc[anomaly_df['Процент аномалий'].idxmax()]
             
             st.success(f"**Город с наибольшим процентом аномалий:** {top_city_row['Город']}")
@@ -601,29 +655,22 @@ with tab3:
                 st.metric("Средняя температура", f"{top_city_row['Средняя температура']:.1f}°C")
             
             # Анализируем аномалии по сезонам для этого города
-            city_season_stats = []
             top_city_data = df[df['city'] == top_city_row['Город']]
+            season_summary = analyzer.detect_anomalies_all(by=('city', 'season'))
+            season_summary = season_summary[
+                season_summary['city'] == top_city_row['Город']
+            ].set_index('season')
             
+            city_season_stats = []
             for season in ['winter', 'spring', 'summer', 'autumn']:
-                season_data = top_city_data[top_city_data['season'] == season]
-                if len(season_data) > 0:
-                    season_mean = season_data['temperature'].mean()
-                    season_std = season_data['temperature'].std()
-                    
-                    lower_bound_season = season_mean - 2 * season_std
-                    upper_bound_season = season_mean + 2 * season_std
-                    
-                    anomalies_season = season_data[
-                        (season_data['temperature'] < lower_bound_season) | 
-                        (season_data['temperature'] > upper_bound_season)
-                    ]
-                    
+                if season in season_summary.index:
+                    season_row = season_summary.loc[season]
                     city_season_stats.append({
                         'Сезон': SEASON_NAMES_RU[season],
-                        'Средняя температура': season_mean,
-                        'Станд. отклонение': season_std,
-                        'Количество аномалий': len(anomalies_season),
-                        'Процент аномалий': (len(anomalies_season) / len(season_data)) * 100
+                        'Средняя температура': season_row['mean'],
+                        'Станд. отклонение': season_row['std'],
+                        'Количество аномалий': int(season_row['n_anomalies']),
+                        'Процент аномалий': season_row['percent_anomalies']
                     })
             
             # Находим сезон с наибольшим процентом аномалий
@@ -699,62 +746,96 @@ with tab4:
     # 1. Сравнение распараллеливания анализа данных
     st.subheader("1. Распараллеливание анализа данных")
 
-    test_cities_count = st.slider(
-        "Количество городов для теста:", 
-        2, 20, 10, 
-        key="test_cities_perf"
+    st.markdown(
+        "Полный анализ каждого города (статистика, сезоны, аномалии, тренд): "
+        "последовательно и в пуле процессов с данными в разделяемой памяти. "
+        "Время запуска пула указано отдельно и не входит во время анализа."
     )
     
+    max_cores = os.cpu_count() or 1
+    worker_options = sorted({1, 2, 4, 8, max_cores} & set(range(1, max_cores + 1)))
+    col1, col2 = st.columns(2)
+    with col1:
+        perf_workers = st.multiselect(
+            "Число процессов:", worker_options, default=worker_options,
+            key="perf_workers"
+        )
+    with col2:
+        perf_sizes = st.multiselect(
+            "Размер данных (городов):", sorted({len(cities), 150, 600}), default=[len(cities)],
+            key="perf_sizes"
+        )
+    
     if st.button("Запустить сравнение обработки данных", key="run_perf_test"):
-        import concurrent.futures
-        
-        test_cities = cities[:test_cities_count]
-        
-        st.write(f"Тестируем на {test_cities_count} городах: {', '.join(test_cities[:5])}...")
-
-        # Последовательная обработка
-        start_time = time.time()
-        for city in test_cities:
-            city_data = df[df['city'] == city]
-            mean_temp = city_data['temperature'].mean()
-            std_temp = city_data['temperature'].std()
-        seq_time = time.time() - start_time
-        
-        # Параллельная обработка
-        def analyze_city(city_name):
-            city_data = df[df['city'] == city_name]
-            mean_temp = city_data['temperature'].mean()
-            std_temp = city_data['temperature'].std()
-            return mean_temp, std_temp
-        
-        start_time = time.time()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            results = list(executor.map(analyze_city, test_cities))
-        par_time = time.time() - start_time
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Последовательно", f"{seq_time:.3f} сек")
-        with col2:
-            st.metric("Параллельно", f"{par_time:.3f} сек")
-        with col3:
-            speedup = seq_time / par_time if par_time > 0 else 0
-            st.metric("Ускорение", f"{speedup:.1f}x")
-        
-        # Анализ результатов
-        if seq_time < par_time or abs(seq_time - par_time) < 0.001:
-            st.warning("""
-            **Наблюдение:** Последовательная обработка оказалась не менее эффективной.
+        perf_rows = []
+        progress = st.progress(0.0)
+        total_runs = len(perf_sizes) * len(perf_workers)
+        for size in sorted(perf_sizes):
+            if size == len(cities):
+                perf_df = df
+            else:
+                seasonal_temperatures = synthetic_seasonal_temperatures(size)
+                perf_df = generate_realistic_temperature_data(
+                    list(seasonal_temperatures), seed=0, seasonal_temperatures=seasonal_temperatures
+                )
             
-            **Причины:**
-            1. Маленький объем данных
-            2. Простые вычисления
-            3. Накладные расходы на создание потоков
-            """)
-        else:
-            st.success("""
-            **Наблюдение:** Параллельная обработка оказалась эффективнее.
-            """)
+            perf_analyzer = TemperatureAnalyzer(perf_df, copy=False)
+            perf_cities = list(perf_df['city'].unique())
+            start_time = time.perf_counter()
+            analyze_cities(perf_analyzer, perf_cities)
+            seq_time = time.perf_counter() - start_time
+            
+            for workers in sorted(perf_workers):
+                with ParallelAnalyzer(perf_df, max_workers=workers) as parallel_analyzer:
+                    startup_time = parallel_analyzer.start()
+                    start_time = time.perf_counter()
+                    parallel_analyzer.analyze(perf_cities)
+                    par_time = time.perf_counter() - start_time
+                perf_rows.append({
+                    'Городов': size,
+                    'Записей': len(perf_df),
+                    'Процессов': workers,
+                    'Последовательно, с': seq_time,
+                    'Параллельно, с': par_time,
+                    'Запуск пула, с': startup_time,
+                    'Ускорение': seq_time / par_time if par_time > 0 else 0
+                })
+                progress.progress(len(perf_rows) / total_runs)
+        
+        if perf_rows:
+            perf_results = pd.DataFrame(perf_rows)
+            st.dataframe(perf_results.style.format({
+                'Записей': '{:,}',
+                'Последовательно, с': '{:.3f}',
+                'Параллельно, с': '{:.3f}',
+                'Запуск пула, с': '{:.2f}',
+                'Ускорение': '{:.2f}x'
+            }), use_container_width=True)
+            
+            import plotly.express as px
+            fig_speedup = px.line(
+                perf_results, x='Процессов', y='Ускорение',
+                color=perf_results['Городов'].astype(str), markers=True,
+                title='Ускорение относительно последовательного анализа',
+                labels={'color': 'Городов'}
+            )
+            st.plotly_chart(fig_speedup, use_container_width=True)
+            
+            if perf_results['Ускорение'].max() <= 1:
+                st.warning(f"""
+                **Наблюдение:** Параллельная обработка не дала ускорения
+                (доступно ядер: {max_cores}).
+                
+                **Причины:**
+                1. Процессов больше, чем свободных ядер
+                2. Маленький объем данных на процесс
+                3. Накладные расходы на передачу задач и результатов
+                """)
+            else:
+                st.success(f"""
+                **Наблюдение:** Максимальное ускорение - {perf_results['Ускорение'].max():.1f}x
+                (доступно ядер: {max_cores}).
+                """)
     
     # 2. Сравнение синхронных/асинхронных запросов к API
     st.subheader("2. Синхронные vs Асинхронные запросы к API")
@@ -764,22 +845,24 @@ with tab4:
         
         test_cities_api = ["London", "Paris", "Berlin", "Moscow", "Tokyo"]
         
-        # Синхронный метод
-        start_time = time.time()
+        # Синхронный метод (без кэша, чтобы сравнивать сетевые запросы)
+        start_time = time.perf_counter()
         sync_results = []
         for city in test_cities_api:
-            result = api_handler.get_current_weather_sync(city)
+            result = api_handler.get_current_weather_sync(city, use_cache=False)
             sync_results.append(result)
-        sync_time = time.time() - start_time
+        sync_time = time.perf_counter() - start_time
         
         # Асинхронный метод
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            async_results = asyncio.run(api_handler.get_multiple_cities_async(test_cities_api))
-            async_time = time.time() - start_time
+            async_results = asyncio.run(
+                api_handler.get_multiple_cities_async(test_cities_api, use_cache=False)
+            )
+            async_time = time.perf_counter() - start_time
         except Exception as e:
             st.error(f"Ошибка асинхронного запроса: {str(e)}")
-            async_time = time.time() - start_time
+            async_time = time.perf_counter() - start_time
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -805,11 +888,65 @@ with st.sidebar:
     3. Выберите город и нажмите "Получить погоду"
     """)
     
+    # Статистика кэша графиков
+    with st.expander("⚡ Кэш графиков"):
+        cache_stats = figure_cache.stats()
+        st.markdown(
+            f"Попаданий: {cache_stats['hits']}, промахов: {cache_stats['misses']} "
+            f"({cache_stats['hit_rate']:.0%}), графиков в кэше: {cache_stats['size']}, "
+            f"вытеснено: {cache_stats['evictions']}"
+        )
+        if cache_stats['builds']:
+            st.dataframe(pd.DataFrame([
+                {'График': name, 'Построений': build['count'],
+                 'Среднее время, мс': round(build['mean_ms'], 1)}
+                for name, build in cache_stats['builds'].items()
+            ]), hide_index=True)
+    
+    # Длительности операций загрузчика, анализатора, API и графиков
+    with st.expander("🩺 Диагностика"):
+        metrics.enabled = st.checkbox("Замерять операции", value=metrics.enabled, key="metrics_enabled")
+        st.caption("Замеры общие для всех сессий процесса")
+        operations = metrics.snapshot()
+        if operations:
+            st.dataframe(pd.DataFrame([
+                {'Операция': name, 'Вызовов': operation['count'],
+                 'p50, мс': round(operation['p50_ms'], 2), 'p95, мс': round(operation['p95_ms'], 2),
+                 'p99, мс': round(operation['p99_ms'], 2), 'Всего, мс': round(operation['sum_ms'], 1)}
+                for name, operation in operations.items()
+            ]).sort_values('Всего, мс', ascending=False), hide_index=True)
+            
+            selected_operation = st.selectbox("Гистограмма операции", list(operations), key="metrics_operation")
+            buckets = operations[selected_operation]['buckets']
+            fig_metrics = go.Figure(go.Bar(x=list(buckets), y=list(buckets.values())))
+            fig_metrics.update_layout(
+                xaxis_title="Верхняя граница, мс", xaxis_type='category', yaxis_title="Вызовов", height=250, margin=dict(l=0, r=0, t=10, b=0)
+            )
+            st.plotly_chart(fig_metrics, use_container_width=True)
+        else:
+            st.caption("Замеров пока нет")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("JSON", metrics.to_json(), file_name="metrics.json", mime="application/json")
+        with col2:
+            st.download_button("Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        if st.button("Сбросить замеры"):
+            metrics.reset()
+            st.rerun()
+    
     # Кнопка для обновления данных
     if st.button("🔄 Сгенерировать новые данные"):
-        st.session_state.df = generate_realistic_temperature_data()
-        os.makedirs('./data', exist_ok=True)
-        st.session_state.df.to_csv('./data/temperature_data.csv', index=False)
+        new_df = generate_realistic_temperature_data()
+        save_temperature_data(new_df)
+        # Сбрасываем все общие кэши со старыми данными: load_history без
+        # хранилища истории возвращает результат load_temperature_data,
+        # а анализатор и графики построены по прежнему отпечатку данных
+        load_history.clear()
+        load_temperature_data.clear()
+        get_analyzer.clear()
+        figure_cache.clear()
+        st.session_state.df = load_history()
         st.rerun()
 
 # Футер
@@ -0,0 +1,54 @@
+"""
+Бенчмарк: задержка запросов TemperatureAnalyzer в зависимости от числа городов.
+
+Сравнивает фильтрацию булевой маской по всему DataFrame с чтением
+среза из индекса разделов по городам.
+
+Запуск: python -m benchmarks.bench_analyzer_index
+"""
+import time
+
+from utils.analyzer import TemperatureAnalyzer
+from utils.data_loader import generate_realistic_temperature_data, synthetic_seasonal_temperatures
+
+
+def make_dataset(num_cities, num_years=10, seed=0):
+    """Синтетический набор данных: num_cities городов по 365 * num_years дней"""
+    seasonal_temperatures = synthetic_seasonal_temperatures(num_cities)
+    return generate_realistic_temperature_data(
+        list(seasonal_temperatures), num_years, seed, seasonal_temperatures
+    )
+
+
+def time_call(func, repeats):
+    """Среднее время одного вызова в миллисекундах"""
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start_time) / repeats * 1000
+
+
+def main(city_counts=(15, 100, 500), repeats=20):
+    print(f"{'городов':>8} {'строк':>10} {'маска, мс':>10} {'индекс, мс':>11} "
+          f"{'ускорение':>10} {'get_basic_stats, мс':>20}")
+    for num_cities in city_counts:
+        df = make_dataset(num_cities)
+        analyzer = TemperatureAnalyzer(df)
+        city_name = df['city'].iloc[len(df) // 2]
+
+        mask_ms = time_call(
+            lambda: analyzer.df[analyzer.df['city'] == city_name]['temperature'],
+            repeats
+        )
+        index_ms = time_call(
+            lambda: analyzer._get_city_frame(city_name)['temperature'],
+            repeats
+        )
+        stats_ms = time_call(lambda: analyzer.get_basic_stats(city_name), repeats)
+
+        print(f"{num_cities:>8} {len(df):>10,} {mask_ms:>10.3f} {index_ms:>11.3f} "
+              f"{mask_ms / index_ms:>9.1f}x {stats_ms:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Бенчмарк: память TemperatureAnalyzer в режиме копирования и без копирования.
+
+Память считается через tracemalloc (numpy сообщает ему о своих буферах).
+Копии DataFrame считаются в размерах одной копии: столбцы и индекс без
+содержимого строк (копия object-столбца разделяет строки с исходным).
+Режим без копирования удерживает только коды городов и сезонов, поэтому
+разница между режимами - это копии данных, удерживаемые режимом copy.
+Проверка: режим copy удерживает не больше одной копии (код выхода 1 иначе).
+
+Запуск: python -m benchmarks.bench_analyzer_memory
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+
+MAX_COPIES = 1.25  # одна копия данных плюс запас на служебные структуры
+
+
+def measure(df, copy):
+    """Память, удерживаемая анализатором сверх исходных данных, и время создания"""
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    analyzer = TemperatureAnalyzer(df, copy=copy)
+    elapsed = time.perf_counter() - start_time
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del analyzer
+    return retained, elapsed
+
+
+def copy_size(df):
+    """Размер одной копии DataFrame: столбцы и индекс (после take - int64)"""
+    return df.memory_usage(index=False).sum() + len(df) * np.dtype(np.int64).itemsize
+
+
+def main(city_counts=(15, 150)):
+    print(f"{'городов':>8} {'копия, МБ':>10} {'режим':>10} {'удержано, МБ':>13} "
+          f"{'копий':>6} {'создание, с':>12}")
+    failed = False
+    for num_cities in city_counts:
+        df = make_dataset(num_cities)
+        copy_bytes = copy_size(df)
+        retained = {}
+        for copy in (False, True):
+            retained[copy], elapsed = measure(df, copy)
+            copies = (retained[copy] - retained[False]) / copy_bytes
+            print(f"{num_cities:>8} {copy_bytes / 2**20:>10.1f} {'copy' if copy else 'zero-copy':>10} "
+                  f"{retained[copy] / 2**20:>13.1f} {copies:>6.2f} {elapsed:>12.3f}")
+        if copies > MAX_COPIES:
+            print(f"ОШИБКА: режим copy удерживает {copies:.2f} копий данных (допустимо {MAX_COPIES})")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Бенчмарк: пакетный запрос погоды с ограничением параллельности и частоты.
+
+Заглушка API добавляет задержку и отвечает 429 на часть запросов;
+пакетный режим повторяет такие запросы с экспоненциальной задержкой.
+
+Запуск: python -m benchmarks.bench_api_batch
+"""
+import asyncio
+import statistics
+import time
+
+from benchmarks.stub_weather_server import StubWeatherServer
+from utils.api_handler import WeatherAPIHandler
+
+API_KEY = 'x' * 32
+
+
+async def run_batch(url, cities, **limits):
+    """Потребление результатов по мере готовности"""
+    results = []
+    async with WeatherAPIHandler(API_KEY, api_url=url) as handler:
+        async for result in handler.iter_multiple_cities_async(cities, **limits):
+            results.append(result)
+    return results
+
+
+def main(num_cities=300):
+    cities = [f"City {i}" for i in range(num_cities)]
+    scenarios = [
+        ('без ограничений', dict(max_concurrency=num_cities, calls_per_minute=None, max_retries=0)),
+        ('10 потоков, повторы', dict(max_concurrency=10, calls_per_minute=None, backoff_base=0.05)),
+        ('10 потоков, 6000/мин', dict(max_concurrency=10, calls_per_minute=6000, burst=20,
+                                      backoff_base=0.05)),
+    ]
+
+    print(f"{'сценарий':<22} {'успешно':>8} {'запросов':>9} {'p50, мс':>8} "
+          f"{'p95, мс':>8} {'всего, с':>9}")
+    with StubWeatherServer(latency=0.01, error_rate=0.2, seed=0) as server:
+        for name, limits in scenarios:
+            server.reset_counters()
+            start_time = time.perf_counter()
+            results = asyncio.run(run_batch(server.url, cities, **limits))
+            total_time = time.perf_counter() - start_time
+
+            timings = sorted(result['total_time'] for result in results)
+            n_success = sum(result['success'] for result in results)
+            print(f"{name:<22} {n_success:>8} {server.requests:>9} "
+                  f"{statistics.median(timings) * 1000:>8.1f} "
+                  f"{timings[int(len(timings) * 0.95)] * 1000:>8.1f} {total_time:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Нагрузочный тест WeatherAPIHandler против локальной заглушки API:
+синхронный, асинхронный и пакетный пути с заданной частотой запросов.
+
+Нагрузка открытая: i-й запрос назначается на момент i / rps от старта и
+задержка считается от назначенного момента, а не от фактической отправки.
+Если клиент не успевает, ожидание в очереди попадает в задержку и не
+прячется (coordinated omission). Отдельно выводится время обслуживания
+(сам HTTP-запрос, elapsed_time результата) - разница с задержкой показывает
+ожидание в очереди клиента. Отчет: p50/p95/p99 задержки и обслуживания,
+достигнутая пропускная способность, ответы по кодам и счетчики сервера.
+
+Запуск: python -m benchmarks.bench_api_load --rps 200 --duration 5 --latency lognormal:0.02:0.5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_weather_server import StubWeatherServer
+from utils.api_handler import WeatherAPIHandler
+
+API_KEY = 'x' * 32
+PATHS = ('sync', 'async', 'batch')
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """Перцентили (в тех же единицах), None для пустой выборки"""
+    if not values:
+        return {f"p{point}": None for point in points}
+    if len(values) == 1:
+        return {f"p{point}": values[0] for point in points}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {f"p{point}": cuts[point - 1] for point in points}
+
+
+def run_sync(url, cities, rps, workers):
+    """Синхронный путь: пул потоков с общим handler, запросы по расписанию"""
+    latencies, service_times, codes = [], [], Counter()
+    lock = threading.Lock()
+
+    def fetch(handler, city, scheduled):
+        result = handler.get_current_weather_sync(city, use_cache=False)
+        with lock:
+            latencies.append(time.perf_counter() - scheduled)
+            service_times.append(result['elapsed_time'])
+            codes[200 if result['success'] else result['error_code']] += 1
+
+    start_time = time.perf_counter()
+    with WeatherAPIHandler(API_KEY, api_url=url, pool_size=workers) as handler:
+        with ThreadPoolExecutor(workers) as executor:
+            for i, city in enumerate(cities):
+                scheduled = start_time + i / rps
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+                executor.submit(fetch, handler, city, scheduled)
+    return latencies, service_times, codes, time.perf_counter() - start_time
+
+
+async def run_async(url, cities, rps, workers):
+    """Асинхронный путь: задача на каждый запрос в назначенный момент"""
+    latencies, service_times, codes = [], [], Counter()
+    loop = asyncio.get_running_loop()
+    start_time = time.perf_counter()
+
+    async def fetch(handler, city, scheduled):
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        result = await handler.get_current_weather_async(city, use_cache=False)
+        latencies.append(time.perf_counter() - scheduled)
+        service_times.append(result['elapsed_time'])
+        codes[200 if result['success'] else result['error_code']] += 1
+
+    async with WeatherAPIHandler(API_KEY, api_url=url, pool_size=workers) as handler:
+        tasks = [loop.create_task(fetch(handler, city, start_time + i / rps))
+                 for i, city in enumerate(cities)]
+        await asyncio.gather(*tasks)
+    return latencies, service_times, codes, time.perf_counter() - start_time
+
+
+async def run_batch(url, cities, rps, workers, max_retries):
+    """
+    Пакетный путь: iter_multiple_cities_async с ограничителем частоты rps
+    и burst=1 - i-й город отправляется не раньше i / rps, поэтому задержка
+    от назначенного момента сравнима с sync/async. С запасом токенов
+    (burst > 1) запросы уходили бы раньше своего момента и задержка
+    занижалась бы вплоть до отрицательной.
+    """
+    latencies, service_times, codes, attempts = [], [], Counter(), 0
+    index = {city: i for i, city in enumerate(cities)}
+    start_time = time.perf_counter()
+    async with WeatherAPIHandler(API_KEY, api_url=url, pool_size=workers) as handler:
+        async for result in handler.iter_multiple_cities_async(
+                cities, max_concurrency=workers, calls_per_minute=rps * 60,
+                burst=1, max_retries=max_retries,
+                backoff_base=0.05, backoff_max=1.0, use_cache=False):
+            scheduled = start_time + index[result['city']] / rps
+            latencies.append(time.perf_counter() - scheduled)
+            service_times.append(result.get('elapsed_time', 0.0))
+            codes[200 if result['success'] else result['error_code']] += 1
+            attempts += result['attempts']
+    return latencies, service_times, codes, time.perf_counter() - start_time, attempts
+
+
+def load_test(server, path, rps, duration, workers=50, max_retries=0):
+    """Один прогон пути path: сводка задержек, пропускной способности и ответов"""
+    # Уникальные города: одновременные запросы одного города объединились бы
+    cities = [f"City {i}" for i in range(max(1, int(rps * duration)))]
+    server.reset_counters()
+    if path == 'sync':
+        latencies, service_times, codes, elapsed = run_sync(server.url, cities, rps, workers)
+        attempts = len(cities)
+    elif path == 'async':
+        latencies, service_times, codes, elapsed = asyncio.run(
+            run_async(server.url, cities, rps, workers))
+        attempts = len(cities)
+    elif path == 'batch':
+        latencies, service_times, codes, elapsed, attempts = asyncio.run(
+            run_batch(server.url, cities, rps, workers, max_retries))
+    else:
+        raise ValueError(f"Неизвестный путь: {path}")
+
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        'path': path,
+        'target_rps': rps,
+        'requests': len(cities),
+        'attempts': attempts,
+        'throughput_rps': len(latencies) / elapsed,
+        'success_rps': codes[200] / elapsed,
+        'elapsed_s': elapsed,
+        'latency_ms': {**percentiles(latencies_ms),
+                       'max': max(latencies_ms) if latencies_ms else None},
+        'service_ms': percentiles([service_time * 1000 for service_time in service_times]),
+        'codes': {str(code): count for code, count in sorted(codes.items())},
+        'server': server.stats(),
+    }
+
+
+def _format_ms(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест WeatherAPIHandler")
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=list(PATHS))
+    parser.add_argument('--rps', type=float, default=200, help='целевая частота запросов')
+    parser.add_argument('--duration', type=float, default=5, help='секунд нагрузки на путь')
+    parser.add_argument('--workers', type=int, default=50, help='потоков / соединений / параллельных запросов')
+    parser.add_argument('--latency', default='lognormal:0.02:0.5', help='задержка заглушки (см. make_latency)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--quota', type=int, help='квота заглушки: запросов на ключ за --quota-window')
+    parser.add_argument('--quota-window', type=float, default=60.0)
+    parser.add_argument('--drip-rate', type=float, default=0.0, help='доля медленных ответов')
+    parser.add_argument('--drip-interval', type=float, default=0.01)
+    parser.add_argument('--max-retries', type=int, default=0, help='повторы пакетного пути при 429/5xx')
+    parser.add_argument('--output', help='JSON-файл с результатами')
+    args = parser.parse_args(argv)
+
+    server_options = dict(
+        latency=args.latency, error_rate=args.error_rate, error_status=args.error_status,
+        quota=args.quota, quota_window=args.quota_window,
+        drip_rate=args.drip_rate, drip_interval=args.drip_interval, seed=0
+    )
+    print(f"{'путь':<6} {'цель, rps':>9} {'факт, rps':>9} {'успех, rps':>10} {'p50, мс':>8} "
+          f"{'p95, мс':>8} {'p99, мс':>8} {'обсл. p50':>9} {'соед.':>6}  коды")
+    reports = []
+    with StubWeatherServer(**server_options) as server:
+        for path in args.paths:
+            report = load_test(server, path, args.rps, args.duration, args.workers, args.max_retries)
+            reports.append(report)
+            latency = report['latency_ms']
+            codes = ' '.join(f"{code}:{count}" for code, count in report['codes'].items())
+            print(f"{path:<6} {report['target_rps']:>9.0f} {report['throughput_rps']:>9.1f} "
+                  f"{report['success_rps']:>10.1f} {_format_ms(latency['p50'])} "
+                  f"{_format_ms(latency['p95'])} {_format_ms(latency['p99'])} "
+                  f"{_format_ms(report['service_ms']['p50']):>9} "
+                  f"{report['server']['connections']:>6}  {codes}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'server': server_options,
+                       'runs': reports}, f, ensure_ascii=False, indent=2)
+        print(f"Результаты: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Бенчмарк: пул соединений WeatherAPIHandler против нового соединения на запрос.
+
+Запросы идут к локальной заглушке API; сравниваются число TCP-соединений
+и медианная задержка запроса.
+
+Запуск: python -m benchmarks.bench_api_pool
+"""
+import asyncio
+import statistics
+import time
+
+import aiohttp
+import requests
+
+from benchmarks.stub_weather_server import StubWeatherServer
+from utils.api_handler import WeatherAPIHandler
+
+API_KEY = 'x' * 32
+
+
+def run_sync_unpooled(url, cities):
+    """Прежнее поведение: requests.get без общей сессии"""
+    latencies = []
+    for city in cities:
+        start_time = time.perf_counter()
+        requests.get(url, params={'q': city, 'appid': API_KEY}, timeout=10).json()
+        latencies.append(time.perf_counter() - start_time)
+    return latencies
+
+
+def run_sync_pooled(url, cities):
+    latencies = []
+    with WeatherAPIHandler(API_KEY, api_url=url) as handler:
+        for city in cities:
+            start_time = time.perf_counter()
+            handler.get_current_weather_sync(city)
+            latencies.append(time.perf_counter() - start_time)
+    return latencies
+
+
+async def run_async_unpooled(url, cities):
+    """Прежнее поведение: новый aiohttp.ClientSession на каждый город"""
+    async def fetch(city):
+        start_time = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params={'q': city, 'appid': API_KEY}) as response:
+                await response.json()
+        return time.perf_counter() - start_time
+    return await asyncio.gather(*(fetch(city) for city in cities))
+
+
+async def run_async_pooled(url, cities):
+    async def fetch(handler, city):
+        start_time = time.perf_counter()
+        await handler.get_current_weather_async(city)
+        return time.perf_counter() - start_time
+    async with WeatherAPIHandler(API_KEY, api_url=url) as handler:
+        return await asyncio.gather(*(fetch(handler, city) for city in cities))
+
+
+async def run_async_standalone(url, cities):
+    """Отдельные вызовы без контекстного менеджера: сессия живет до aclose()"""
+    handler = WeatherAPIHandler(API_KEY, api_url=url)
+    latencies = []
+    for city in cities:
+        start_time = time.perf_counter()
+        await handler.get_current_weather_async(city)
+        latencies.append(time.perf_counter() - start_time)
+    await handler.aclose()
+    return latencies
+
+
+def main(num_requests=200):
+    cities = [f"City {i}" for i in range(num_requests)]
+    scenarios = [
+        ('sync, без пула', lambda url: run_sync_unpooled(url, cities)),
+        ('sync, пул', lambda url: run_sync_pooled(url, cities)),
+        ('async, без пула', lambda url: asyncio.run(run_async_unpooled(url, cities))),
+        ('async, пул', lambda url: asyncio.run(run_async_pooled(url, cities))),
+        ('async, по одному', lambda url: asyncio.run(run_async_standalone(url, cities))),
+    ]
+
+    print(f"{'сценарий':<18} {'соединений':>11} {'p50, мс':>9} {'всего, с':>9}")
+    with StubWeatherServer(latency=0.002) as server:
+        for name, scenario in scenarios:
+            server.reset_counters()
+            start_time = time.perf_counter()
+            latencies = scenario(server.url)
+            total_time = time.perf_counter() - start_time
+            print(f"{name:<18} {server.connections:>11} "
+                  f"{statistics.median(latencies) * 1000:>9.2f} {total_time:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Бенчмарк пакетного анализа (python -m utils.cli): время старта процесса
+(--help, импорт модуля) и сквозная производительность - от запуска
+процесса до записанных отчетов - на наборах данных разного размера.
+
+Каждый запуск - отдельный процесс, как у ночного пакетного задания.
+
+Запуск: python -m benchmarks.bench_cli
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.data_loader import save_temperature_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(args, repeats=1):
+    """Медианное время выполнения команды в отдельном процессе, секунды"""
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times)
+
+
+def main(city_counts=(15, 150, 600), repeats=5):
+    print("Старт процесса (медиана):")
+    for label, args in (('python (пустой)', ['-c', 'pass']),
+                        ('import streamlit', ['-c', 'import streamlit']),
+                        ('import utils.cli', ['-c', 'import utils.cli']),
+                        ('utils.cli --help', ['-m', 'utils.cli', '--help'])):
+        print(f"  {label:<18} {time_command(args, repeats):>6.2f} с")
+
+    print(f"\n{'городов':>8} {'строк':>10} {'процесс, с':>11} {'анализ, с':>10} {'строк/с':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_cities in city_counts:
+            csv_path = os.path.join(tmp_dir, f"data_{num_cities}.csv")
+            output_dir = os.path.join(tmp_dir, f"reports_{num_cities}")
+            df = make_dataset(num_cities)
+            save_temperature_data(df, csv_path, os.path.join(tmp_dir, f"data_{num_cities}.parquet"))
+
+            wall_time = time_command(['-m', 'utils.cli', '--data', csv_path, '--output', output_dir])
+            with open(os.path.join(output_dir, 'summary.json'), encoding='utf-8') as f:
+                summary = json.load(f)
+            print(f"{num_cities:>8} {len(df):>10,} {wall_time:>11.2f} "
+                  f"{summary['timings']['total']:>10.2f} {len(df) / wall_time:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
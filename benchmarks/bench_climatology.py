@@ -0,0 +1,40 @@
+"""
+Бенчмарк: пропускная способность обнаружения аномалий по всем городам -
+глобальные границы (mean +- sigma) против климатической нормы дня года
+(медиана/MAD) на ~10 млн строк.
+
+Запуск: python -m benchmarks.bench_climatology
+"""
+import time
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+from utils.data_loader import compact_temperature_data
+
+
+def timed(func):
+    start_time = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start_time
+
+
+def main(num_cities=2740):
+    df = compact_temperature_data(make_dataset(num_cities))
+    analyzer = TemperatureAnalyzer(df, copy=False)
+    rows = len(df)
+    analyzer.detect_anomalies_all(by='city', method='global')  # коды ключей кэшируются
+
+    print(f"Строк: {rows:,}, городов: {num_cities}")
+    print(f"{'этап':>32} {'время, с':>9} {'млн строк/с':>12} {'аномалий, %':>12}")
+    for label, func in (
+        ("global: все города", lambda: analyzer.detect_anomalies_all(by='city', method='global')),
+        ("climatology: расчет нормы", analyzer.get_climatology),
+        ("climatology: все города", lambda: analyzer.detect_anomalies_all(by='city', method='climatology')),
+    ):
+        result, elapsed = timed(func)
+        percent = (result['n_anomalies'].sum() / rows * 100) if 'n_anomalies' in result else float('nan')
+        print(f"{label:>32} {elapsed:>9.2f} {rows / elapsed / 1e6:>12.1f} {percent:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
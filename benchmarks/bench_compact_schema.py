@@ -0,0 +1,60 @@
+"""
+Бенчмарк: байт на строку в исходной и компактной схеме данных.
+
+Компактная схема (compact_temperature_data): category для city/season,
+float32 для temperature. Дополнительно на большом наборе проверяется,
+что анализатор и визуализатор работают с компактной схемой.
+
+Запуск: python -m benchmarks.bench_compact_schema [число строк, по умолчанию 10 000 000]
+"""
+import sys
+import time
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+from utils.data_loader import compact_temperature_data
+from utils.visualizer import DataVisualizer
+
+
+def bytes_per_row(df):
+    """Байт на строку по столбцам (с учетом содержимого строк Python)"""
+    usage = df.memory_usage(deep=True, index=False)
+    return {col: usage[col] / len(df) for col in df.columns}
+
+
+def main(num_rows=10_000_000):
+    num_cities = max(1, num_rows // 3650)
+    df = make_dataset(num_cities)
+    before = bytes_per_row(df)
+    df = compact_temperature_data(df)
+    after = bytes_per_row(df)
+
+    print(f"Строк: {len(df):,}, городов: {num_cities}")
+    print(f"{'столбец':<12} {'до, Б':>8} {'после, Б':>9}")
+    for col in before:
+        print(f"{col:<12} {before[col]:>8.1f} {after[col]:>9.1f}")
+    print(f"{'итого':<12} {sum(before.values()):>8.1f} {sum(after.values()):>9.1f}")
+
+    # Проверка работы анализатора и визуализатора на компактной схеме
+    start_time = time.perf_counter()
+    analyzer = TemperatureAnalyzer(df, copy=False)
+    city_name = df['city'].iloc[-1]
+    analyzer.get_basic_stats(city_name)
+    analyzer.get_seasonal_stats(city_name)
+    analyzer.calculate_trends(city_name)
+    analyzer.check_current_temperature(city_name, 20.0, 'summer')
+    city_data = analyzer.detect_anomalies(city_name)['city_data']
+    analyzer.detect_anomalies_all()
+
+    visualizer = DataVisualizer()
+    visualizer.plot_temperature_timeseries(analyzer.calculate_moving_average(city_name))
+    visualizer.plot_temperature_distribution(city_data)
+    visualizer.plot_seasonal_boxplot(city_data)
+    compare_data = df[df['city'].isin(df['city'].cat.categories[:3])].copy()
+    visualizer.plot_city_comparison(compare_data)
+    visualizer.plot_monthly_averages(compare_data)
+    print(f"Анализатор и визуализатор на компактной схеме: OK ({time.perf_counter() - start_time:.1f} с)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
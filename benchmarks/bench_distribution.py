@@ -0,0 +1,60 @@
+"""
+Бенчмарк: гистограмма и боксплоты по сырым измерениям (расчет в браузере)
+против статистики, посчитанной на сервере (histogram_summary / box_summary),
+- размер сериализованной фигуры, время построения и повторный запрос
+статистики из кэша анализатора.
+
+Запуск: python -m benchmarks.bench_distribution
+"""
+import time
+
+import plotly.express as px
+import plotly.graph_objects as go
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+from utils.visualizer import DataVisualizer
+
+
+def _timed_json_size(build):
+    start_time = time.perf_counter()
+    size = len(build().to_json())
+    return size, (time.perf_counter() - start_time) * 1000
+
+
+def main(num_cities=15, compare_count=5):
+    df = make_dataset(num_cities)
+    analyzer = TemperatureAnalyzer(df, copy=False)
+    cities = list(analyzer._city_slices)
+    city = cities[0]
+    city_data = analyzer._get_city_frame(city)
+    compare_data = df[df['city'].isin(cities[:compare_count])].astype({'city': object})
+
+    raw_figures = {
+        'гистограмма': lambda: go.Figure(go.Histogram(x=city_data['temperature'], nbinsx=50)),
+        'сезоны': lambda: px.box(city_data.astype({'season': object}), x='season', y='temperature'),
+        'города': lambda: px.box(compare_data, x='city', y='temperature'),
+    }
+    summary_figures = {
+        'гистограмма': lambda: DataVisualizer.plot_histogram_summary(analyzer.get_temperature_histogram(city)),
+        'сезоны': lambda: DataVisualizer.plot_box_summaries(
+            {season: analyzer.get_box_stats(city, season)
+             for season in ['winter', 'spring', 'summer', 'autumn']}, 'Сезоны', 'Сезон'),
+        'города': lambda: DataVisualizer.plot_box_summaries(
+            {city_name: analyzer.get_box_stats(city_name) for city_name in cities[:compare_count]},
+            'Города', 'Город'),
+    }
+
+    print(f"Строк на город: {len(city_data):,}, городов в сравнении: {compare_count}")
+    print(f"{'график':>12} {'сырые, КБ':>10} {'сводка, КБ':>11} {'сжатие':>7} "
+          f"{'сырые, мс':>10} {'сводка, мс':>11} {'из кэша, мс':>12}")
+    for name, build_raw in raw_figures.items():
+        raw_size, raw_ms = _timed_json_size(build_raw)
+        summary_size, summary_ms = _timed_json_size(summary_figures[name])
+        _, cached_ms = _timed_json_size(summary_figures[name])
+        print(f"{name:>12} {raw_size / 1024:>10.0f} {summary_size / 1024:>11.1f} "
+              f"{raw_size / summary_size:>6.0f}x {raw_ms:>10.1f} {summary_ms:>11.1f} {cached_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
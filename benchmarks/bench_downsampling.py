@@ -0,0 +1,50 @@
+"""
+Бенчмарк: размер сериализованной фигуры plot_temperature_timeseries и время
+ее построения без прореживания и с прореживанием LTTB / min-max до
+PLOT_MAX_POINTS точек для рядов разной длины.
+
+Запуск: python -m benchmarks.bench_downsampling
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import PLOT_MAX_POINTS
+from utils.visualizer import DataVisualizer
+
+
+def make_series(num_years, seed=0):
+    """Ежедневный ряд одного города со скользящим средним и аномалиями"""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range('1900-01-01', periods=num_years * 365, freq='D')
+    seasonal = 10 - 15 * np.cos(2 * np.pi * timestamps.dayofyear.to_numpy() / 365.25)
+    temperature = seasonal + rng.normal(0, 5, len(timestamps))
+    data = pd.DataFrame({'timestamp': timestamps, 'temperature': temperature})
+    data['moving_avg'] = data['temperature'].rolling(30, center=True, min_periods=1).mean()
+    data['is_anomaly'] = (data['temperature'] - data['moving_avg']).abs() > 2 * 5
+    return data
+
+
+def main(year_counts=(10, 50, 100, 200)):
+    print(f"Бюджет точек: {PLOT_MAX_POINTS}")
+    print(f"{'лет':>5} {'точек':>8} {'метод':>7} {'точек на линии':>15} "
+          f"{'JSON, КБ':>9} {'сжатие':>7} {'построение, мс':>15}")
+    for num_years in year_counts:
+        data = make_series(num_years)
+        full_size = None
+        for label, method, max_points in (('нет', 'lttb', None), ('lttb', 'lttb', PLOT_MAX_POINTS),
+                                          ('minmax', 'minmax', PLOT_MAX_POINTS)):
+            start_time = time.perf_counter()
+            fig = DataVisualizer.plot_temperature_timeseries(
+                data, max_points=max_points, method=method
+            )
+            size = len(fig.to_json())
+            build_ms = (time.perf_counter() - start_time) * 1000
+            full_size = full_size or size
+            print(f"{num_years:>5} {len(data):>8,} {label:>7} {len(fig.data[0].x):>15,} "
+                  f"{size / 1024:>9.0f} {full_size / size:>6.1f}x {build_ms:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Бенчмарк: построение графиков DataVisualizer при каждом перезапуске против
+FigureCache (JSON фигур Plotly и PNG matplotlib) - первое построение,
+повторный запрос из кэша и счетчики кэша.
+
+Запуск: python -m benchmarks.bench_figure_cache
+"""
+import time
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+from utils.data_loader import data_fingerprint
+from utils.figure_cache import FigureCache
+from utils.visualizer import DataVisualizer
+
+
+def main(num_cities=15, repeats=20):
+    df = make_dataset(num_cities)
+    analyzer = TemperatureAnalyzer(df, copy=False)
+    fingerprint = data_fingerprint(df)
+    city = next(iter(analyzer._city_slices))
+    city_data = analyzer.calculate_moving_average(city, 30)
+    current_analysis = analyzer.check_current_temperature(city, 25.0, 'summer')
+
+    figures = {
+        'timeseries': ('plotly', lambda: DataVisualizer.plot_temperature_timeseries(city_data)),
+        'distribution': ('plotly', lambda: DataVisualizer.plot_temperature_distribution(city_data)),
+        'seasonal_box': ('plotly', lambda: DataVisualizer.plot_seasonal_boxplot(city_data)),
+        'current_temp': ('png', lambda: DataVisualizer.plot_current_temp_comparison(
+            current_analysis, city, 'summer')),
+    }
+
+    cache = FigureCache()
+    print(f"{'график':>14} {'построение, мс':>15} {'из кэша, мс':>12} {'ускорение':>10}")
+    for name, (kind, build) in figures.items():
+        get = cache.plotly_figure if kind == 'plotly' else cache.matplotlib_png
+        start_time = time.perf_counter()
+        get(name, build, city=city, fingerprint=fingerprint)
+        build_ms = (time.perf_counter() - start_time) * 1000
+
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            get(name, build, city=city, fingerprint=fingerprint)
+        cached_ms = (time.perf_counter() - start_time) * 1000 / repeats
+        print(f"{name:>14} {build_ms:>15.1f} {cached_ms:>12.2f} {build_ms / cached_ms:>9.0f}x")
+
+    stats = cache.stats()
+    print(f"Попаданий: {stats['hits']}, промахов: {stats['misses']}, доля попаданий: {stats['hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Бенчмарк: память рабочих процессов - история в памяти процесса против
+memory-mapped хранилища (HistoryStore).
+
+Каждый рабочий процесс загружает историю, строит TemperatureAnalyzer и
+считает статистику по всем городам. Из /proc/self/status берутся RssAnon
+(собственная память процесса) и RssFile (страницы файлов, общие для всех
+процессов через кэш ОС) до и после загрузки.
+
+Запуск: python -m benchmarks.bench_history_store
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+from utils.data_loader import read_temperature_file, save_temperature_data
+from utils.history_store import HistoryStore, write_history_store
+
+
+def read_rss():
+    """RssAnon и RssFile текущего процесса в байтах"""
+    rss = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('RssAnon', 'RssFile'):
+                rss[key] = int(value.split()[0]) * 1024
+    return rss
+
+
+def worker(mode, csv_path, cache_path, store_path, results):
+    before = read_rss()
+    start_time = time.perf_counter()
+    if mode == 'store':
+        analyzer = TemperatureAnalyzer.from_store(HistoryStore(store_path))
+    else:
+        analyzer = TemperatureAnalyzer(read_temperature_file(csv_path, cache_path, compact=True), copy=False)
+    analyzer.detect_anomalies_all()
+    for city_name in analyzer._city_slices:
+        analyzer.get_basic_stats(city_name)
+    elapsed = time.perf_counter() - start_time
+    after = read_rss()
+    results.put((mode, after['RssAnon'] - before['RssAnon'],
+                 after['RssFile'] - before['RssFile'], elapsed))
+
+
+def run_workers(mode, num_workers, csv_path, cache_path, store_path):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, csv_path, cache_path, store_path, results))
+        for _ in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return measurements
+
+
+def main(num_cities=150, num_workers=4):
+    df = make_dataset(num_cities)
+    print(f"Строк: {len(df):,}, рабочих процессов: {num_workers}")
+    print(f"{'режим':>8} {'RssAnon, МБ':>12} {'RssFile, МБ':>12} {'время, с':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "data.csv")
+        cache_path = os.path.join(tmp_dir, "data.parquet")
+        store_path = os.path.join(tmp_dir, "history_store")
+        save_temperature_data(df, csv_path, cache_path)
+        write_history_store(df, store_path)
+
+        for mode in ('memory', 'store'):
+            for _, anon, file_backed, elapsed in run_workers(
+                mode, num_workers, csv_path, cache_path, store_path
+            ):
+                print(f"{mode:>8} {anon / 2**20:>12.1f} {file_backed / 2**20:>12.1f} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
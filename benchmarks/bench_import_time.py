@@ -0,0 +1,96 @@
+"""
+Бенчмарк и проверка холодного старта: профиль импорта (python -X importtime)
+точек входа пакета utils в отдельных процессах.
+
+Для каждой точки входа проверяются бюджет времени импорта и список модулей,
+которые не должны загружаться (scipy, plotly.express, matplotlib, requests,
+aiohttp, streamlit подгружаются только по требованию). При нарушении скрипт
+завершается с кодом 1, поэтому его можно запускать как регрессионный тест.
+
+Запуск: python -m benchmarks.bench_import_time
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('scipy', 'plotly.express', 'matplotlib', 'requests', 'aiohttp', 'streamlit')
+
+# (название, код, бюджет в мс, модули, которые не должны импортироваться)
+ENTRY_POINTS = [
+    ('пакет utils', 'import utils', 50, HEAVY_MODULES + ('pandas', 'numpy')),
+    ('CLI', 'import utils.cli', 100, HEAVY_MODULES + ('pandas', 'numpy')),
+    ('анализатор', 'from utils import TemperatureAnalyzer', 1500, HEAVY_MODULES),
+    ('процесс пула', 'from utils.parallel import ParallelAnalyzer', 1500, HEAVY_MODULES),
+    ('графики', 'from utils import DataVisualizer, FigureCache', 1500,
+     ('plotly.express', 'matplotlib', 'scipy', 'streamlit')),
+    ('API', 'from utils import WeatherAPIHandler', 200, HEAVY_MODULES),
+]
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def import_profile(code):
+    """
+    Профиль импорта кода в новом процессе: {модуль: (собственное, суммарное
+    время в мкс, уровень вложенности)}
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            profile[module] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return profile
+
+
+def total_ms(profile, baseline=()):
+    """
+    Время импорта - сумма суммарных времен модулей верхнего уровня без
+    модулей, которые загружает сам интерпретатор при старте (baseline)
+    """
+    return sum(
+        cumulative for module, (_, cumulative, level) in profile.items()
+        if level == 0 and module not in baseline
+    ) / 1000
+
+
+def main(repeats=3, top=5):
+    baseline = set(import_profile('pass'))
+    failures = []
+    for name, code, budget_ms, forbidden in ENTRY_POINTS:
+        # Минимум по нескольким запускам отсекает шум файлового кэша
+        profiles = [import_profile(code) for _ in range(repeats)]
+        profile = min(profiles, key=lambda profile: total_ms(profile, baseline))
+        elapsed_ms = total_ms(profile, baseline)
+        loaded = [module for module in forbidden
+                  if any(m == module or m.startswith(module + '.') for m in profile)]
+        status = 'OK' if elapsed_ms <= budget_ms and not loaded else 'FAIL'
+        print(f"{status:<4} {name:<14} {elapsed_ms:>8.1f} мс (бюджет {budget_ms} мс)  {code}")
+
+        heaviest = sorted(
+            ((module, times) for module, times in profile.items() if module not in baseline),
+            key=lambda item: -item[1][0]
+        )[:top]
+        for module, (self_us, _, _) in heaviest:
+            print(f"         {self_us / 1000:>8.1f} мс  {module}")
+        if elapsed_ms > budget_ms:
+            failures.append(f"{name}: {elapsed_ms:.0f} мс > {budget_ms} мс")
+        if loaded:
+            failures.append(f"{name}: загружены {', '.join(loaded)}")
+
+    if failures:
+        print("\nПревышен бюджет холодного старта:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Бенчмарк накладных расходов utils.instrumentation: пустая функция и
+реальные операции анализатора без декоратора, с включенными и с
+выключенными замерами.
+
+Запуск: python -m benchmarks.bench_instrumentation
+"""
+import timeit
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+from utils.instrumentation import MetricsRegistry, metrics
+
+
+def noop():
+    pass
+
+
+def per_call_ns(func, number):
+    """Минимальное по 5 повторам время вызова, нс"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e9
+
+
+def main(number=200_000):
+    registry = MetricsRegistry()
+    timed_noop = registry.timed('noop')(noop)
+
+    baseline_ns = per_call_ns(noop, number)
+    registry.enabled = True
+    enabled_ns = per_call_ns(timed_noop, number)
+    registry.enabled = False
+    disabled_ns = per_call_ns(timed_noop, number)
+    print(f"Пустая функция: {baseline_ns:.0f} нс, обертка выключена: +{disabled_ns - baseline_ns:.0f} нс, "
+          f"включена: +{enabled_ns - baseline_ns:.0f} нс")
+
+    df = make_dataset(15)
+    city = df['city'].iloc[0]
+    analyzer = TemperatureAnalyzer(df, copy=False)
+    # Исходные методы без декоратора доступны через __wrapped__
+    operations = [
+        ('get_basic_stats', lambda: analyzer.get_basic_stats(city),
+         lambda: TemperatureAnalyzer.get_basic_stats.__wrapped__(analyzer, city)),
+        ('calculate_moving_average', lambda: analyzer.calculate_moving_average(city, 30),
+         lambda: TemperatureAnalyzer.calculate_moving_average.__wrapped__(analyzer, city, 30)),
+    ]
+    print(f"\n{'операция':<26} {'без обертки, мкс':>17} {'выключено':>10} {'включено':>10}")
+    for name, timed_call, raw_call in operations:
+        raw_us = per_call_ns(raw_call, 1000) / 1000
+        metrics.enabled = False
+        disabled_us = per_call_ns(timed_call, 1000) / 1000
+        metrics.enabled = True
+        enabled_us = per_call_ns(timed_call, 1000) / 1000
+        print(f"{name:<26} {raw_us:>17.1f} {disabled_us:>10.1f} {enabled_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
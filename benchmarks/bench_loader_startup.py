@@ -0,0 +1,42 @@
+"""
+Бенчмарк: холодный старт загрузки данных - CSV против бинарного кэша (Parquet).
+
+Наборы данных в 1x, 10x и 100x от исходного (15 городов x 10 лет)
+генерируются во временный каталог.
+
+Запуск: python -m benchmarks.bench_loader_startup
+"""
+import os
+import tempfile
+import time
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.data_loader import read_temperature_file, save_temperature_data
+
+
+def time_load(csv_path, cache_path, repeats):
+    """Среднее время чтения файла в секундах"""
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        read_temperature_file(csv_path, cache_path)
+    return (time.perf_counter() - start_time) / repeats
+
+
+def main(scales=(1, 10, 100), repeats=3):
+    print(f"{'масштаб':>8} {'строк':>12} {'CSV, с':>8} {'Parquet, с':>11} {'ускорение':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in scales:
+            csv_path = os.path.join(tmp_dir, f"data_{scale}.csv")
+            cache_path = os.path.join(tmp_dir, f"data_{scale}.parquet")
+            df = make_dataset(15 * scale)
+            save_temperature_data(df, csv_path, cache_path)
+
+            csv_time = time_load(csv_path, None, repeats)
+            cache_time = time_load(csv_path, cache_path, repeats)
+
+            print(f"{scale:>7}x {len(df):>12,} {csv_time:>8.3f} {cache_time:>11.3f} "
+                  f"{csv_time / cache_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Бенчмарк инкрементальной статистики (OnlineTemperatureStats): добавление
+новых показаний против пересчета по всей истории, и сверка результатов
+с pandas. В новых показаниях есть пропуски (NaN), как в потоке API, -
+они должны пропускаться так же, как в pandas (skipna).
+
+Запуск: python -m benchmarks.bench_online_stats
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.online_stats import OnlineTemperatureStats
+
+
+def make_readings(df, num_readings, nan_share=0.05, seed=1):
+    """Новые показания по случайным строкам истории, часть температур - NaN"""
+    rng = np.random.default_rng(seed)
+    readings = df.iloc[rng.integers(0, len(df), num_readings)][['city', 'season', 'temperature']].copy()
+    readings['temperature'] = readings['temperature'] + rng.normal(0, 1, num_readings)
+    readings.loc[rng.random(num_readings) < nan_share, 'temperature'] = np.nan
+    return readings.reset_index(drop=True)
+
+
+def check_against_pandas(online_stats, df):
+    """Расхождения count/mean/std/min/max с groupby по всем данным"""
+    expected = df.groupby(['city', 'season'], observed=True)['temperature'].agg(
+        ['count', 'mean', 'std', 'min', 'max'])
+    failures = []
+    for (city_name, season), row in expected.iterrows():
+        group_stats = online_stats.get(city_name, season)
+        actual = [group_stats.count, group_stats.mean, group_stats.std, group_stats.min, group_stats.max]
+        if not np.allclose(actual, row.to_numpy(dtype=np.float64), rtol=1e-9, equal_nan=True):
+            failures.append(f"{city_name}/{season}: {actual} != {row.tolist()}")
+    return failures
+
+
+def main(num_cities=150, num_readings=10_000):
+    df = make_dataset(num_cities)
+    readings = make_readings(df, num_readings)
+    print(f"История: {len(df):,} строк, новых показаний: {num_readings:,} "
+          f"(NaN: {readings['temperature'].isna().sum():,})")
+
+    online_stats = OnlineTemperatureStats.from_dataframe(df)
+    start_time = time.perf_counter()
+    online_stats.update(readings)
+    update_time = time.perf_counter() - start_time
+
+    # По одному показанию, как при опросе API
+    single_stats = OnlineTemperatureStats.from_dataframe(df)
+    start_time = time.perf_counter()
+    for city_name, season, temperature in readings.itertuples(index=False):
+        single_stats.add(city_name, season, temperature)
+    add_time = time.perf_counter() - start_time
+
+    combined = pd.concat([df[['city', 'season', 'temperature']], readings], ignore_index=True)
+    start_time = time.perf_counter()
+    OnlineTemperatureStats.from_dataframe(combined)
+    rebuild_time = time.perf_counter() - start_time
+
+    print(f"update (пачка):      {update_time * 1000:>9.1f} мс")
+    print(f"add (по одному):     {add_time * 1000:>9.1f} мс")
+    print(f"пересчет с нуля:     {rebuild_time * 1000:>9.1f} мс")
+
+    failures = check_against_pandas(online_stats, combined) + check_against_pandas(single_stats, combined)
+    if failures:
+        print("Статистика расходится с pandas:")
+        for failure in failures[:20]:
+            print(f"  {failure}")
+        return 1
+    print("Статистика совпадает с pandas (NaN пропускаются)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Бенчмарк: полный анализ всех городов последовательно и в пуле процессов
+(ParallelAnalyzer) в зависимости от числа процессов и размера данных.
+
+Время запуска пула выводится отдельно и не входит во время анализа.
+Перед замерами результаты пула сверяются с последовательным анализом на
+кадрах из Parquet-кэша (категории сезонов там в алфавитном порядке).
+
+Запуск: python -m benchmarks.bench_parallel
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+from utils.data_loader import read_temperature_file, save_temperature_data
+from utils.parallel import ParallelAnalyzer, analyze_cities
+
+
+def _mismatches(expected, actual, path=''):
+    """Пути, по которым вложенные результаты анализа различаются"""
+    if isinstance(expected, dict):
+        if not isinstance(actual, dict) or expected.keys() != actual.keys():
+            return [path or '/']
+        return [m for key in expected for m in _mismatches(expected[key], actual[key], f"{path}/{key}")]
+    if isinstance(expected, float) or isinstance(actual, float):
+        if math.isnan(expected) and math.isnan(actual):
+            return []
+        return [] if math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-12) else [path]
+    return [] if expected == actual else [path]
+
+
+def check_consistency(num_cities=15, workers=2):
+    """
+    Сверка ParallelAnalyzer с analyze_cities на кадрах из Parquet-кэша:
+    исходном (category в порядке Parquet) и в компактной схеме
+    Возвращает список расхождений (пустой, если результаты совпадают).
+    """
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'data.csv')
+        cache_path = os.path.join(tmp_dir, 'data.parquet')
+        save_temperature_data(make_dataset(num_cities, num_years=2), csv_path, cache_path)
+        frames = {
+            'parquet': pd.read_parquet(cache_path),
+            'compact': read_temperature_file(csv_path, cache_path, compact=True)
+        }
+        for name, frame in frames.items():
+            cities = list(frame['city'].unique())
+            expected = analyze_cities(TemperatureAnalyzer(frame, copy=False), cities)
+            with ParallelAnalyzer(frame, max_workers=workers) as parallel_analyzer:
+                actual = parallel_analyzer.analyze(cities)
+            failures += [f"{name}: {path}" for path in _mismatches(expected, actual)]
+    return failures
+
+
+def main(city_counts=(15, 150, 600), worker_counts=None):
+    failures = check_consistency()
+    if failures:
+        print("Результаты пула расходятся с последовательным анализом:")
+        for failure in failures[:20]:
+            print(f"  {failure}")
+        return 1
+    print("Результаты пула совпадают с последовательным анализом (Parquet, компактная схема)")
+
+    if worker_counts is None:
+        max_cores = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, 8, max_cores} & set(range(1, max_cores + 1)))
+    print(f"Доступно ядер: {os.cpu_count()}")
+    print(f"{'городов':>8} {'строк':>10} {'процессов':>10} {'посл., с':>9} "
+          f"{'парал., с':>10} {'запуск, с':>10} {'ускорение':>10}")
+    for num_cities in city_counts:
+        df = make_dataset(num_cities)
+        cities = list(df['city'].unique())
+        start_time = time.perf_counter()
+        analyze_cities(TemperatureAnalyzer(df, copy=False), cities)
+        seq_time = time.perf_counter() - start_time
+
+        for workers in worker_counts:
+            with ParallelAnalyzer(df, max_workers=workers) as parallel_analyzer:
+                startup_time = parallel_analyzer.start()
+                start_time = time.perf_counter()
+                parallel_analyzer.analyze(cities)
+                par_time = time.perf_counter() - start_time
+            print(f"{num_cities:>8} {len(df):>10,} {workers:>10} {seq_time:>9.3f} "
+                  f"{par_time:>10.3f} {startup_time:>10.2f} {seq_time / par_time:>9.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Бенчмарк: скользящие статистики (mean, std, min, max) для окон 7/30/90/365 -
+pandas rolling по каждому городу и окну против rolling_window_stats за один
+проход по всем городам, повторный запрос из RollingStatsCache и проход
+ползунка окна 7..90 дней по одному городу (каждое новое окно - промах кэша).
+
+Запуск: python -m benchmarks.bench_rolling
+"""
+import time
+
+import numpy as np
+
+from benchmarks.bench_analyzer_index import make_dataset
+from config import ROLLING_WINDOWS
+from utils.analyzer import TemperatureAnalyzer
+from utils.rolling import ROLLING_STATS, RollingStatsCache, rolling_window_stats
+
+
+def main(city_counts=(15, 150, 1000)):
+    print(f"{'городов':>8} {'строк':>10} {'pandas, мс':>11} {'один проход, мс':>16} "
+          f"{'ускорение':>10} {'из кэша, мкс':>13} {'ползунок, мс/окно':>18}")
+    for num_cities in city_counts:
+        analyzer = TemperatureAnalyzer(make_dataset(num_cities), copy=False)
+        cities = list(analyzer._city_slices)
+        values = analyzer._partitioned['temperature'].to_numpy(dtype='float64')
+
+        start_time = time.perf_counter()
+        for city_name in cities:
+            temperature = analyzer._get_city_frame(city_name)['temperature']
+            for window in ROLLING_WINDOWS:
+                rolling = temperature.rolling(window=window, center=True, min_periods=1)
+                for stat in ROLLING_STATS:
+                    getattr(rolling, stat)()
+        pandas_ms = (time.perf_counter() - start_time) * 1000
+
+        lengths = [analyzer._city_slices[city_name].stop - analyzer._city_slices[city_name].start
+                   for city_name in cities]
+        start_time = time.perf_counter()
+        rolling_window_stats(values, lengths, ROLLING_WINDOWS)
+        single_pass_ms = (time.perf_counter() - start_time) * 1000
+
+        cache = RollingStatsCache(values, analyzer._city_slices)
+        cache.get(cities[0], 30)
+        start_time = time.perf_counter()
+        for _ in range(1000):
+            cache.get(cities[0], 30)
+        cached_us = (time.perf_counter() - start_time) * 1000
+
+        slider_windows = range(7, 91)
+        cache = RollingStatsCache(values, analyzer._city_slices)
+        start_time = time.perf_counter()
+        for window in slider_windows:
+            cache.get(cities[0], window)
+        slider_ms = (time.perf_counter() - start_time) * 1000 / len(slider_windows)
+
+        temperature = analyzer._get_city_frame(cities[0])['temperature']
+        for window in (7, 30, 45, 90):
+            expected = temperature.rolling(window=window, center=True, min_periods=1).mean().to_numpy()
+            assert np.allclose(cache.get(cities[0], window)['mean'], expected), window
+
+        print(f"{num_cities:>8} {len(values):>10,} {pandas_ms:>11.1f} {single_pass_ms:>16.1f} "
+              f"{pandas_ms / single_pass_ms:>9.1f}x {cached_us:>13.2f} {slider_ms:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Бенчмарк: тренды по всем городам - calculate_trends в цикле по городам
+против одного векторного calculate_trends_all.
+
+Запуск: python -m benchmarks.bench_trends
+"""
+import time
+
+from benchmarks.bench_analyzer_index import make_dataset
+from utils.analyzer import TemperatureAnalyzer
+
+
+def main(city_counts=(15, 150, 2000)):
+    print(f"{'городов':>8} {'строк':>10} {'группы':>16} {'групп':>6} "
+          f"{'цикл, мс':>9} {'векторно, мс':>13}")
+    for num_cities in city_counts:
+        analyzer = TemperatureAnalyzer(make_dataset(num_cities), copy=False)
+        cities = list(analyzer.df['city'].unique())
+
+        start_time = time.perf_counter()
+        for city_name in cities:
+            analyzer.calculate_trends(city_name)
+        loop_ms = (time.perf_counter() - start_time) * 1000
+
+        for by in ('city', ('city', 'season'), ('city', 'decade')):
+            analyzer.calculate_trends_all(by)  # коды ключей кэшируются при первом вызове
+            start_time = time.perf_counter()
+            trends = analyzer.calculate_trends_all(by)
+            vector_ms = (time.perf_counter() - start_time) * 1000
+            label = by if isinstance(by, str) else '+'.join(by)
+            print(f"{num_cities:>8} {len(analyzer.df):>10,} {label:>16} {len(trends):>6} "
+                  f"{loop_ms if by == 'city' else float('nan'):>9.1f} {vector_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
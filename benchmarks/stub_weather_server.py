@@ -0,0 +1,325 @@
+"""
+Локальная заглушка OpenWeatherMap (/data/2.5/weather) для бенчмарков и
+нагрузочных тестов.
+
+Отвечает правдоподобными данными в формате /data/2.5/weather (температура
+зависит от города и месяца, поддерживаются units=metric/imperial/standard)
+и умеет имитировать поведение реального API:
+- задержку ответа с заданным распределением (см. make_latency);
+- долю ошибок с заданным кодом (429, 5xx);
+- квоту запросов на API ключ за окно (ответ 429, как у OpenWeatherMap);
+- 401 без API ключа и 404 для неизвестных городов;
+- медленную отдачу тела небольшими порциями (slow drip).
+Считает TCP-соединения, запросы и ответы по кодам.
+
+Запуск: python -m benchmarks.stub_weather_server --port 8080 --latency lognormal:0.02:0.5
+"""
+import argparse
+import json
+import math
+import random
+import socket
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# (id, main, описание на английском, описание на русском, иконка)
+WEATHER_CONDITIONS = [
+    (800, 'Clear', 'clear sky', 'ясно', '01d'),
+    (801, 'Clouds', 'few clouds', 'небольшая облачность', '02d'),
+    (803, 'Clouds', 'broken clouds', 'облачно с прояснениями', '04d'),
+    (804, 'Clouds', 'overcast clouds', 'пасмурно', '04d'),
+    (500, 'Rain', 'light rain', 'небольшой дождь', '10d'),
+    (600, 'Snow', 'light snow', 'небольшой снег', '13d'),
+    (701, 'Mist', 'mist', 'туман', '50d'),
+]
+QUOTA_MESSAGE = ("Your account is temporarily blocked due to exceeding of requests limitation "
+                 "of your subscription type. Please choose the proper subscription "
+                 "http://openweathermap.org/price")
+INVALID_KEY_MESSAGE = "Invalid API key. Please see https://openweathermap.org/faq#error401 for more info."
+
+
+def constant_latency(seconds):
+    return lambda rng: seconds
+
+
+def uniform_latency(low, high):
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential_latency(mean):
+    return lambda rng: rng.expovariate(1 / mean)
+
+
+def lognormal_latency(median, sigma):
+    """Логнормальная задержка: типичная форма с длинным хвостом"""
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+def make_latency(spec):
+    """
+    Распределение задержки из числа (секунды) или строки вида
+    'const:0.01', 'uniform:0.005:0.02', 'exp:0.01', 'lognormal:0.01:0.5'
+    Функция-распределение принимает random.Random и возвращает секунды.
+    """
+    if callable(spec):
+        return spec
+    if spec is None:
+        return constant_latency(0.0)
+    if isinstance(spec, (int, float)):
+        return constant_latency(float(spec))
+    name, *args = spec.split(':')
+    factories = {
+        'const': constant_latency,
+        'uniform': uniform_latency,
+        'exp': exponential_latency,
+        'lognormal': lognormal_latency,
+    }
+    if name not in factories:
+        raise ValueError(f"Неизвестное распределение задержки: {name}")
+    return factories[name](*map(float, args))
+
+
+def _city_seed(city_name):
+    return zlib.crc32(city_name.lower().encode())
+
+
+def _convert_temperature(celsius, units):
+    if units == 'imperial':
+        return celsius * 9 / 5 + 32
+    if units == 'metric':
+        return celsius
+    return celsius + 273.15
+
+
+def make_weather_payload(city_name, temperature=None, units='metric', lang='ru', now=None, rng=None):
+    """
+    Ответ в формате /data/2.5/weather
+    Без явной temperature она зависит от города (широта по хешу названия)
+    и месяца, плюс случайное отклонение rng.
+    """
+    now = time.time() if now is None else now
+    seed = _city_seed(city_name)
+    latitude = (seed % 12000) / 100 - 60
+    longitude = (seed // 12000 % 36000) / 100 - 180
+    if temperature is None:
+        month = datetime.fromtimestamp(now).month
+        # Сезонная волна: максимум в июле на севере и в январе на юге
+        amplitude = abs(latitude) / 4 * (1 if latitude >= 0 else -1)
+        temperature = (27 - abs(latitude) * 0.4
+                       - amplitude * math.cos(2 * math.pi * (month - 1) / 12))
+        if rng is not None:
+            temperature += rng.gauss(0, 3)
+    condition_id, main, description_en, description_ru, icon = WEATHER_CONDITIONS[
+        seed % len(WEATHER_CONDITIONS)]
+    humidity = 40 + seed % 55
+    wind_speed = round((seed % 120) / 10, 1)
+    if units == 'imperial':
+        wind_speed = round(wind_speed * 2.237, 1)
+    temp = round(_convert_temperature(temperature, units), 2)
+    return {
+        'coord': {'lon': round(longitude, 4), 'lat': round(latitude, 4)},
+        'weather': [{'id': condition_id, 'main': main,
+                     'description': description_ru if lang == 'ru' else description_en,
+                     'icon': icon}],
+        'base': 'stations',
+        'main': {'temp': temp,
+                 'feels_like': round(_convert_temperature(temperature - 1 - wind_speed / 10, units), 2),
+                 'temp_min': round(_convert_temperature(temperature - 1.5, units), 2),
+                 'temp_max': round(_convert_temperature(temperature + 1.5, units), 2),
+                 'pressure': 1000 + seed % 30, 'humidity': humidity},
+        'visibility': 10000,
+        'wind': {'speed': wind_speed, 'deg': seed % 360},
+        'clouds': {'all': seed % 101},
+        'dt': int(now),
+        'sys': {'type': 2, 'id': seed % 100000, 'country': 'RU',
+                'sunrise': int(now) - 6 * 3600, 'sunset': int(now) + 6 * 3600},
+        'timezone': 10800,
+        'id': seed % 10 ** 7,
+        'name': city_name,
+        'cod': 200,
+    }
+
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов заглушки (HTTP/1.1 с keep-alive)"""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Заголовки и тело пишутся отдельно - без TCP_NODELAY keep-alive
+        # соединения упираются в задержку Nagle/delayed ACK (~40 мс)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        city_name = query.get('q', ['Unknown'])[0]
+        api_key = query.get('appid', [''])[0]
+        units = query.get('units', ['standard'])[0]
+        lang = query.get('lang', ['en'])[0]
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            latency = server.latency(server.random)
+            failed = server.random.random() < server.error_rate
+            drip = server.random.random() < server.drip_rate
+            noise_seed = server.random.random()
+        if latency > 0:
+            time.sleep(latency)
+
+        # Порядок проверок как у API: ключ, квота, затем сам запрос
+        if not api_key or (server.api_keys is not None and api_key not in server.api_keys):
+            status, payload = 401, {'cod': 401, 'message': INVALID_KEY_MESSAGE}
+        elif not server.consume_quota(api_key):
+            status, payload = 429, {'cod': 429, 'message': QUOTA_MESSAGE}
+        elif failed:
+            status, payload = server.error_status, {'cod': server.error_status, 'message': 'stub error'}
+        elif city_name.lower() in server.unknown_cities:
+            status, payload = 404, {'cod': '404', 'message': 'city not found'}
+        else:
+            status = 200
+            payload = make_weather_payload(city_name, units=units, lang=lang,
+                                           rng=random.Random(noise_seed))
+
+        body = json.dumps(payload).encode()
+        with server.lock:
+            server.status_counts[status] += 1
+            server.dripped += drip
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if drip:
+            self.wfile.flush()
+            for start in range(0, len(body), server.drip_chunk):
+                self.wfile.write(body[start:start + server.drip_chunk])
+                self.wfile.flush()
+                time.sleep(server.drip_interval)
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubWeatherServer(ThreadingHTTPServer):
+    """Сервер-заглушка со счетчиками соединений, запросов и ответов
+
+    latency - число (секунды) или распределение (см. make_latency);
+    error_rate - доля ответов с кодом error_status (например, 429 или 503);
+    quota - запросов на API ключ за quota_window секунд, сверх нее - 429;
+    api_keys - допустимые ключи (None - любой непустой);
+    unknown_cities - города, на которые API отвечает 404;
+    drip_rate - доля ответов, тело которых отдается порциями по drip_chunk
+    байт с паузой drip_interval секунд.
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0,
+                 error_status=429, seed=None, quota=None, quota_window=60.0, api_keys=None,
+                 unknown_cities=(), drip_rate=0.0, drip_chunk=64, drip_interval=0.01):
+        super().__init__((host, port), StubWeatherHandler)
+        self.latency = make_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.quota = quota
+        self.quota_window = quota_window
+        self.api_keys = set(api_keys) if api_keys is not None else None
+        self.unknown_cities = {city.lower() for city in unknown_cities}
+        self.drip_rate = drip_rate
+        self.drip_chunk = drip_chunk
+        self.drip_interval = drip_interval
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self._quota_windows = {}
+        self.reset_counters()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/data/2.5/weather"
+
+    def consume_quota(self, api_key):
+        """
+        Учет запроса в квоте ключа (фиксированное окно quota_window секунд,
+        как минутный лимит OpenWeatherMap). False - квота исчерпана.
+        """
+        if self.quota is None:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            window_start, used = self._quota_windows.get(api_key, (now, 0))
+            if now - window_start >= self.quota_window:
+                window_start, used = now, 0
+            if used >= self.quota:
+                self._quota_windows[api_key] = (window_start, used)
+                return False
+            self._quota_windows[api_key] = (window_start, used + 1)
+            return True
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+            self.dripped = 0
+            self.status_counts = Counter()
+            self._quota_windows.clear()
+
+    def stats(self):
+        """Счетчики сервера: соединения, запросы, ответы по кодам"""
+        with self.lock:
+            return {
+                'connections': self.connections,
+                'requests': self.requests,
+                'dripped': self.dripped,
+                'status_counts': dict(self.status_counts),
+            }
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальная заглушка OpenWeatherMap /data/2.5/weather")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', default='0', help="секунды или 'lognormal:0.02:0.5' и т.п.")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--quota', type=int, help='запросов на ключ за окно --quota-window')
+    parser.add_argument('--quota-window', type=float, default=60.0)
+    parser.add_argument('--drip-rate', type=float, default=0.0)
+    parser.add_argument('--drip-interval', type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    latency = float(args.latency) if args.latency.replace('.', '', 1).isdigit() else args.latency
+    server = StubWeatherServer(
+        args.host, args.port, latency=latency, error_rate=args.error_rate,
+        error_status=args.error_status, quota=args.quota, quota_window=args.quota_window,
+        drip_rate=args.drip_rate, drip_interval=args.drip_interval
+    )
+    print(f"Заглушка API: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
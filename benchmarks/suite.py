@@ -0,0 +1,593 @@
+"""
+Набор бенчмарков (в стиле asv): загрузка и генерация данных, все методы
+TemperatureAnalyzer, построители графиков DataVisualizer и пакетные
+запросы WeatherAPIHandler к локальной заглушке API.
+
+Размеры наборов данных задаются как ГОРОДОВxЛЕТ (15x10 - 15 городов
+за 10 лет). Результаты сохраняются в JSON (benchmarks/results/) вместе
+с коммитом и версиями библиотек; команда compare сравнивает два файла
+и завершается с кодом 1 при замедлении сверх порога.
+
+Запуск:
+    python -m benchmarks.suite run                  # быстрые размеры
+    python -m benchmarks.suite run --full           # 15..10 000 городов, 1..100 лет
+    python -m benchmarks.suite run --sizes 150x10 --groups analyzer --filter trends
+    python -m benchmarks.suite compare base.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.bench_analyzer_index import make_dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+QUICK_SIZES = ('15x1', '15x10', '150x10')
+FULL_SIZES = ('15x1', '15x10', '15x100', '150x10', '1000x10', '10000x1')
+API_REQUESTS = 100  # запросов в пакетных бенчмарках API
+API_LATENCY = 0.005  # задержка ответа заглушки, секунды
+MIN_RUN_TIME = 0.05  # секунды на замер: быстрые вызовы повторяются в цикле
+REGRESSION_THRESHOLD = 1.2  # замедление медианы, после которого compare сообщает о регрессии
+API_KEY = 'x' * 32
+
+BENCHMARKS = []
+
+
+def benchmark(group, name, fresh=False):
+    """
+    Регистрация бенчмарка: функция получает контекст (набор данных или
+    заглушку API) и возвращает вызов для замера. fresh=True - функция
+    вызывается перед каждым замером (например, новый анализатор без кэшей),
+    и ее время в замер не входит.
+    """
+    def register(make_call):
+        BENCHMARKS.append({'group': group, 'name': name, 'make_call': make_call, 'fresh': fresh})
+        return make_call
+    return register
+
+
+class Dataset:
+    """Набор данных одного размера и подготовленные по нему объекты"""
+
+    def __init__(self, num_cities, num_years, tmp_dir):
+        self.num_cities = num_cities
+        self.num_years = num_years
+        self.tmp_dir = tmp_dir
+        self.df = make_dataset(num_cities, num_years)
+        self.cities = list(dict.fromkeys(self.df['city']))
+        self.city = self.cities[0]
+        self._csv_path = None
+        self._analyzer = None
+
+    @property
+    def params(self):
+        return {'cities': self.num_cities, 'years': self.num_years, 'rows': len(self.df)}
+
+    @property
+    def csv_path(self):
+        """CSV и бинарный кэш набора (записываются при первом обращении)"""
+        if self._csv_path is None:
+            from utils.data_loader import save_temperature_data
+            self._csv_path = os.path.join(self.tmp_dir, 'data.csv')
+            save_temperature_data(self.df, self._csv_path, self.parquet_path)
+        return self._csv_path
+
+    @property
+    def parquet_path(self):
+        return os.path.join(self.tmp_dir, 'data.parquet')
+
+    def new_analyzer(self):
+        from utils.analyzer import TemperatureAnalyzer
+        return TemperatureAnalyzer(self.df, copy=False)
+
+    @property
+    def analyzer(self):
+        """Общий анализатор с прогретыми кэшами"""
+        if self._analyzer is None:
+            self._analyzer = self.new_analyzer()
+        return self._analyzer
+
+    def city_frame(self):
+        """Данные города со скользящим средним и аномалиями (вход графиков)"""
+        city_data = self.analyzer.calculate_moving_average(self.city, 30)
+        city_data['is_anomaly'] = self.analyzer.detect_anomalies(self.city)['city_data']['is_anomaly'].to_numpy()
+        return city_data
+
+    def compare_frame(self, count=5):
+        return self.df[self.df['city'].isin(self.cities[:count])]
+
+
+class ApiContext:
+    """Заглушка API и город для пакетных запросов"""
+
+    def __init__(self, server, num_requests=API_REQUESTS):
+        self.server = server
+        self.cities = [f"City {i}" for i in range(num_requests)]
+
+    @property
+    def params(self):
+        return {'requests': len(self.cities)}
+
+    def handler(self, **kwargs):
+        from utils.api_handler import WeatherAPIHandler
+        return WeatherAPIHandler(API_KEY, api_url=self.server.url, **kwargs)
+
+
+# --- Загрузка и генерация данных ---
+
+@benchmark('loader', 'generate_realistic_temperature_data')
+def _generate(data):
+    return lambda: make_dataset(data.num_cities, data.num_years)
+
+
+@benchmark('loader', 'read_temperature_file_csv')
+def _read_csv(data):
+    from utils.data_loader import read_temperature_file
+    csv_path = data.csv_path
+    return lambda: read_temperature_file(csv_path, None)
+
+
+@benchmark('loader', 'read_temperature_file_parquet')
+def _read_parquet(data):
+    # Путь load_temperature_data при свежем кэше: чтение Parquet и компактная схема
+    from utils.data_loader import read_temperature_file
+    csv_path = data.csv_path
+    return lambda: read_temperature_file(csv_path, data.parquet_path, compact=True)
+
+
+@benchmark('loader', 'data_fingerprint')
+def _fingerprint(data):
+    from utils.data_loader import data_fingerprint
+    return lambda: data_fingerprint(data.df)
+
+
+# --- TemperatureAnalyzer ---
+
+@benchmark('analyzer', '__init__')
+def _analyzer_init(data):
+    return data.new_analyzer
+
+
+@benchmark('analyzer', '__init__(copy=True)')
+def _analyzer_init_copy(data):
+    from utils.analyzer import TemperatureAnalyzer
+    return lambda: TemperatureAnalyzer(data.df)
+
+
+@benchmark('analyzer', 'get_basic_stats(city)')
+def _basic_stats(data):
+    return lambda: data.analyzer.get_basic_stats(data.city)
+
+
+@benchmark('analyzer', 'get_basic_stats()')
+def _basic_stats_all(data):
+    return lambda: data.analyzer.get_basic_stats()
+
+
+@benchmark('analyzer', 'get_seasonal_stats')
+def _seasonal_stats(data):
+    return lambda: data.analyzer.get_seasonal_stats(data.city)
+
+
+@benchmark('analyzer', 'get_rolling_stats', fresh=True)
+def _rolling_stats(data):
+    analyzer = data.new_analyzer()
+    return lambda: analyzer.get_rolling_stats(data.city, 30)
+
+
+@benchmark('analyzer', 'calculate_moving_average')
+def _moving_average(data):
+    return lambda: data.analyzer.calculate_moving_average(data.city, 30)
+
+
+@benchmark('analyzer', 'detect_anomalies(global)')
+def _anomalies_global(data):
+    return lambda: data.analyzer.detect_anomalies(data.city, method='global')
+
+
+@benchmark('analyzer', 'detect_anomalies(climatology)')
+def _anomalies_climatology(data):
+    return lambda: data.analyzer.detect_anomalies(data.city, method='climatology')
+
+
+@benchmark('analyzer', 'get_climatology', fresh=True)
+def _climatology(data):
+    analyzer = data.new_analyzer()
+    return analyzer.get_climatology
+
+
+@benchmark('analyzer', 'detect_anomalies_all(global)')
+def _anomalies_all(data):
+    return lambda: data.analyzer.detect_anomalies_all(method='global')
+
+
+@benchmark('analyzer', 'detect_anomalies_all(climatology)')
+def _anomalies_all_climatology(data):
+    return lambda: data.analyzer.detect_anomalies_all(method='climatology')
+
+
+@benchmark('analyzer', 'get_seasonal_baseline', fresh=True)
+def _seasonal_baseline(data):
+    analyzer = data.new_analyzer()
+    return analyzer.get_seasonal_baseline
+
+
+@benchmark('analyzer', 'save_seasonal_baseline')
+def _save_baseline(data):
+    path = os.path.join(data.tmp_dir, 'baseline.csv')
+    return lambda: data.analyzer.save_seasonal_baseline(path)
+
+
+@benchmark('analyzer', 'load_seasonal_baseline')
+def _load_baseline(data):
+    path = os.path.join(data.tmp_dir, 'baseline.csv')
+    data.analyzer.save_seasonal_baseline(path)
+    return lambda: data.analyzer.load_seasonal_baseline(path)
+
+
+@benchmark('analyzer', 'check_current_temperature')
+def _check_current(data):
+    return lambda: data.analyzer.check_current_temperature(data.city, 25.0, 'summer')
+
+
+@benchmark('analyzer', 'check_current_temperatures')
+def _check_current_all(data):
+    import pandas as pd
+    readings = pd.DataFrame({'city': data.cities, 'temperature': 25.0, 'season': 'summer'})
+    return lambda: data.analyzer.check_current_temperatures(readings)
+
+
+@benchmark('analyzer', 'calculate_trends')
+def _trends(data):
+    return lambda: data.analyzer.calculate_trends(data.city)
+
+
+@benchmark('analyzer', 'calculate_trends_all(city)')
+def _trends_all(data):
+    return lambda: data.analyzer.calculate_trends_all(by='city')
+
+
+@benchmark('analyzer', 'calculate_trends_all(city, season)')
+def _trends_all_seasons(data):
+    return lambda: data.analyzer.calculate_trends_all(by=('city', 'season'))
+
+
+@benchmark('analyzer', 'get_temperature_histogram', fresh=True)
+def _histogram(data):
+    analyzer = data.new_analyzer()
+    return lambda: analyzer.get_temperature_histogram(data.city)
+
+
+@benchmark('analyzer', 'get_box_stats', fresh=True)
+def _box_stats(data):
+    analyzer = data.new_analyzer()
+    return lambda: analyzer.get_box_stats(data.city)
+
+
+# --- DataVisualizer ---
+
+@benchmark('visualizer', 'plot_temperature_timeseries')
+def _plot_timeseries(data):
+    from utils.visualizer import DataVisualizer
+    city_data = data.city_frame()
+    return lambda: DataVisualizer.plot_temperature_timeseries(city_data)
+
+
+@benchmark('visualizer', 'plot_temperature_distribution')
+def _plot_distribution(data):
+    from utils.visualizer import DataVisualizer
+    city_data = data.city_frame()
+    return lambda: DataVisualizer.plot_temperature_distribution(city_data)
+
+
+@benchmark('visualizer', 'plot_histogram_summary')
+def _plot_histogram_summary(data):
+    from utils.visualizer import DataVisualizer
+    summary = data.analyzer.get_temperature_histogram(data.city)
+    return lambda: DataVisualizer.plot_histogram_summary(summary)
+
+
+@benchmark('visualizer', 'plot_seasonal_boxplot')
+def _plot_seasonal_boxplot(data):
+    from utils.visualizer import DataVisualizer
+    city_data = data.city_frame()
+    return lambda: DataVisualizer.plot_seasonal_boxplot(city_data)
+
+
+@benchmark('visualizer', 'plot_box_summaries')
+def _plot_box_summaries(data):
+    from utils.visualizer import DataVisualizer
+    summaries = {city: data.analyzer.get_box_stats(city) for city in data.cities[:5]}
+    return lambda: DataVisualizer.plot_box_summaries(summaries, 'Города', 'Город')
+
+
+@benchmark('visualizer', 'plot_seasonal_profile')
+def _plot_seasonal_profile(data):
+    from utils.visualizer import DataVisualizer
+    seasonal_stats = data.analyzer.get_seasonal_stats(data.city)
+    return lambda: DataVisualizer.plot_seasonal_profile(seasonal_stats, data.city)
+
+
+@benchmark('visualizer', 'plot_city_comparison')
+def _plot_city_comparison(data):
+    from utils.visualizer import DataVisualizer
+    compare_data = data.compare_frame()
+    return lambda: DataVisualizer.plot_city_comparison(compare_data)
+
+
+@benchmark('visualizer', 'plot_monthly_averages')
+def _plot_monthly_averages(data):
+    from utils.visualizer import DataVisualizer
+    compare_data = data.compare_frame()
+    return lambda: DataVisualizer.plot_monthly_averages(compare_data.copy())
+
+
+@benchmark('visualizer', 'plot_current_temp_comparison')
+def _plot_current_temp(data):
+    import matplotlib.pyplot as plt
+    from utils.visualizer import DataVisualizer
+    current_analysis = data.analyzer.check_current_temperature(data.city, 25.0, 'summer')
+
+    def call():
+        plt.close(DataVisualizer.plot_current_temp_comparison(current_analysis, data.city, 'summer'))
+    return call
+
+
+# --- WeatherAPIHandler (локальная заглушка API) ---
+
+@benchmark('api', 'get_current_weather_sync (цикл)')
+def _api_sync(api):
+    def call():
+        with api.handler() as handler:
+            for city_name in api.cities:
+                handler.get_current_weather_sync(city_name)
+    return call
+
+
+@benchmark('api', 'get_multiple_cities_async')
+def _api_async(api):
+    async def fetch():
+        async with api.handler() as handler:
+            return await handler.get_multiple_cities_async(api.cities, calls_per_minute=None)
+    return lambda: asyncio.run(fetch())
+
+
+@benchmark('api', 'iter_multiple_cities_async')
+def _api_async_iter(api):
+    async def fetch():
+        async with api.handler() as handler:
+            return [result async for result in handler.iter_multiple_cities_async(
+                api.cities, calls_per_minute=None)]
+    return lambda: asyncio.run(fetch())
+
+
+@benchmark('api', 'get_current_weather_sync (из кэша)')
+def _api_cached(api):
+    from utils.response_cache import MemoryResponseCache
+    handler = api.handler(cache=MemoryResponseCache())
+    for city_name in api.cities:
+        handler.get_current_weather_sync(city_name)
+
+    def call():
+        for city_name in api.cities:
+            handler.get_current_weather_sync(city_name)
+    return call
+
+
+def measure(make_call, context, fresh, repeats):
+    """
+    Время одного вызова в наносекундах для repeats замеров
+    Быстрые вызовы повторяются в цикле (number раз), пока замер не займет
+    MIN_RUN_TIME, как в timeit.autorange. Возвращает (времена, number).
+    """
+    if fresh:
+        times = []
+        for _ in range(repeats):
+            call = make_call(context)
+            start_time = time.perf_counter_ns()
+            call()
+            times.append(time.perf_counter_ns() - start_time)
+        return times, 1
+
+    call = make_call(context)
+    call()  # прогрев: ленивые импорты и кэши первого вызова
+    number = 1
+    while True:
+        start_time = time.perf_counter_ns()
+        for _ in range(number):
+            call()
+        elapsed = time.perf_counter_ns() - start_time
+        if elapsed >= MIN_RUN_TIME * 1e9 or number >= 10 ** 6:
+            break
+        number *= 10
+    times = [elapsed / number]
+    for _ in range(repeats - 1):
+        start_time = time.perf_counter_ns()
+        for _ in range(number):
+            call()
+        times.append((time.perf_counter_ns() - start_time) / number)
+    return times, number
+
+
+def run_case(case, context, repeats):
+    """Результат бенчмарка: медиана, минимум, среднее и разброс в мс"""
+    result = {'group': case['group'], 'name': case['name'], 'params': context.params}
+    try:
+        times, number = measure(case['make_call'], context, case['fresh'], repeats)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+    times_ms = [t / 1e6 for t in times]
+    result.update({
+        'number': number,
+        'repeats': len(times_ms),
+        'median_ms': statistics.median(times_ms),
+        'min_ms': min(times_ms),
+        'mean_ms': statistics.mean(times_ms),
+        'stdev_ms': statistics.stdev(times_ms) if len(times_ms) > 1 else 0.0
+    })
+    return result
+
+
+def result_key(result):
+    """Ключ для сравнения запусков: группа.имя[параметры]"""
+    params = result['params']
+    size = f"{params['cities']}x{params['years']}" if 'cities' in params else f"{params['requests']} запросов"
+    return f"{result['group']}.{result['name']}[{size}]"
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata():
+    import numpy
+    import pandas
+    import plotly
+    return {
+        'commit': _git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': {'numpy': numpy.__version__, 'pandas': pandas.__version__,
+                     'plotly': plotly.__version__}
+    }
+
+
+def _parse_size(size):
+    num_cities, num_years = size.lower().split('x')
+    return int(num_cities), int(num_years)
+
+
+def _print_result(result):
+    if 'error' in result:
+        print(f"  {result_key(result):<70} ошибка: {result['error']}")
+    else:
+        print(f"  {result_key(result):<70} {result['median_ms']:>10.3f} мс "
+              f"(± {result['stdev_ms']:.3f}, n={result['number']}x{result['repeats']})")
+
+
+def run(sizes=QUICK_SIZES, groups=None, name_filter=None, repeats=5, output=None):
+    """Запуск выбранных бенчмарков и сохранение результатов в JSON"""
+    cases = [
+        case for case in BENCHMARKS
+        if (groups is None or case['group'] in groups)
+        and (name_filter is None or name_filter in case['name'])
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_cases = [case for case in cases if case['group'] != 'api']
+        for size in sizes if data_cases else ():
+            num_cities, num_years = _parse_size(size)
+            size_dir = os.path.join(tmp_dir, size)
+            os.makedirs(size_dir)
+            data = Dataset(num_cities, num_years, size_dir)
+            print(f"{size}: {len(data.df):,} строк")
+            for case in data_cases:
+                results.append(run_case(case, data, repeats))
+                _print_result(results[-1])
+            del data
+
+        api_cases = [case for case in cases if case['group'] == 'api']
+        if api_cases:
+            from benchmarks.stub_weather_server import StubWeatherServer
+            print(f"API: {API_REQUESTS} запросов, задержка заглушки {API_LATENCY * 1000:.0f} мс")
+            with StubWeatherServer(latency=API_LATENCY) as server:
+                api = ApiContext(server)
+                for case in api_cases:
+                    results.append(run_case(case, api, repeats))
+                    _print_result(results[-1])
+
+    report = {'meta': _metadata(), 'results': results}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['commit'] or 'nogit'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты: {output}")
+    return report
+
+
+def compare(base_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Сравнение медиан двух запусков по общим бенчмаркам
+    Возвращает число регрессий (замедление больше threshold раз).
+    """
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    base_results = {result_key(r): r for r in base['results'] if 'error' not in r}
+    new_results = {result_key(r): r for r in new['results'] if 'error' not in r}
+
+    print(f"База: {base['meta']['commit']} ({base['meta']['date']}), "
+          f"новый: {new['meta']['commit']} ({new['meta']['date']})")
+    rows = []
+    for key in base_results.keys() & new_results.keys():
+        base_ms, new_ms = base_results[key]['median_ms'], new_results[key]['median_ms']
+        rows.append((new_ms / base_ms if base_ms > 0 else float('inf'), key, base_ms, new_ms))
+
+    regressions = 0
+    for ratio, key, base_ms, new_ms in sorted(rows, reverse=True):
+        if ratio > threshold:
+            status = 'регрессия'
+            regressions += 1
+        elif ratio < 1 / threshold:
+            status = 'ускорение'
+        else:
+            status = ''
+        print(f"  {key:<70} {base_ms:>10.3f} -> {new_ms:>10.3f} мс {ratio:>6.2f}x {status}")
+
+    only_base = base_results.keys() - new_results.keys()
+    only_new = new_results.keys() - base_results.keys()
+    if only_base or only_new:
+        print(f"Только в базе: {len(only_base)}, только в новом: {len(only_new)}")
+    print(f"Регрессий (> {threshold:.2f}x): {regressions}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='запуск бенчмарков')
+    run_parser.add_argument('--sizes', nargs='+', help='размеры ГОРОДОВxЛЕТ, например 15x10 10000x1')
+    run_parser.add_argument('--full', action='store_true', help=f"все размеры: {' '.join(FULL_SIZES)}")
+    run_parser.add_argument('--groups', nargs='+', choices=('loader', 'analyzer', 'visualizer', 'api'))
+    run_parser.add_argument('--filter', dest='name_filter', help='подстрока имени бенчмарка')
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--output', help='файл результатов (по умолчанию benchmarks/results/)')
+
+    compare_parser = commands.add_parser('compare', help='сравнение двух файлов результатов')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        return 1 if compare(args.base, args.new, args.threshold) else 0
+
+    sizes = args.sizes or (FULL_SIZES if args.full else QUICK_SIZES)
+    run(sizes, args.groups, args.name_filter, args.repeats, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,19 +3,53 @@ import os
 # API
 OPENWEATHER_API_URL = "https://api.openweathermap.org/data/2.5/weather"
 OPENWEATHER_TIMEOUT = 10
+OPENWEATHER_POOL_SIZE = 20  # максимум одновременных соединений с API
+OPENWEATHER_MAX_CONCURRENCY = 10  # одновременных запросов в пакетном режиме
+OPENWEATHER_CALLS_PER_MINUTE = 60  # лимит бесплатного тарифа
+OPENWEATHER_RATE_BURST = 10  # допустимая пачка запросов сверх средней частоты
+OPENWEATHER_MAX_RETRIES = 3  # повторы при 429/5xx
+OPENWEATHER_BACKOFF_BASE = 0.5  # секунды, база экспоненциальной задержки
+OPENWEATHER_BACKOFF_MAX = 30
+OPENWEATHER_CACHE_TTL = 600  # секунды, данные OpenWeatherMap обновляются ~раз в 10 минут
+OPENWEATHER_CACHE_SIZE = 256  # записей в кэше ответов
 
 # Пути
 DATA_PATH = "./data"
 DATA_FILE = "temperature_data.csv"
 DATA_FILE_PATH = os.path.join(DATA_PATH, DATA_FILE)
+DATA_CACHE_FILE = "temperature_data.parquet"
+DATA_CACHE_FILE_PATH = os.path.join(DATA_PATH, DATA_CACHE_FILE)
+WEATHER_CACHE_FILE = "weather_cache.sqlite"
+WEATHER_CACHE_FILE_PATH = os.path.join(DATA_PATH, WEATHER_CACHE_FILE)
+BASELINE_FILE = "seasonal_baseline.csv"
+BASELINE_FILE_PATH = os.path.join(DATA_PATH, BASELINE_FILE)
+HISTORY_STORE_DIR = "history_store"
+HISTORY_STORE_PATH = os.path.join(DATA_PATH, HISTORY_STORE_DIR)
+REPORTS_PATH = "./reports"  # отчеты пакетного анализа (python -m utils.cli)
 
 # Анализ
 ANOMALY_SIGMA_THRESHOLD = 2  # 2 стандартных отклонения
+ANOMALY_METHOD = "global"  # global - среднее города +-sigma, climatology - медиана/MAD по дню года
+CLIMATOLOGY_WINDOW_DAYS = 15  # полуширина окна климатической нормы (дни)
 MOVING_AVERAGE_WINDOW = 30
+ROLLING_WINDOWS = (7, 30, 90, 365)  # окна, считаемые вместе за один проход
+ROLLING_CACHE_SIZE = 512  # записей (город, окно) в кэше скользящих статистик
+PARALLEL_MAX_WORKERS = os.cpu_count() or 1  # процессов в пуле параллельного анализа
+PARALLEL_SHARDS_PER_WORKER = 4  # шардов городов на процесс (выравнивание нагрузки)
 
 # Визуализация
 PLOTLY_TEMPLATE = "plotly_white"
 MATPLOTLIB_STYLE = "seaborn-v0_8"
+PLOT_MAX_POINTS = 1000  # точек на линию графика (бюджет по ширине в пикселях)
+PLOT_DOWNSAMPLING = "lttb"  # прореживание рядов: "lttb" или "minmax"
+HISTOGRAM_BINS = 50  # интервалов гистограммы распределения температур
+FIGURE_CACHE_SIZE = 128  # графиков в кэше готовых фигур (LRU)
+FIGURE_PNG_DPI = 100  # разрешение PNG графиков matplotlib в кэше
+
+# Диагностика
+METRICS_ENABLED = True  # замеры длительности операций (utils.instrumentation)
+METRICS_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # границы гистограмм, мс
+METRICS_PORT = None  # порт HTTP-эндпоинта /metrics в приложении (None - не запускать)
 
 # Города и сезоны
 SEASONAL_TEMPERATURES = {
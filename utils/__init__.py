@@ -1,21 +1,62 @@
 # Инициализация пакета utils
-from .data_loader import (
-    generate_realistic_temperature_data,
-    load_temperature_data,
-    get_city_data,
-    get_season_data
-)
+# Модули загружаются при первом обращении к их именам (PEP 562): импорт
+# пакета не тянет scipy, plotly, matplotlib, requests и aiohttp, пока они
+# не нужны, - это сокращает холодный старт приложения, CLI и рабочих процессов
+import importlib
 
-from .analyzer import TemperatureAnalyzer
-from .api_handler import WeatherAPIHandler
-from .visualizer import DataVisualizer
+# Имя -> модуль пакета, в котором оно определено
+_LAZY_ATTRIBUTES = {
+    'generate_realistic_temperature_data': 'data_loader',
+    'generate_temperature_data_file': 'data_loader',
+    'iter_temperature_data_chunks': 'data_loader',
+    'synthetic_seasonal_temperatures': 'data_loader',
+    'load_temperature_data': 'data_loader',
+    'read_temperature_file': 'data_loader',
+    'save_temperature_data': 'data_loader',
+    'compact_temperature_data': 'data_loader',
+    'data_fingerprint': 'data_loader',
+    'get_city_data': 'data_loader',
+    'get_season_data': 'data_loader',
+    'HistoryStore': 'history_store',
+    'write_history_store': 'history_store',
+    'open_history_store': 'history_store',
+    'RollingStatsCache': 'rolling',
+    'rolling_window_stats': 'rolling',
+    'robust_climatology': 'climatology',
+    'day_of_year_index': 'climatology',
+    'MAD_TO_SIGMA': 'climatology',
+    'TemperatureAnalyzer': 'analyzer',
+    'ParallelAnalyzer': 'parallel',
+    'analyze_city': 'parallel',
+    'analyze_cities': 'parallel',
+    'OnlineTemperatureStats': 'online_stats',
+    'WeatherAPIHandler': 'api_handler',
+    'MemoryResponseCache': 'response_cache',
+    'SQLiteResponseCache': 'response_cache',
+    'histogram_summary': 'distribution',
+    'box_summary': 'distribution',
+    'downsample_timeseries': 'downsampling',
+    'lttb_indices': 'downsampling',
+    'minmax_indices': 'downsampling',
+    'DataVisualizer': 'visualizer',
+    'FigureCache': 'figure_cache',
+    'MetricsRegistry': 'instrumentation',
+    'metrics': 'instrumentation',
+    'timed': 'instrumentation',
+    'timer': 'instrumentation'
+}
 
-__all__ = [
-    'generate_realistic_temperature_data',
-    'load_temperature_data',
-    'get_city_data',
-    'get_season_data',
-    'TemperatureAnalyzer',
-    'WeatherAPIHandler',
-    'DataVisualizer'
-]
\ No newline at end of file
+__all__ = list(_LAZY_ATTRIBUTES)
+
+def __getattr__(name):
+    """Загрузка модуля при первом обращении к имени (from utils import X)"""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    # Следующие обращения идут мимо __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,20 +1,174 @@
+import os
+import json
 import pandas as pd
 import numpy as np
-from scipy import stats
-from config import ANOMALY_SIGMA_THRESHOLD, MOVING_AVERAGE_WINDOW
+from config import (
+    ANOMALY_SIGMA_THRESHOLD, ANOMALY_METHOD, MOVING_AVERAGE_WINDOW, BASELINE_FILE_PATH,
+    MONTH_TO_SEASON, HISTOGRAM_BINS
+)
+from .distribution import box_summary, histogram_summary
+from .climatology import MAD_TO_SIGMA, day_of_year_index, robust_climatology
+from .rolling import RollingStatsCache
+from .data_loader import data_fingerprint
+from .instrumentation import timed
 
 class TemperatureAnalyzer:
     """Класс для анализа температурных данных"""
     
-    def __init__(self, df):
-        self.df = df.copy()
-        self.df['timestamp'] = pd.to_datetime(self.df['timestamp'])
-        self.df = self.df.sort_values('timestamp')
+    @timed()
+    def __init__(self, df, copy=True):
+        """
+        copy=True - анализатор хранит одну собственную копию данных, сразу
+        упорядоченную по городу и времени: она же служит индексом разделов.
+        copy=False - режим без копирования: уже разобранные timestamp не
+        преобразуются повторно, DataFrame не сортируется и используется
+        совместно с вызывающим кодом (его нельзя изменять после передачи).
+        Если строки уже сгруппированы по городам и упорядочены по времени
+        (как в CSV и сгенерированных данных), в памяти остается одна копия.
+        """
+        if copy:
+            timestamps = pd.to_datetime(df['timestamp'])
+            city_codes, _ = pd.factorize(df['city'])
+            order = np.lexsort((
+                timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64), city_codes
+            ))
+            # take - единственная копия; исходный порядок не удерживается
+            self.df = df.take(order)
+            self.df['timestamp'] = timestamps.array.take(order)
+        elif not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            self.df = df.assign(timestamp=pd.to_datetime(df['timestamp']))
+        else:
+            self.df = df
+        self._baseline = None
+        self._rolling = None
+        self._climatology = None
+        self._summaries = {}
+        self._build_partition_index()
+    
+    @classmethod
+    def from_store(cls, store):
+        """Анализатор поверх memory-mapped хранилища истории (HistoryStore)
+        
+        Данные хранилища уже упорядочены по городу и времени, поэтому
+        индекс разделов строится без копирования столбцов
+        """
+        return cls(store.to_frame(), copy=False)
+    
+    def _build_partition_index(self):
+        """Построение индекса разделов по городам и сезонам
+        
+        Строки каждого города лежат непрерывным блоком (порядок по времени
+        внутри блока сохраняется), поэтому запрос по городу читает срез
+        за O(строк города) вместо сравнения строк по всему DataFrame.
+        Если self.df уже так упорядочен, он используется без копирования.
+        """
+        self._codes = {}
+        self._day_index = None
+        city_codes, cities = self._get_codes('city')
+        season_codes, seasons = self._get_codes('season')
+        self._city_slices = {}
+        self._season_positions = {}
+        self._season_index = {season: code for code, season in enumerate(seasons)}
+        self._partitioned_season_codes = season_codes
+        if len(self.df) == 0:
+            self._partitioned = self.df
+            return
+        
+        timestamps = self.df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        same_city = city_codes[1:] == city_codes[:-1]
+        # Категориальный столбец может содержать неиспользуемые категории
+        num_cities = np.count_nonzero(np.bincount(city_codes, minlength=len(cities)))
+        is_partitioned = (
+            np.count_nonzero(~same_city) == num_cities - 1 and
+            np.all(timestamps[1:][same_city] >= timestamps[:-1][same_city])
+        )
+        
+        if is_partitioned:
+            self._partitioned = self.df
+        else:
+            order = np.lexsort((timestamps, city_codes))
+            self._partitioned = self.df.take(order)
+            city_codes = city_codes[order]
+            self._partitioned_season_codes = season_codes[order]
+        
+        starts = np.concatenate(([0], np.flatnonzero(city_codes[1:] != city_codes[:-1]) + 1))
+        ends = np.append(starts[1:], len(city_codes))
+        self._city_slices = {
+            cities[city_codes[start]]: slice(start, end) for start, end in zip(starts, ends)
+        }
+    
+    def _get_column(self, key):
+        """Столбец self.df или производный ключ группировки 'decade' (1990, 2000, ...)"""
+        if key == 'decade' and key not in self.df.columns:
+            return self.df['timestamp'].dt.year // 10 * 10
+        return self.df[key]
+    
+    def _get_codes(self, key):
+        """Целочисленные коды столбца (кэшируются), выровненные по self.df
+        
+        У категориального столбца берутся его собственные коды без копирования
+        """
+        if key not in self._codes:
+            column = self._get_column(key)
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                self._codes[key] = (column.cat.codes.to_numpy(), list(column.cat.categories))
+            else:
+                codes, uniques = pd.factorize(column, sort=True)
+                self._codes[key] = (codes, list(uniques))
+        return self._codes[key]
+    
+    def _get_group_codes(self, by):
+        """Общий целочисленный код группы для одного или нескольких ключей
+        
+        Возвращает (keys, codes, key_uniques, n_groups); код группы - номер
+        в декартовом произведении значений ключей.
+        """
+        keys = [by] if isinstance(by, str) else list(by)
+        codes = np.zeros(len(self.df), dtype=np.int64)
+        key_uniques = []
+        for key in keys:
+            key_codes, uniques = self._get_codes(key)
+            codes = codes * len(uniques) + key_codes
+            key_uniques.append(uniques)
+        n_groups = int(np.prod([len(uniques) for uniques in key_uniques]))
+        return keys, codes, key_uniques, n_groups
+    
+    @staticmethod
+    def _group_keys_frame(group_ids, keys, key_uniques):
+        """Столбцы ключей для выбранных кодов групп"""
+        key_positions = np.unravel_index(group_ids, [len(uniques) for uniques in key_uniques])
+        return pd.DataFrame({
+            key: np.asarray(uniques)[positions]
+            for key, uniques, positions in zip(keys, key_uniques, key_positions)
+        })
+    
+    def _get_city_frame(self, city_name):
+        """Данные города из индекса (пустой срез для неизвестного города)"""
+        city_slice = self._city_slices.get(city_name, slice(0, 0))
+        return self._partitioned.iloc[city_slice]
     
+    def _get_season_frame(self, city_name, season):
+        """Данные города за сезон из индекса
+        
+        Позиции (город, сезон) строятся при первом обращении по блоку города
+        """
+        key = (city_name, season)
+        if key not in self._season_positions:
+            city_slice = self._city_slices.get(city_name, slice(0, 0))
+            season_code = self._season_index.get(season, -1)
+            self._season_positions[key] = city_slice.start + np.flatnonzero(
+                self._partitioned_season_codes[city_slice] == season_code
+            )
+        positions = self._season_positions[key]
+        if len(positions) == 0:
+            return self._partitioned.iloc[0:0]
+        return self._partitioned.iloc[positions]
+    
+    @timed()
     def get_basic_stats(self, city_name=None):
         """Получение базовой статистики"""
         if city_name:
-            data = self.df[self.df['city'] == city_name]['temperature']
+            data = self._get_city_frame(city_name)['temperature']
         else:
             data = self.df['temperature']
         
@@ -29,13 +183,13 @@ class TemperatureAnalyzer:
             'q75': data.quantile(0.75)
         }
     
+    @timed()
     def get_seasonal_stats(self, city_name):
         """Статистика по сезонам для города"""
-        city_data = self.df[self.df['city'] == city_name]
         seasonal_stats = {}
         
         for season in ['winter', 'spring', 'summer', 'autumn']:
-            season_data = city_data[city_data['season'] == season]['temperature']
+            season_data = self._get_season_frame(city_name, season)['temperature']
             if len(season_data) > 0:
                 seasonal_stats[season] = {
                     'mean': season_data.mean(),
@@ -47,29 +201,93 @@ class TemperatureAnalyzer:
         
         return seasonal_stats
     
+    def _get_temperature_values(self, city_name, season=None):
+        """Температуры города (или города за сезон) из индекса разделов"""
+        if season is None:
+            data = self._get_city_frame(city_name)
+        else:
+            data = self._get_season_frame(city_name, season)
+        return data['temperature'].to_numpy(dtype=np.float64)
+    
+    @timed()
+    def get_temperature_histogram(self, city_name, season=None, bins=HISTOGRAM_BINS):
+        """Гистограмма температур города (за сезон, если задан)
+        
+        Считается на сервере и кэшируется по (город, сезон, bins),
+        см. histogram_summary
+        """
+        key = ('histogram', city_name, season, bins)
+        if key not in self._summaries:
+            self._summaries[key] = histogram_summary(self._get_temperature_values(city_name, season), bins)
+        return self._summaries[key]
+    
+    @timed()
+    def get_box_stats(self, city_name, season=None):
+        """Статистика боксплота температур города (за сезон, если задан)
+        
+        Кэшируется по (город, сезон), см. box_summary
+        """
+        key = ('box', city_name, season)
+        if key not in self._summaries:
+            self._summaries[key] = box_summary(self._get_temperature_values(city_name, season))
+        return self._summaries[key]
+    
+    @timed()
+    def get_rolling_stats(self, city_name, window_size=MOVING_AVERAGE_WINDOW):
+        """Центрированные скользящие mean, std, min, max города
+        
+        Массивы выровнены по строкам города и кэшируются по (город, окно),
+        см. RollingStatsCache
+        """
+        if self._rolling is None:
+            self._rolling = RollingStatsCache(
+                self._partitioned['temperature'].to_numpy(dtype=np.float64), self._city_slices
+            )
+        return self._rolling.get(city_name, window_size)
+    
+    @timed()
     def calculate_moving_average(self, city_name, window_size=MOVING_AVERAGE_WINDOW):
         """Вычисление скользящего среднего"""
-        city_data = self.df[self.df['city'] == city_name].copy()
-        city_data = city_data.sort_values('timestamp')
-        city_data['moving_avg'] = city_data['temperature'].rolling(
-            window=window_size, center=True, min_periods=1
-        ).mean()
+        city_data = self._get_city_frame(city_name).copy()
+        city_data['moving_avg'] = self.get_rolling_stats(city_name, window_size)['mean']
         return city_data
     
-    def detect_anomalies(self, city_name, sigma_threshold=ANOMALY_SIGMA_THRESHOLD):
-        """Обнаружение аномалий в данных города"""
-        city_data = self.df[self.df['city'] == city_name].copy()
+    @timed()
+    def detect_anomalies(self, city_name, sigma_threshold=ANOMALY_SIGMA_THRESHOLD,
+                         method=ANOMALY_METHOD):
+        """Обнаружение аномалий в данных города
+        
+        method='global' - границы mean +- sigma_threshold * std по всем данным
+        города; method='climatology' - робастное отклонение от климатической
+        нормы дня года (см. get_climatology): в city_data добавляются столбцы
+        climatology_median, robust_z, lower, upper, а bounds содержит
+        границы для каждой строки.
+        """
+        city_data = self._get_city_frame(city_name).copy()
         
         mean_temp = city_data['temperature'].mean()
         std_temp = city_data['temperature'].std()
         
-        lower_bound = mean_temp - sigma_threshold * std_temp
-        upper_bound = mean_temp + sigma_threshold * std_temp
-        
-        city_data['is_anomaly'] = (
-            (city_data['temperature'] < lower_bound) | 
-            (city_data['temperature'] > upper_bound)
-        )
+        if method == 'climatology':
+            median, scale = self._get_climatology_bounds(city_name, city_data['timestamp'])
+            city_data['climatology_median'] = median
+            with np.errstate(divide='ignore', invalid='ignore'):
+                city_data['robust_z'] = (city_data['temperature'] - median) / scale
+            city_data['lower'] = median - sigma_threshold * scale
+            city_data['upper'] = median + sigma_threshold * scale
+            lower_bound = city_data['lower']
+            upper_bound = city_data['upper']
+            city_data['is_anomaly'] = city_data['robust_z'].abs() > sigma_threshold
+        elif method == 'global':
+            lower_bound = mean_temp - sigma_threshold * std_temp
+            upper_bound = mean_temp + sigma_threshold * std_temp
+            
+            city_data['is_anomaly'] = (
+                (city_data['temperature'] < lower_bound) | 
+                (city_data['temperature'] > upper_bound)
+            )
+        else:
+            raise ValueError(f"Неизвестный метод обнаружения аномалий: {method}")
         
         anomalies = city_data[city_data['is_anomaly']]
         
@@ -85,22 +303,182 @@ class TemperatureAnalyzer:
             }
         }
     
+    @timed()
+    def get_climatology(self):
+        """Климатическая норма по (город, день года): медиана и MAD (кэшируется)
+        
+        Для каждого дня года берутся измерения всех лет в окне
+        +-CLIMATOLOGY_WINDOW_DAYS дней; робастный масштаб scale = 1.4826 * MAD.
+        Считается векторно для всех городов сразу (см. robust_climatology).
+        Возвращает таблицу: city, day_of_year (1..366 в календаре
+        високосного года), median, mad, scale.
+        """
+        median, scale = self._get_climatology_arrays()
+        _, cities = self._get_codes('city')
+        return pd.DataFrame({
+            'city': np.repeat(cities, median.shape[1]),
+            'day_of_year': np.tile(np.arange(1, median.shape[1] + 1), len(cities)),
+            'median': median.ravel(),
+            'mad': scale.ravel() / MAD_TO_SIGMA,
+            'scale': scale.ravel()
+        })
+    
+    def _get_climatology_arrays(self):
+        if self._climatology is None:
+            city_codes, cities = self._get_codes('city')
+            median, mad = robust_climatology(
+                self.df['temperature'].to_numpy(),
+                city_codes,
+                self._get_day_index(),
+                self.df['timestamp'].dt.year.to_numpy(),
+                len(cities)
+            )
+            self._climatology = (median, MAD_TO_SIGMA * mad)
+        return self._climatology
+    
+    def _get_day_index(self):
+        """Номер дня года для каждой строки self.df (кэшируется)"""
+        if self._day_index is None:
+            self._day_index = day_of_year_index(self.df['timestamp']).astype(np.int16)
+        return self._day_index
+    
+    def _get_robust_scores(self):
+        """Робастное отклонение от нормы дня года для каждой строки self.df"""
+        median, scale = self._get_climatology_arrays()
+        city_codes, _ = self._get_codes('city')
+        day_index = self._get_day_index()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.df['temperature'].to_numpy(dtype=np.float64) - median[city_codes, day_index]) / (
+                np.where(scale > 0, scale, np.nan)[city_codes, day_index]
+            )
+    
+    def _get_climatology_bounds(self, city_name, timestamps):
+        """Медиана и робастный масштаб нормы для дат города"""
+        median, scale = self._get_climatology_arrays()
+        _, cities = self._get_codes('city')
+        if city_name not in cities:
+            return np.full(len(timestamps), np.nan), np.full(len(timestamps), np.nan)
+        city_code = cities.index(city_name)
+        day_index = day_of_year_index(timestamps)
+        scale = scale[city_code, day_index]
+        return median[city_code, day_index], np.where(scale > 0, scale, np.nan)
+    
+    @timed()
+    def detect_anomalies_all(self, by=('city', 'season'), sigma_threshold=ANOMALY_SIGMA_THRESHOLD,
+                             method=ANOMALY_METHOD):
+        """Обнаружение аномалий сразу для всех групп за один векторный проход
+        
+        Ключи группировки кодируются целыми числами, а суммы по группам
+        считаются через np.bincount. Возвращает сводную таблицу: ключи группы,
+        count, mean, std, lower, upper, n_anomalies, percent_anomalies.
+        method='climatology' - аномалии по климатической норме дня года
+        (как в detect_anomalies), lower и upper тогда не заполняются.
+        """
+        keys, codes, key_uniques, n_groups = self._get_group_codes(by)
+        
+        temperature = self.df['temperature'].to_numpy(dtype=np.float64)
+        count = np.bincount(codes, minlength=n_groups)
+        present = count > 0
+        safe_count = np.where(present, count, 1)
+        
+        mean = np.bincount(codes, weights=temperature, minlength=n_groups) / safe_count
+        deviation = temperature - mean[codes]
+        squared = np.bincount(codes, weights=deviation ** 2, minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(squared / (count - 1))
+        
+        lower = mean - sigma_threshold * std
+        upper = mean + sigma_threshold * std
+        if method == 'climatology':
+            lower = upper = np.full(n_groups, np.nan)
+            is_anomaly = np.abs(self._get_robust_scores()) > sigma_threshold
+        elif method == 'global':
+            is_anomaly = (temperature < lower[codes]) | (temperature > upper[codes])
+        else:
+            raise ValueError(f"Неизвестный метод обнаружения аномалий: {method}")
+        n_anomalies = np.bincount(codes, weights=is_anomaly, minlength=n_groups).astype(np.int64)
+        
+        group_ids = np.flatnonzero(present)
+        summary = self._group_keys_frame(group_ids, keys, key_uniques)
+        summary['count'] = count[group_ids]
+        summary['mean'] = mean[group_ids]
+        summary['std'] = std[group_ids]
+        summary['lower'] = lower[group_ids]
+        summary['upper'] = upper[group_ids]
+        summary['n_anomalies'] = n_anomalies[group_ids]
+        summary['percent_anomalies'] = summary['n_anomalies'] / summary['count'] * 100
+        
+        return summary
+    
+    @timed()
+    def get_seasonal_baseline(self):
+        """Таблица сезонных норм по (город, сезон): count, mean, std, lower, upper
+        
+        Строится один раз за проход detect_anomalies_all и кэшируется,
+        поэтому проверка текущей температуры сводится к поиску в словаре.
+        """
+        if self._baseline is None:
+            summary = self.detect_anomalies_all(by=('city', 'season'), method='global')
+            self._set_seasonal_baseline(
+                summary.set_index(['city', 'season'])[['count', 'mean', 'std', 'lower', 'upper']]
+            )
+        return self._baseline
+    
+    def _set_seasonal_baseline(self, baseline):
+        """Установка таблицы сезонных норм и словаря для быстрого поиска"""
+        self._baseline = baseline
+        self._baseline_lookup = dict(zip(
+            baseline.index,
+            zip(baseline['mean'], baseline['std'], baseline['lower'], baseline['upper'])
+        ))
+    
+    @timed()
+    def save_seasonal_baseline(self, path=BASELINE_FILE_PATH):
+        """Сохранение таблицы сезонных норм в CSV
+        
+        Рядом (path + '.json') записывается отпечаток данных, по которым
+        построена таблица, чтобы не применить ее к другому набору данных
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.get_seasonal_baseline().to_csv(path)
+        with open(path + '.json', 'w') as f:
+            json.dump(list(data_fingerprint(self.df)), f)
+    
+    @timed()
+    def load_seasonal_baseline(self, path=BASELINE_FILE_PATH):
+        """Загрузка ранее сохраненной таблицы сезонных норм из CSV
+        
+        Если таблица построена по другим данным (отпечаток не совпадает
+        или отсутствует), нормы пересчитываются по текущим данным
+        """
+        try:
+            with open(path + '.json') as f:
+                saved_fingerprint = json.load(f)
+        except (OSError, ValueError):
+            saved_fingerprint = None
+        if saved_fingerprint != list(data_fingerprint(self.df)):
+            print(f"Сезонные нормы {path} построены по другим данным. Выполняется пересчет.")
+            self._baseline = None
+            return self.get_seasonal_baseline()
+        
+        baseline = pd.read_csv(path, index_col=['city', 'season'])
+        required_columns = ['count', 'mean', 'std', 'lower', 'upper']
+        if not all(col in baseline.columns for col in required_columns):
+            raise ValueError("Файл сезонных норм имеет некорректную структуру")
+        self._set_seasonal_baseline(baseline[required_columns])
+        return self._baseline
+    
+    @timed()
     def check_current_temperature(self, city_name, current_temp, current_season):
         """Проверка текущей температуры на аномальность"""
-        # Получаем исторические данные для сезона
-        season_data = self.df[
-            (self.df['city'] == city_name) & 
-            (self.df['season'] == current_season)
-        ]['temperature']
+        # Сезонная норма из предварительно рассчитанной таблицы
+        self.get_seasonal_baseline()
+        baseline = self._baseline_lookup.get((city_name, current_season))
         
-        if len(season_data) == 0:
+        if baseline is None:
             return None
         
-        season_mean = season_data.mean()
-        season_std = season_data.std()
-        
-        lower_bound = season_mean - 2 * season_std
-        upper_bound = season_mean + 2 * season_std
+        season_mean, season_std, lower_bound, upper_bound = baseline
         
         is_anomalous = current_temp < lower_bound or current_temp > upper_bound
         
@@ -113,18 +491,45 @@ class TemperatureAnalyzer:
             'deviation': current_temp - season_mean
         }
     
+    @timed()
+    def check_current_temperatures(self, readings):
+        """Векторная проверка множества текущих измерений на аномальность
+        
+        readings - DataFrame со столбцами city, temperature и season
+        (или timestamp, по которому определяется сезон).
+        """
+        readings = readings.copy()
+        if 'season' not in readings.columns:
+            readings['season'] = pd.to_datetime(readings['timestamp']).dt.month.map(MONTH_TO_SEASON)
+        
+        baseline = self.get_seasonal_baseline().reindex(
+            pd.MultiIndex.from_arrays([readings['city'], readings['season']])
+        )
+        readings['season_mean'] = baseline['mean'].to_numpy()
+        readings['season_std'] = baseline['std'].to_numpy()
+        readings['lower'] = baseline['lower'].to_numpy()
+        readings['upper'] = baseline['upper'].to_numpy()
+        readings['is_anomalous'] = (
+            (readings['temperature'] < readings['lower']) |
+            (readings['temperature'] > readings['upper'])
+        )
+        readings['deviation'] = readings['temperature'] - readings['season_mean']
+        
+        return readings
+    
+    @timed()
     def calculate_trends(self, city_name):
         """Расчет температурных трендов"""
-        city_data = self.df[self.df['city'] == city_name].copy()
-        city_data = city_data.sort_values('timestamp')
-        city_data['days'] = (city_data['timestamp'] - city_data['timestamp'].min()).dt.days
+        city_data = self._get_city_frame(city_name)
+        days = (city_data['timestamp'] - city_data['timestamp'].min()).dt.days
         
         if len(city_data) < 2:
             return None
         
-        # Линейная регрессия
+        # Линейная регрессия (scipy импортируется только для трендов)
+        from scipy import stats
         slope, intercept, r_value, p_value, std_err = stats.linregress(
-            city_data['days'], city_data['temperature']
+            days, city_data['temperature']
         )
         
         return {
@@ -135,4 +540,72 @@ class TemperatureAnalyzer:
             'p_value': p_value,
             'trend_direction': 'warming' if slope > 0 else 'cooling',
             'is_significant': p_value < 0.05
-        }
\ No newline at end of file
+        }
+    
+    @timed()
+    def calculate_trends_all(self, by='city'):
+        """Линейные тренды сразу для всех групп (например, 'city',
+        ('city', 'season') или ('city', 'decade'))
+        
+        Для каждой группы, как в calculate_trends, температура регрессируется
+        на число дней от первого измерения группы. Суммы по группам считаются
+        через np.bincount с центрированием (как в linregress), без цикла
+        по группам. Возвращает таблицу: ключи группы, count, slope_per_day,
+        slope_per_year, intercept, r_squared, p_value, stderr,
+        intercept_stderr, trend_direction, is_significant. Группы меньше
+        чем из двух измерений не включаются.
+        """
+        keys, codes, key_uniques, n_groups = self._get_group_codes(by)
+        
+        count = np.bincount(codes, minlength=n_groups)
+        group_ids = np.flatnonzero(count >= 2)
+        safe_count = np.maximum(count, 1)
+        
+        timestamps = self.df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        group_start = np.zeros(n_groups, dtype=np.int64)
+        start_by_group = pd.Series(timestamps).groupby(codes).min()
+        group_start[start_by_group.index] = start_by_group.to_numpy()
+        days = ((timestamps - group_start[codes]) // (24 * 3600 * 10**9)).astype(np.float64)
+        temperature = self.df['temperature'].to_numpy(dtype=np.float64)
+        
+        x_mean = np.bincount(codes, weights=days, minlength=n_groups) / safe_count
+        y_mean = np.bincount(codes, weights=temperature, minlength=n_groups) / safe_count
+        x_dev = days - x_mean[codes]
+        y_dev = temperature - y_mean[codes]
+        ssxm = np.bincount(codes, weights=x_dev * x_dev, minlength=n_groups) / safe_count
+        ssym = np.bincount(codes, weights=y_dev * y_dev, minlength=n_groups) / safe_count
+        ssxym = np.bincount(codes, weights=x_dev * y_dev, minlength=n_groups) / safe_count
+        
+        from scipy import stats
+        n, x_mean, y_mean = count[group_ids], x_mean[group_ids], y_mean[group_ids]
+        ssxm, ssym, ssxym = ssxm[group_ids], ssym[group_ids], ssxym[group_ids]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = ssxym / ssxm
+            r = np.where((ssxm == 0) | (ssym == 0), 0.0,
+                         np.clip(ssxym / np.sqrt(ssxm * ssym), -1.0, 1.0))
+            df = n - 2
+            t = r * np.sqrt(df / ((1.0 - r + 1e-20) * (1.0 + r + 1e-20)))
+            p_value = 2 * stats.t.sf(np.abs(t), df)
+            stderr = np.sqrt((1 - r ** 2) * ssym / ssxm / df)
+        intercept = y_mean - slope * x_mean
+        
+        # Две точки: прямая проходит через обе (как в linregress)
+        is_pair = n == 2
+        p_value[is_pair] = np.where(ssym[is_pair] == 0, 1.0, 0.0)
+        stderr[is_pair] = 0.0
+        # Все измерения группы в один день - наклон не определен
+        slope[ssxm == 0] = np.nan
+        
+        trends = self._group_keys_frame(group_ids, keys, key_uniques)
+        trends['count'] = n
+        trends['slope_per_day'] = slope
+        trends['slope_per_year'] = slope * 365
+        trends['intercept'] = intercept
+        trends['r_squared'] = r ** 2
+        trends['p_value'] = p_value
+        trends['stderr'] = stderr
+        trends['intercept_stderr'] = stderr * np.sqrt(ssxm + x_mean ** 2)
+        trends['trend_direction'] = np.where(slope > 0, 'warming', 'cooling')
+        trends['is_significant'] = p_value < 0.05
+        
+        return trends
@@ -1,15 +1,205 @@
-import requests
-import aiohttp
 import asyncio
+import json
+import random
 from datetime import datetime
 import time
-from config import OPENWEATHER_API_URL, OPENWEATHER_TIMEOUT
+from config import (
+    OPENWEATHER_API_URL, OPENWEATHER_TIMEOUT, OPENWEATHER_POOL_SIZE,
+    OPENWEATHER_MAX_CONCURRENCY, OPENWEATHER_CALLS_PER_MINUTE, OPENWEATHER_RATE_BURST,
+    OPENWEATHER_MAX_RETRIES, OPENWEATHER_BACKOFF_BASE, OPENWEATHER_BACKOFF_MAX
+)
+from .response_cache import ResponseCache
+from .single_flight import SingleFlight, AsyncSingleFlight
+from .instrumentation import timed
+
+# Коды ответа, при которых запрос имеет смысл повторить
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Ограничитель частоты запросов (token bucket) для asyncio"""
+    
+    def __init__(self, calls_per_minute=OPENWEATHER_CALLS_PER_MINUTE, burst=OPENWEATHER_RATE_BURST):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Ожидание свободного токена"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
 
 class WeatherAPIHandler:
-    """Обработчик запросов к OpenWeatherMap API"""
+    """Обработчик запросов к OpenWeatherMap API
     
-    def __init__(self, api_key=None):
+    Соединения переиспользуются: синхронные запросы идут через общий
+    requests.Session, асинхронные - через общий aiohttp.ClientSession,
+    который живет до закрытия обработчика и пересоздается только при смене
+    цикла событий (например, в следующем asyncio.run). Сессии закрываются
+    через close() / aclose() или контекстный менеджер.
+    Успешные ответы могут кэшироваться (см. utils.response_cache), а
+    одновременные запросы одного города объединяются в один (single-flight).
+    """
+    
+    def __init__(self, api_key=None, api_url=OPENWEATHER_API_URL, pool_size=OPENWEATHER_POOL_SIZE,
+                 cache=None, units='metric', lang='ru'):
         self.api_key = api_key
+        self.api_url = api_url
+        self.pool_size = pool_size
+        self.cache = cache
+        self.units = units
+        self.lang = lang
+        self._session = None
+        self._async_session = None
+        self._async_loop = None
+        self._sync_flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        await self._get_async_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    def close(self):
+        """Закрытие всех соединений из синхронного кода
+        
+        Асинхронная сессия закрывается в своем цикле событий, если он еще
+        выполняется, иначе - в отдельном коротком цикле
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        session, loop = self._detach_async_session()
+        if session is None:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        elif not loop.is_closed():
+            loop.run_until_complete(session.close())
+        else:
+            # Цикл сессии уже завершен (asyncio.run): ее транспорты закрыты
+            # вместе с ним, остается пометить сессию закрытой
+            try:
+                asyncio.get_running_loop().create_task(session.close())
+            except RuntimeError:
+                asyncio.run(session.close())
+    
+    async def aclose(self):
+        """Закрытие всех соединений, включая асинхронную сессию"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        session, _ = self._detach_async_session()
+        if session is not None:
+            await session.close()
+    
+    def _get_session(self):
+        """Общий requests.Session с пулом keep-alive соединений"""
+        if self._session is None:
+            # requests и aiohttp импортируются при первом запросе, а не при старте
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+    
+    async def _get_async_session(self):
+        """Общий aiohttp.ClientSession с ограниченным пулом соединений
+        
+        Сессия привязана к циклу событий, поэтому при смене цикла старая
+        закрывается и создается новая; в пределах цикла соединения
+        переиспользуются всеми вызовами до close() / aclose()
+        """
+        loop = asyncio.get_running_loop()
+        stale_session = None
+        if self._async_session is not None and (
+                self._async_loop is not loop or self._async_session.closed):
+            stale_session, _ = self._detach_async_session()
+        if self._async_session is None:
+            import aiohttp
+            self._async_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=OPENWEATHER_TIMEOUT)
+            )
+            self._async_loop = loop
+        session = self._async_session
+        # Новая сессия уже установлена: вызовы, начатые во время закрытия
+        # старой, используют ее, а не создают еще одну
+        if stale_session is not None:
+            await stale_session.close()
+        return session
+    
+    def _detach_async_session(self):
+        """Асинхронная сессия и ее цикл событий; обработчик ее больше не использует"""
+        session, loop = self._async_session, self._async_loop
+        self._async_session = None
+        self._async_loop = None
+        return session, loop
+    
+    def _build_params(self, city_name):
+        """Параметры запроса текущей погоды"""
+        return {
+            'q': city_name,
+            'appid': self.api_key,
+            'units': self.units,
+            'lang': self.lang
+        }
+    
+    def _request_key(self, city_name):
+        """Ключ запроса для кэша и объединения запросов"""
+        return ResponseCache.make_key(city_name, self.units, self.lang)
+    
+    def _get_cached(self, city_name, method):
+        """Ответ из кэша (с пометкой cached) или None"""
+        start_time = time.perf_counter()
+        cached = self.cache.get(self._request_key(city_name))
+        if cached is None:
+            return None
+        return {
+            **cached,
+            'elapsed_time': time.perf_counter() - start_time,
+            'method': f"{method} (кэш)",
+            'cached': True
+        }
+    
+    def _store_cached(self, city_name, result):
+        """Сохранение успешного ответа в кэш"""
+        if result['success']:
+            self.cache.set(self._request_key(city_name), dict(result))
+    
+    def cache_stats(self):
+        """Счетчики кэша ответов (None, если кэш не подключен)"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def coalescing_stats(self):
+        """Число запросов к API и присоединившихся к ним одинаковых запросов"""
+        sync_stats = self._sync_flight.stats()
+        async_stats = self._async_flight.stats()
+        return {
+            'sync': sync_stats,
+            'async': async_stats,
+            'upstream_calls': sync_stats['calls'] + async_stats['calls'],
+            'shared': sync_stats['shared'] + async_stats['shared']
+        }
     
     def set_api_key(self, api_key):
         """Установка API ключа"""
@@ -26,29 +216,43 @@ class WeatherAPIHandler:
         
         return True, "API ключ валиден"
     
-    def get_current_weather_sync(self, city_name):
+    @timed()
+    def get_current_weather_sync(self, city_name, use_cache=True):
         """Синхронный запрос текущей погоды"""
         if not self.api_key:
             raise ValueError("API ключ не установлен")
         
-        params = {
-            'q': city_name,
-            'appid': self.api_key,
-            'units': 'metric',
-            'lang': 'ru'
-        }
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = self._get_cached(city_name, 'sync')
+            if cached is not None:
+                return cached
+        
+        # Одновременные запросы того же города из других потоков ждут этот же ответ
+        result = dict(self._sync_flight.do(
+            self._request_key(city_name), lambda: self._request_weather_sync(city_name)
+        ))
+        if use_cache:
+            self._store_cached(city_name, result)
+        return result
+    
+    @timed()
+    def _request_weather_sync(self, city_name):
+        """Синхронный запрос к API без кэша"""
+        import requests
+        params = self._build_params(city_name)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
-            response = requests.get(
-                OPENWEATHER_API_URL, 
+            response = self._get_session().get(
+                self.api_url, 
                 params=params, 
                 timeout=OPENWEATHER_TIMEOUT
             )
             
             if response.status_code == 200:
                 data = response.json()
-                elapsed_time = time.time() - start_time
+                elapsed_time = time.perf_counter() - start_time
                 
                 return {
                     'success': True,
@@ -57,12 +261,14 @@ class WeatherAPIHandler:
                     'method': 'sync'
                 }
             else:
-                error_data = response.json() if response.text else {}
+                # Код ответа фиксируется до разбора тела: HTML-страница прокси
+                # при 502 не должна превращаться в ошибку подключения без повтора
+                error_code = response.status_code
                 return {
                     'success': False,
-                    'error_code': response.status_code,
-                    'error_message': error_data.get('message', f"Ошибка {response.status_code}"),
-                    'elapsed_time': time.time() - start_time
+                    'error_code': error_code,
+                    'error_message': self._error_message(error_code, response.text),
+                    'elapsed_time': time.perf_counter() - start_time
                 }
                 
         except requests.exceptions.RequestException as e:
@@ -70,91 +276,181 @@ class WeatherAPIHandler:
                 'success': False,
                 'error_code': 0,
                 'error_message': f"Ошибка подключения: {str(e)}",
-                'elapsed_time': time.time() - start_time
+                'elapsed_time': time.perf_counter() - start_time
             }
         except Exception as e:
             return {
                 'success': False,
                 'error_code': 0,
                 'error_message': f"Неожиданная ошибка: {str(e)}",
-                'elapsed_time': time.time() - start_time
+                'elapsed_time': time.perf_counter() - start_time
             }
     
-    async def get_current_weather_async(self, city_name):
+    @timed()
+    async def get_current_weather_async(self, city_name, use_cache=True):
         """Асинхронный запрос текущей погоды"""
         if not self.api_key:
             raise ValueError("API ключ не установлен")
         
-        params = {
-            'q': city_name,
-            'appid': self.api_key,
-            'units': 'metric',
-            'lang': 'ru'
-        }
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cached = self._get_cached(city_name, 'async')
+            if cached is not None:
+                return cached
         
-        start_time = time.time()
+        # Одновременные запросы того же города ждут один и тот же ответ
+        result = dict(await self._async_flight.do(
+            self._request_key(city_name), lambda: self._request_weather_async(city_name)
+        ))
+        if use_cache:
+            self._store_cached(city_name, result)
+        return result
+    
+    @timed()
+    async def _request_weather_async(self, city_name):
+        """Асинхронный запрос к API без кэша"""
+        import aiohttp
+        params = self._build_params(city_name)
+        
+        start_time = time.perf_counter()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    OPENWEATHER_API_URL, 
-                    params=params, 
-                    timeout=OPENWEATHER_TIMEOUT
-                ) as response:
+            session = await self._get_async_session()
+            async with session.get(self.api_url, params=params) as response:
+                
+                if response.status == 200:
+                    data = await response.json()
+                    elapsed_time = time.perf_counter() - start_time
+                    
+                    return {
+                        'success': True,
+                        'data': self._parse_weather_data(data),
+                        'elapsed_time': elapsed_time,
+                        'method': 'async'
+                    }
+                else:
+                    error_code = response.status
+                    body = await response.text(errors='replace')
+                    return {
+                        'success': False,
+                        'error_code': error_code,
+                        'error_message': self._error_message(error_code, body),
+                        'elapsed_time': time.perf_counter() - start_time
+                    }
                     
-                    if response.status == 200:
-                        data = await response.json()
-                        elapsed_time = time.time() - start_time
-                        
-                        return {
-                            'success': True,
-                            'data': self._parse_weather_data(data),
-                            'elapsed_time': elapsed_time,
-                            'method': 'async'
-                        }
-                    else:
-                        error_data = await response.json() if response.text else {}
-                        return {
-                            'success': False,
-                            'error_code': response.status,
-                            'error_message': error_data.get('message', f"Ошибка {response.status}"),
-                            'elapsed_time': time.time() - start_time
-                        }
-                        
         except aiohttp.ClientError as e:
             return {
                 'success': False,
                 'error_code': 0,
                 'error_message': f"Ошибка подключения: {str(e)}",
-                'elapsed_time': time.time() - start_time
+                'elapsed_time': time.perf_counter() - start_time
             }
         except Exception as e:
             return {
                 'success': False,
                 'error_code': 0,
                 'error_message': f"Неожиданная ошибка: {str(e)}",
-                'elapsed_time': time.time() - start_time
+                'elapsed_time': time.perf_counter() - start_time
             }
     
-    async def get_multiple_cities_async(self, cities_list):
-        """Асинхронный запрос погоды для нескольких городов"""
-        tasks = [self.get_current_weather_async(city) for city in cities_list]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    async def _fetch_with_retries(self, city_name, semaphore, limiter, max_retries,
+                                  backoff_base, backoff_max, use_cache):
+        """Запрос одного города с ограничениями и повторами при 429/5xx"""
+        start_time = time.perf_counter()
+        attempt = 0
+        while True:
+            async with semaphore:
+                if limiter is not None:
+                    await limiter.acquire()
+                try:
+                    result = await self.get_current_weather_async(city_name, use_cache)
+                except Exception as e:
+                    result = {'success': False, 'error_code': 0, 'error_message': str(e)}
+            
+            attempt += 1
+            if (result['success'] or result.get('error_code') not in RETRY_STATUS_CODES
+                    or attempt > max_retries):
+                break
+            
+            # Экспоненциальная задержка со случайным разбросом (full jitter)
+            await asyncio.sleep(random.uniform(0, min(backoff_max, backoff_base * 2 ** (attempt - 1))))
         
-        # Обработка результатов
-        processed_results = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                processed_results.append({
-                    'city': cities_list[i],
-                    'success': False,
-                    'error_message': str(result)
-                })
-            else:
-                result['city'] = cities_list[i]
-                processed_results.append(result)
+        result['city'] = city_name
+        result['attempts'] = attempt
+        result['total_time'] = time.perf_counter() - start_time
+        return result
+    
+    async def _iter_batch(self, cities_list, max_concurrency, calls_per_minute, burst,
+                          max_retries, backoff_base, backoff_max, use_cache):
+        """Пары (индекс города, результат) в порядке завершения запросов"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limiter = TokenBucket(calls_per_minute, burst) if calls_per_minute else None
+        
+        async def fetch(index, city_name):
+            result = await self._fetch_with_retries(
+                city_name, semaphore, limiter, max_retries, backoff_base, backoff_max, use_cache
+            )
+            return index, result
+        
+        async with self:
+            tasks = [asyncio.create_task(fetch(i, city)) for i, city in enumerate(cities_list)]
+            try:
+                for future in asyncio.as_completed(tasks):
+                    yield await future
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def iter_multiple_cities_async(self, cities_list,
+                                         max_concurrency=OPENWEATHER_MAX_CONCURRENCY,
+                                         calls_per_minute=OPENWEATHER_CALLS_PER_MINUTE,
+                                         burst=OPENWEATHER_RATE_BURST,
+                                         max_retries=OPENWEATHER_MAX_RETRIES,
+                                         backoff_base=OPENWEATHER_BACKOFF_BASE,
+                                         backoff_max=OPENWEATHER_BACKOFF_MAX,
+                                         use_cache=True):
+        """
+        Пакетный асинхронный запрос погоды с ограничением параллельности и частоты
+        Результаты отдаются по мере готовности; в каждом есть city, attempts
+        и total_time (время с учетом ожидания лимитов и повторов)
+        """
+        async for _, result in self._iter_batch(
+            cities_list, max_concurrency, calls_per_minute, burst,
+            max_retries, backoff_base, backoff_max, use_cache
+        ):
+            yield result
+    
+    @timed()
+    async def get_multiple_cities_async(self, cities_list,
+                                        max_concurrency=OPENWEATHER_MAX_CONCURRENCY,
+                                        calls_per_minute=OPENWEATHER_CALLS_PER_MINUTE,
+                                        burst=OPENWEATHER_RATE_BURST,
+                                        max_retries=OPENWEATHER_MAX_RETRIES,
+                                        use_cache=True):
+        """Асинхронный запрос погоды для нескольких городов (в порядке cities_list)"""
+        processed_results = [None] * len(cities_list)
+        async for index, result in self._iter_batch(
+            cities_list, max_concurrency, calls_per_minute, burst,
+            max_retries, OPENWEATHER_BACKOFF_BASE, OPENWEATHER_BACKOFF_MAX, use_cache
+        ):
+            processed_results[index] = result
         
         return processed_results
     
+    @staticmethod
+    def _error_message(status_code, body):
+        """Сообщение об ошибке из тела ответа: поле message JSON или начало текста"""
+        try:
+            error_data = json.loads(body) if body else {}
+        except ValueError:
+            error_data = None
+        if isinstance(error_data, dict) and error_data.get('message'):
+            return str(error_data['message'])
+        text = body.strip() if body else ''
+        if text and error_data is None:
+            return f"Ошибка {status_code}: {text[:200]}"
+        return f"Ошибка {status_code}"
+    
     def _parse_weather_data(self, data):
         """Парсинг данных от API"""
         return {
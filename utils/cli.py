@@ -0,0 +1,161 @@
+"""
+Пакетный анализ исторических данных без Streamlit: полный набор расчетов
+TemperatureAnalyzer по всем городам с сохранением отчетов в Parquet/JSON
+и сводки summary.json (объем данных, время этапов и гистограммы операций
+из utils.instrumentation).
+
+Тяжелые модули (pandas, scipy, анализатор) импортируются только при
+запуске анализа, поэтому --help и разбор аргументов не ждут их загрузки.
+
+Запуск: python -m utils.cli --data data/temperature_data.csv --output reports
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from config import (
+    ANOMALY_METHOD, ANOMALY_SIGMA_THRESHOLD, DATA_CACHE_FILE_PATH, DATA_FILE_PATH, REPORTS_PATH
+)
+
+REPORTS = ('city_stats', 'seasonal_anomalies', 'trends', 'seasonal_trends', 'decade_trends', 'climatology')
+DEFAULT_REPORTS = ('city_stats', 'seasonal_anomalies', 'trends', 'seasonal_trends', 'decade_trends')
+REPORT_FORMATS = ('parquet', 'json')
+
+def build_report(analyzer, name, sigma_threshold=ANOMALY_SIGMA_THRESHOLD, method=ANOMALY_METHOD):
+    """Таблица отчета name по всем городам (векторные методы анализатора)"""
+    if name == 'city_stats':
+        return analyzer.detect_anomalies_all(by='city', sigma_threshold=sigma_threshold, method=method)
+    if name == 'seasonal_anomalies':
+        return analyzer.detect_anomalies_all(by=('city', 'season'), sigma_threshold=sigma_threshold,
+                                             method=method)
+    if name == 'trends':
+        return analyzer.calculate_trends_all(by='city')
+    if name == 'seasonal_trends':
+        return analyzer.calculate_trends_all(by=('city', 'season'))
+    if name == 'decade_trends':
+        return analyzer.calculate_trends_all(by=('city', 'decade'))
+    if name == 'climatology':
+        return analyzer.get_climatology()
+    raise ValueError(f"Неизвестный отчет: {name}")
+
+def write_report(table, path, report_format='parquet'):
+    """
+    Сохранение таблицы в path.parquet или path.json (записи)
+    Без pyarrow отчет Parquet сохраняется в JSON. Возвращает путь к файлу.
+    """
+    if report_format == 'parquet':
+        try:
+            table.to_parquet(path + '.parquet', index=False)
+            return path + '.parquet'
+        except ImportError as e:
+            print(f"Parquet недоступен ({e}), отчет сохраняется в JSON", file=sys.stderr)
+    table.to_json(path + '.json', orient='records', date_format='iso', force_ascii=False)
+    return path + '.json'
+
+def _default_cache_path(data_path):
+    """Бинарный кэш рядом с CSV (для файла по умолчанию - путь из config)"""
+    if os.path.abspath(data_path) == os.path.abspath(DATA_FILE_PATH):
+        return DATA_CACHE_FILE_PATH
+    return os.path.splitext(data_path)[0] + '.parquet'
+
+def run_analysis(data_path=DATA_FILE_PATH, output_dir=REPORTS_PATH, reports=DEFAULT_REPORTS,
+                 report_format='parquet', sigma_threshold=ANOMALY_SIGMA_THRESHOLD,
+                 method=ANOMALY_METHOD, use_cache=True):
+    """
+    Загрузка данных, построение отчетов и запись их в output_dir
+    Возвращает сводку (она же сохраняется в output_dir/summary.json)
+    """
+    start_time = time.perf_counter()
+    from .analyzer import TemperatureAnalyzer
+    from .data_loader import read_temperature_file
+    from .instrumentation import metrics
+    import_seconds = time.perf_counter() - start_time
+
+    stage_time = time.perf_counter()
+    cache_path = _default_cache_path(data_path) if use_cache else None
+    df = read_temperature_file(data_path, cache_path, compact=True)
+    load_seconds = time.perf_counter() - stage_time
+
+    stage_time = time.perf_counter()
+    analyzer = TemperatureAnalyzer(df, copy=False)
+    index_seconds = time.perf_counter() - stage_time
+
+    os.makedirs(output_dir, exist_ok=True)
+    report_summaries = {}
+    for name in reports:
+        stage_time = time.perf_counter()
+        table = build_report(analyzer, name, sigma_threshold, method)
+        path = write_report(table, os.path.join(output_dir, name), report_format)
+        report_summaries[name] = {
+            'path': path,
+            'rows': len(table),
+            'seconds': time.perf_counter() - stage_time
+        }
+
+    total_seconds = time.perf_counter() - start_time
+    summary = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'data': data_path,
+        'rows': len(df),
+        'cities': len(analyzer._city_slices),
+        'period': [str(df['timestamp'].min()), str(df['timestamp'].max())] if len(df) else None,
+        'method': method,
+        'sigma_threshold': sigma_threshold,
+        'timings': {
+            'import': import_seconds,
+            'load': load_seconds,
+            'index': index_seconds,
+            'total': total_seconds
+        },
+        'rows_per_second': len(df) / total_seconds if total_seconds > 0 else None,
+        'reports': report_summaries,
+        'operations': metrics.snapshot()
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m utils.cli',
+        description='Пакетный анализ исторических температурных данных (без Streamlit)'
+    )
+    parser.add_argument('--data', default=DATA_FILE_PATH, help='CSV с историческими данными')
+    parser.add_argument('--output', default=REPORTS_PATH, help='каталог для отчетов')
+    parser.add_argument('--reports', nargs='+', choices=REPORTS, default=list(DEFAULT_REPORTS),
+                        help='какие отчеты строить')
+    parser.add_argument('--format', dest='report_format', choices=REPORT_FORMATS, default='parquet',
+                        help='формат отчетов')
+    parser.add_argument('--sigma', type=float, default=ANOMALY_SIGMA_THRESHOLD,
+                        help='порог аномалий в стандартных отклонениях')
+    parser.add_argument('--method', choices=('global', 'climatology'), default=ANOMALY_METHOD,
+                        help='метод обнаружения аномалий')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='читать CSV без бинарного кэша Parquet')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.data):
+        print(f"Файл данных не найден: {args.data}", file=sys.stderr)
+        return 1
+
+    summary = run_analysis(
+        data_path=args.data, output_dir=args.output, reports=args.reports,
+        report_format=args.report_format, sigma_threshold=args.sigma,
+        method=args.method, use_cache=not args.no_cache
+    )
+
+    timings = summary['timings']
+    print(f"Строк: {summary['rows']:,}, городов: {summary['cities']}")
+    print(f"Импорт: {timings['import']:.2f} с, загрузка: {timings['load']:.2f} с, "
+          f"индекс: {timings['index']:.2f} с")
+    for name, report in summary['reports'].items():
+        print(f"  {name:<20} {report['rows']:>8,} строк {report['seconds']:>7.2f} с  {report['path']}")
+    print(f"Всего: {timings['total']:.2f} с ({summary['rows_per_second']:,.0f} строк/с)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from config import CLIMATOLOGY_WINDOW_DAYS
+
+DAYS_IN_YEAR = 366
+MAD_TO_SIGMA = 1.4826  # MAD нормального распределения * 1.4826 = sigma
+POOL_CHUNK_SIZE = 8_000_000  # элементов в одном блоке расчета медиан
+
+def day_of_year_index(timestamps):
+    """
+    Номер дня года 0..365 в календаре високосного года: 29 февраля - свой
+    день, а даты после февраля в обычные годы сдвигаются на 1, чтобы одна
+    и та же дата всегда получала один номер
+    """
+    timestamps = pd.DatetimeIndex(timestamps)
+    day_index = timestamps.dayofyear.to_numpy() - 1
+    return day_index + ((~timestamps.is_leap_year) & (timestamps.month > 2))
+
+def _slot_grid(values, city_codes, day_index, years, n_cities):
+    """
+    Значения в сетке (город, день года, слот) с NaN в пустых ячейках
+    Слот - год измерения; если в один день у города несколько измерений,
+    слот - номер измерения в группе (город, день года)
+    """
+    slots = years - years.min()
+    n_slots = int(slots.max()) + 1
+    cells = (city_codes.astype(np.int64) * DAYS_IN_YEAR + day_index) * n_slots + slots
+    if np.bincount(cells).max() > 1:
+        groups = city_codes.astype(np.int64) * DAYS_IN_YEAR + day_index
+        order = np.argsort(groups, kind='stable')
+        counts = np.bincount(groups, minlength=n_cities * DAYS_IN_YEAR)
+        starts = np.cumsum(counts) - counts
+        slots = np.empty(len(values), dtype=np.int64)
+        slots[order] = np.arange(len(values)) - starts[groups[order]]
+        n_slots = int(counts.max())
+
+    grid = np.full((n_cities, DAYS_IN_YEAR, n_slots), np.nan, dtype=values.dtype)
+    grid[city_codes, day_index, slots] = values
+    return grid
+
+def _nan_median(pooled):
+    """
+    Медиана по последней оси без учета NaN
+    Строки сортируются целиком (NaN уходят в конец) - для float32 сортировка
+    numpy векторизована и быстрее np.partition, - и медиана берется по числу
+    значений в каждой строке, без цикла по строкам, как в np.nanmedian
+    """
+    ordered = np.sort(pooled, axis=-1)
+    n_valid = pooled.shape[-1] - np.isnan(pooled).sum(axis=-1, keepdims=True)
+    lower = np.take_along_axis(ordered, np.maximum(n_valid - 1, 0) // 2, axis=-1)
+    upper = np.take_along_axis(ordered, n_valid // 2, axis=-1)
+    return ((lower.astype(np.float64) + upper) / 2)[..., 0]
+
+def robust_climatology(values, city_codes, day_index, years, n_cities,
+                       window_days=CLIMATOLOGY_WINDOW_DAYS):
+    """
+    Скользящая климатическая норма по дню года для всех городов
+    Для каждого (город, день года) берутся все измерения всех лет в окне
+    +-window_days дней (по кругу через границу года), по ним считаются
+    медиана и MAD (медиана абсолютных отклонений от медианы).
+    Города обрабатываются блоками по POOL_CHUNK_SIZE элементов окна.
+    Возвращает (median, mad) - массивы (n_cities, 366).
+    """
+    grid = _slot_grid(values, city_codes, day_index, years, n_cities)
+    window = (np.arange(DAYS_IN_YEAR)[:, None] + np.arange(-window_days, window_days + 1)) % DAYS_IN_YEAR
+
+    median = np.empty((n_cities, DAYS_IN_YEAR))
+    mad = np.empty((n_cities, DAYS_IN_YEAR))
+    pool_size = DAYS_IN_YEAR * window.shape[1] * grid.shape[2]
+    chunk_cities = max(1, POOL_CHUNK_SIZE // pool_size)
+    for start in range(0, n_cities, chunk_cities):
+        chunk = slice(start, start + chunk_cities)
+        pooled = grid[chunk][:, window, :].reshape(-1, DAYS_IN_YEAR, window.shape[1] * grid.shape[2])
+        median[chunk] = _nan_median(pooled)
+        deviation = np.abs(pooled - median[chunk][:, :, None].astype(pooled.dtype))
+        mad[chunk] = _nan_median(deviation)
+    return median, mad
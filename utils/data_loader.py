@@ -1,63 +1,278 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import sys
+import hashlib
+import functools
 from datetime import datetime
-import streamlit as st
-from config import DATA_FILE_PATH, SEASONAL_TEMPERATURES, MONTH_TO_SEASON
+from config import DATA_FILE_PATH, DATA_CACHE_FILE_PATH, SEASONAL_TEMPERATURES, MONTH_TO_SEASON
+from .instrumentation import timed
 
-def generate_realistic_temperature_data(cities=None, num_years=10):
-    """Генерация тестовых данных о температуре"""
+SEASONS = ['winter', 'spring', 'summer', 'autumn']
+
+def _cache_resource(func):
+    """
+    st.cache_resource, если модуль импортирован из приложения Streamlit,
+    иначе - functools.lru_cache. Сам streamlit здесь не импортируется:
+    его импорт долгий, а пакетным заданиям (utils.cli) он не нужен
+    """
+    streamlit = sys.modules.get('streamlit')
+    if streamlit is not None:
+        return streamlit.cache_resource(func)
+    return functools.lru_cache(maxsize=None)(func)
+
+def synthetic_seasonal_temperatures(num_cities):
+    """
+    Сезонные профили для num_cities синтетических городов (для нагрузочных тестов)
+    Профили берутся по кругу из SEASONAL_TEMPERATURES: "Moscow 17", "Tokyo 18", ...
+    """
+    base_cities = list(SEASONAL_TEMPERATURES.keys())
+    return {
+        f"{base_cities[i % len(base_cities)]} {i}": SEASONAL_TEMPERATURES[base_cities[i % len(base_cities)]]
+        for i in range(num_cities)
+    }
+
+def iter_temperature_data_chunks(cities=None, num_years=10, seed=None,
+                                 seasonal_temperatures=SEASONAL_TEMPERATURES, chunk_cities=100):
+    """
+    Генерация тестовых данных блоками по chunk_cities городов
+    Все случайные значения блока получаются одним вызовом Generator.normal
+    seed=None - зерно берется из глобального генератора numpy, поэтому
+    np.random.seed(...) перед вызовом, как и раньше, дает те же данные
+    """
     if cities is None:
-        cities = list(SEASONAL_TEMPERATURES.keys())
+        cities = list(seasonal_temperatures.keys())
+    if seed is None:
+        seed = np.random.randint(2**32, dtype=np.uint32)
+    rng = np.random.default_rng(seed)
     
     dates = pd.date_range(start="2010-01-01", periods=365 * num_years, freq="D")
-    data = []
-
-    for city in cities:
-        for date in dates:
-            season = MONTH_TO_SEASON[date.month]
-            mean_temp = SEASONAL_TEMPERATURES[city][season]
-            # Добавляем случайное отклонение
-            temperature = np.random.normal(loc=mean_temp, scale=5)
-            data.append({
-                "city": city, 
-                "timestamp": date, 
-                "temperature": temperature
-            })
-
-    df = pd.DataFrame(data)
-    df['season'] = df['timestamp'].dt.month.map(lambda x: MONTH_TO_SEASON[x])
+    month_season_codes = np.array([SEASONS.index(MONTH_TO_SEASON[m]) for m in range(1, 13)])
+    season_codes = month_season_codes[dates.month - 1]
+    season_names = np.array(SEASONS, dtype=object)[season_codes]
+    
+    for start in range(0, len(cities), chunk_cities):
+        chunk = cities[start:start + chunk_cities]
+        # Средняя температура каждого дня для каждого города блока: (города, даты)
+        season_means = np.array([
+            [seasonal_temperatures[city][season] for season in SEASONS] for city in chunk
+        ], dtype=np.float64)
+        temperatures = rng.normal(loc=season_means[:, season_codes], scale=5)
+        
+        yield pd.DataFrame({
+            'city': np.repeat(np.array(chunk, dtype=object), len(dates)),
+            'timestamp': np.tile(dates.values, len(chunk)),
+            'temperature': temperatures.ravel(),
+            'season': np.tile(season_names, len(chunk))
+        })
+
+@timed()
+def generate_realistic_temperature_data(cities=None, num_years=10, seed=None,
+                                        seasonal_temperatures=SEASONAL_TEMPERATURES):
+    """Генерация тестовых данных о температуре"""
+    if cities is None:
+        cities = list(seasonal_temperatures.keys())
+    
+    chunks = list(iter_temperature_data_chunks(
+        cities, num_years, seed, seasonal_temperatures, chunk_cities=max(len(cities), 1)
+    ))
+    if not chunks:
+        return pd.DataFrame(columns=['city', 'timestamp', 'temperature', 'season'])
+    return chunks[0]
+
+@timed()
+def generate_temperature_data_file(file_path, cities=None, num_years=10, seed=None,
+                                   seasonal_temperatures=SEASONAL_TEMPERATURES, chunk_cities=100):
+    """
+    Потоковая генерация тестовых данных сразу в CSV
+    В памяти одновременно находится только один блок, поэтому размер
+    набора данных не ограничен объемом RAM. Возвращает число строк.
+    """
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    total_rows = 0
+    with open(file_path, 'w', newline='') as f:
+        for i, chunk in enumerate(iter_temperature_data_chunks(
+            cities, num_years, seed, seasonal_temperatures, chunk_cities
+        )):
+            chunk.to_csv(f, header=(i == 0), index=False)
+            total_rows += len(chunk)
+    return total_rows
+
+def _csv_fingerprint(csv_path, with_hash=False):
+    """Отпечаток CSV-файла: время изменения, размер и (опционально) хэш"""
+    stat = os.stat(csv_path)
+    fingerprint = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(csv_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+def _read_data_cache(csv_path, cache_path):
+    """
+    Чтение бинарного кэша (Parquet) рядом с CSV
+    Возвращает None, если кэша нет, он устарел или pyarrow не установлен
+    """
+    meta_path = cache_path + '.json'
+    if not (os.path.exists(cache_path) and os.path.exists(meta_path)):
+        return None
+    
+    try:
+        with open(meta_path) as f:
+            cached_fingerprint = json.load(f)
+        
+        fingerprint = _csv_fingerprint(csv_path)
+        if fingerprint['size'] != cached_fingerprint.get('size'):
+            return None
+        if fingerprint['mtime_ns'] != cached_fingerprint.get('mtime_ns'):
+            # Время изменения могло поменяться без изменения содержимого
+            fingerprint = _csv_fingerprint(csv_path, with_hash=True)
+            if fingerprint['sha256'] != cached_fingerprint.get('sha256'):
+                return None
+            _write_cache_meta(meta_path, fingerprint)
+        
+        df = pd.read_parquet(cache_path)
+    except Exception as e:
+        print(f"Кэш данных не прочитан: {e}. Используется CSV.")
+        return None
+    
+    return df
+
+def _write_cache_meta(meta_path, fingerprint):
+    """
+    Обновление отпечатка CSV после проверки хэша: следующие загрузки снова
+    сравнивают только время изменения и размер, а не хэшируют весь файл
+    """
+    try:
+        _write_json_atomic(meta_path, fingerprint)
+    except OSError as e:
+        print(f"Отпечаток кэша данных не обновлен: {e}")
+
+def _write_json_atomic(path, value):
+    """Запись JSON во временный файл рядом и подмена им path"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _write_data_cache(df, csv_path, cache_path):
+    """
+    Сохранение бинарного кэша (Parquet) и отпечатка исходного CSV
+    Оба файла пишутся во временные файлы рядом и подменяют старые через
+    os.replace: сначала Parquet, затем отпечаток. Старый отпечаток удаляется
+    до подмены Parquet, поэтому при сбое или одновременной записи читатель
+    видит либо согласованную пару, либо отсутствие кэша, но не недописанный файл.
+    """
+    meta_path = cache_path + '.json'
+    tmp_cache_path = f"{cache_path}.tmp-{os.getpid()}"
+    try:
+        cache_df = df.copy()
+        cache_df['city'] = cache_df['city'].astype('category')
+        cache_df['season'] = cache_df['season'].astype('category')
+        cache_df.to_parquet(tmp_cache_path, index=False)
+        fingerprint = _csv_fingerprint(csv_path, with_hash=True)
+        
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        os.replace(tmp_cache_path, cache_path)
+        _write_json_atomic(meta_path, fingerprint)
+    except Exception as e:
+        # pyarrow не установлен или нет прав на запись - работаем только с CSV
+        print(f"Кэш данных не сохранен: {e}")
+    finally:
+        if os.path.exists(tmp_cache_path):
+            os.remove(tmp_cache_path)
+
+def compact_temperature_data(df):
+    """
+    Компактная схема данных: category для city и season, float32 для temperature
+    Названия городов хранятся один раз, а в строках - только коды
+    """
+    df = df.astype({'city': 'category', 'temperature': np.float32})
+    df['season'] = _season_categorical(df['season'])
     return df
 
-@st.cache_data
-def load_temperature_data():
+def _season_categorical(seasons):
     """
-    Загрузка данных из CSV или генерация новых
-    Возвращает DataFrame с историческими данными
+    Сезоны как category с порядком SEASONS независимо от исходного типа
+    astype(CategoricalDtype(SEASONS)) не меняет порядок категорий, если
+    столбец уже category с теми же значениями (например, из Parquet, где
+    категории упорядочены по алфавиту), поэтому коды перекодируются явно
+    """
+    if isinstance(seasons.dtype, pd.CategoricalDtype):
+        return seasons.cat.set_categories(SEASONS)
+    return seasons.astype(pd.CategoricalDtype(SEASONS))
+
+def _apply_schema(df, compact):
+    """Приведение данных к компактной или исходной (object/float64) схеме"""
+    if compact:
+        return compact_temperature_data(df)
+    # Столбцы, уже имеющие нужный тип (чтение из CSV), не копируются
+    return df.astype({'city': object, 'season': object, 'temperature': np.float64}, copy=False)
+
+@timed()
+def read_temperature_file(csv_path=DATA_FILE_PATH, cache_path=DATA_CACHE_FILE_PATH, compact=False):
+    """
+    Чтение исторических данных из CSV через бинарный кэш
+    Свежий кэш читается напрямую, устаревший пересоздается из CSV
+    """
+    df = _read_data_cache(csv_path, cache_path) if cache_path else None
+    if df is not None:
+        return _apply_schema(df, compact)
+    
+    df = pd.read_csv(csv_path)
+    
+    # Проверяем структуру данных
+    required_columns = ['city', 'timestamp', 'temperature', 'season']
+    if not all(col in df.columns for col in required_columns):
+        raise ValueError("Файл данных имеет некорректную структуру")
+    
+    # Преобразуем timestamp
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    
+    if cache_path and not df.empty:
+        _write_data_cache(df, csv_path, cache_path)
+    
+    return _apply_schema(df, compact)
+
+@timed()
+def save_temperature_data(df, csv_path=DATA_FILE_PATH, cache_path=DATA_CACHE_FILE_PATH):
+    """Сохранение данных в CSV и обновление бинарного кэша"""
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    df.to_csv(csv_path, index=False)
+    if cache_path:
+        _write_data_cache(df, csv_path, cache_path)
+
+@_cache_resource
+def load_temperature_data(compact=False):
+    """
+    Загрузка данных из CSV (через бинарный кэш) или генерация новых
+    Возвращает DataFrame с историческими данными - один объект на все сессии
+    приложения, поэтому его нельзя изменять на месте
+    compact=True - компактная схема (см. compact_temperature_data)
     """
     try:
         # Проверяем существование файла
         if not os.path.exists(DATA_FILE_PATH):
-            os.makedirs(os.path.dirname(DATA_FILE_PATH), exist_ok=True)
             df = generate_realistic_temperature_data()
-            df.to_csv(DATA_FILE_PATH, index=False)
-            return df
-        
-        # Загружаем существующий файл
-        df = pd.read_csv(DATA_FILE_PATH)
+            save_temperature_data(df)
+            return compact_temperature_data(df) if compact else df
         
-        # Проверяем структуру данных
-        required_columns = ['city', 'timestamp', 'temperature', 'season']
-        if not all(col in df.columns for col in required_columns):
-            raise ValueError("Файл данных имеет некорректную структуру")
-        
-        # Преобразуем timestamp
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Загружаем существующий файл (уже в нужной схеме)
+        df = read_temperature_file(compact=compact)
         
         # Проверяем наличие данных
         if df.empty:
             df = generate_realistic_temperature_data()
-            df.to_csv(DATA_FILE_PATH, index=False)
+            save_temperature_data(df)
+            return compact_temperature_data(df) if compact else df
         
         return df
         
@@ -65,9 +280,19 @@ def load_temperature_data():
         # В случае ошибки генерируем новые данные
         print(f"Ошибка загрузки данных: {e}. Генерация новых данных.")
         df = generate_realistic_temperature_data()
-        os.makedirs(os.path.dirname(DATA_FILE_PATH), exist_ok=True)
-        df.to_csv(DATA_FILE_PATH, index=False)
-        return df
+        save_temperature_data(df)
+        return compact_temperature_data(df) if compact else df
+
+def data_fingerprint(df):
+    """Дешевый отпечаток набора данных для ключей кэширования"""
+    if df.empty:
+        return (0,)
+    return (
+        len(df),
+        str(df['timestamp'].iloc[0]),
+        str(df['timestamp'].iloc[-1]),
+        float(df['temperature'].sum())
+    )
 
 def get_city_data(df, city_name):
     """Получение данных для конкретного города"""
@@ -0,0 +1,54 @@
+import numpy as np
+from config import HISTOGRAM_BINS
+
+BOX_WHISKER_IQR = 1.5  # усы боксплота - 1.5 межквартильного размаха (по Тьюки)
+
+def _finite_values(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[~np.isnan(values)]
+
+def histogram_summary(values, bins=HISTOGRAM_BINS):
+    """
+    Гистограмма, посчитанная на сервере: bins равных интервалов между
+    минимумом и максимумом, плюс среднее и std (ddof=1) для линий графика
+    Возвращает {'counts', 'edges', 'mean', 'std', 'count'}; размер не зависит
+    от числа измерений.
+    """
+    values = _finite_values(values)
+    if len(values) == 0:
+        return {'counts': np.zeros(0, dtype=np.int64), 'edges': np.zeros(0),
+                'mean': np.nan, 'std': np.nan, 'count': 0}
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        'counts': counts,
+        'edges': edges,
+        'mean': float(values.mean()),
+        'std': float(values.std(ddof=1)) if len(values) > 1 else np.nan,
+        'count': len(values)
+    }
+
+def box_summary(values, whisker_iqr=BOX_WHISKER_IQR):
+    """
+    Статистика боксплота: квартили (линейная интерполяция, как quartilemethod
+    'linear' в Plotly), усы - крайние значения в пределах whisker_iqr * IQR
+    от квартилей, выбросы - значения за усами, среднее и std (ddof=1)
+    Возвращает словарь или None для пустого ряда.
+    """
+    values = np.sort(_finite_values(values))
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    lo = np.searchsorted(values, q1 - whisker_iqr * iqr, side='left')
+    hi = np.searchsorted(values, q3 + whisker_iqr * iqr, side='right')
+    return {
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'lowerfence': float(values[lo]),
+        'upperfence': float(values[hi - 1]),
+        'mean': float(values.mean()),
+        'sd': float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+        'outliers': np.concatenate((values[:lo], values[hi:])),
+        'count': len(values)
+    }
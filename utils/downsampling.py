@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from config import PLOT_MAX_POINTS, PLOT_DOWNSAMPLING
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+def _numeric_x(x):
+    """Ось X как float64 (даты - наносекунды) для расчета площадей"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').view(np.int64)
+    return x.astype(np.float64)
+
+def minmax_indices(y, n_out):
+    """
+    Прореживание min/max: ряд делится на n_out // 2 корзин равной длины,
+    в каждой остаются минимум и максимум (в порядке следования). Пики
+    сохраняются точно, поэтому линия выглядит как полная на той же ширине
+    в пикселях. Полностью векторизовано.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n_buckets = max(n_out // 2, 1)
+    edges = np.linspace(0, len(y), n_buckets + 1).astype(np.int64)
+    starts = edges[:-1][np.diff(edges) > 0]
+    # Корзины неравной длины: NaN на месте пропусков не влияют на fmin/fmax
+    filled = np.where(np.isnan(y), -np.inf, y)
+    max_pos = _bucket_argext(filled, starts, np.maximum)
+    filled = np.where(np.isnan(y), np.inf, y)
+    min_pos = _bucket_argext(filled, starts, np.minimum)
+    return np.unique(np.concatenate((min_pos, max_pos)))
+
+def _bucket_argext(values, starts, ufunc):
+    """Позиция экстремума (первая при равенстве) в каждой корзине [starts[i], starts[i+1])"""
+    extreme = ufunc.reduceat(values, starts)
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(values))))
+    hits = np.flatnonzero(values == extreme[bucket])
+    first = np.unique(bucket[hits], return_index=True)[1]
+    return hits[first]
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013): первая и последняя
+    точки сохраняются, остальные делятся на n_out - 2 корзины, и из каждой
+    берется точка, образующая наибольший треугольник с точкой, выбранной
+    в предыдущей корзине, и средней точкой следующей корзины. Форма ряда
+    сохраняется лучше, чем при шаге через равные интервалы.
+    Цикл идет по корзинам (их не больше бюджета пикселей), площади внутри
+    корзины считаются векторно.
+    """
+    x = _numeric_x(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Средние точки корзин; для последней корзины "следующая" - последняя точка
+    valid = ~np.isnan(y)
+    sums_x = np.add.reduceat(np.where(valid, x, 0.0), edges[:-1])
+    sums_y = np.add.reduceat(np.where(valid, y, 0.0), edges[:-1])
+    counts = np.maximum(np.add.reduceat(valid.astype(np.int64), edges[:-1]), 1)
+    avg_x = np.append(sums_x / counts, x[-1])[1:]
+    avg_y = np.append(sums_y / counts, y[-1])[1:]
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[i] - ay))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        selected[i + 1] = a
+    return selected
+
+def downsample_indices(x, y, max_points=PLOT_MAX_POINTS, method=PLOT_DOWNSAMPLING, keep=None):
+    """
+    Позиции точек ряда после прореживания до max_points (бюджет пикселей)
+    keep - булева маска точек, которые остаются всегда (например, аномалии).
+    Ряды не длиннее бюджета возвращаются целиком.
+    """
+    n = len(y)
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Неизвестный метод прореживания: {method}")
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    if method == 'lttb':
+        positions = lttb_indices(x, y, max_points)
+    else:
+        positions = minmax_indices(y, max_points)
+    if keep is not None:
+        positions = np.union1d(positions, np.flatnonzero(np.asarray(keep, dtype=bool)))
+    return positions
+
+def downsample_timeseries(data, max_points=PLOT_MAX_POINTS, method=PLOT_DOWNSAMPLING,
+                          date_range=None, x='timestamp', y='temperature', keep='is_anomaly'):
+    """
+    Данные для графика временного ряда: сортировка по времени, выбор периода
+    date_range = (начало, конец) и прореживание до max_points строк
+    При приближении достаточно заново вызвать функцию с более узким периодом:
+    бюджет точек тратится только на видимый участок, и детали возвращаются.
+    Строки из столбца keep (если он есть) сохраняются всегда.
+    """
+    data = data.sort_values(x)
+    if date_range is not None:
+        start, end = (pd.Timestamp(bound) for bound in date_range)
+        timestamps = data[x]
+        data = data[(timestamps >= start) & (timestamps <= end)]
+    keep_mask = data[keep].to_numpy(dtype=bool) if keep in data.columns else None
+    positions = downsample_indices(
+        data[x].to_numpy(), data[y].to_numpy(dtype=np.float64),
+        max_points=max_points, method=method, keep=keep_mask
+    )
+    if len(positions) == len(data):
+        return data
+    return data.iloc[positions]
@@ -0,0 +1,90 @@
+import io
+import json
+import math
+import threading
+import time
+from config import FIGURE_CACHE_SIZE, FIGURE_PNG_DPI
+from .response_cache import MemoryResponseCache
+from .instrumentation import metrics
+
+def _freeze(value):
+    """Параметры графика -> хешируемое значение для ключа кэша"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_freeze(item) for item in value]
+        return tuple(sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items)
+    return value
+
+class FigureCache:
+    """Кэш готовых графиков с вытеснением LRU
+
+    Ключ - (функция, город, параметры, отпечаток данных), поэтому после
+    смены набора данных старые графики просто перестают запрашиваться и
+    вытесняются. Хранятся сериализованные результаты: JSON фигур Plotly и
+    PNG графиков matplotlib - повторный показ не строит фигуру заново.
+    Для каждой функции считается число и суммарное время построений.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self._cache = MemoryResponseCache(ttl=math.inf, maxsize=maxsize)
+        self._builds = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind, name, city=None, params=None, fingerprint=None):
+        """Ключ кэша: (тип, функция, город, параметры, отпечаток данных)"""
+        return (kind, name, city, _freeze(params or {}), _freeze(fingerprint))
+
+    def _get_or_build(self, kind, name, build, serialize, city, params, fingerprint):
+        key = self.make_key(kind, name, city, params, fingerprint)
+        value = self._cache.get(key)
+        if value is None:
+            start_time = time.perf_counter_ns()
+            value = serialize(build())
+            elapsed_ns = time.perf_counter_ns() - start_time
+            if metrics.enabled:
+                metrics.observe(f"FigureCache.{name}", elapsed_ns)
+            elapsed = elapsed_ns / 1e9
+            with self._lock:
+                count, total = self._builds.get(name, (0, 0.0))
+                self._builds[name] = (count + 1, total + elapsed)
+            self._cache.set(key, value)
+        return value
+
+    def plotly_figure(self, name, build, city=None, params=None, fingerprint=None):
+        """
+        Фигура Plotly из кэша или построенная build() при промахе
+        Возвращает словарь фигуры (его принимают st.plotly_chart и go.Figure)
+        """
+        import plotly.io as pio
+        spec = self._get_or_build(
+            'plotly', name, build, lambda fig: pio.to_json(fig, validate=False),
+            city, params, fingerprint
+        )
+        return json.loads(spec)
+
+    def matplotlib_png(self, name, build, city=None, params=None, fingerprint=None,
+                       dpi=FIGURE_PNG_DPI):
+        """PNG графика matplotlib из кэша (фигура закрывается после рендера)"""
+        def serialize(fig):
+            import matplotlib.pyplot as plt
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+            plt.close(fig)
+            return buffer.getvalue()
+
+        return self._get_or_build('png', name, build, serialize, city, params, fingerprint)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        """Счетчики кэша и время построения графиков по функциям"""
+        stats = self._cache.stats()
+        with self._lock:
+            stats['builds'] = {
+                name: {'count': count, 'total_ms': total * 1000, 'mean_ms': total * 1000 / count}
+                for name, (count, total) in self._builds.items()
+            }
+        return stats
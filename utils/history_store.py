@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from config import DATA_FILE_PATH, HISTORY_STORE_PATH
+from .data_loader import SEASONS, _csv_fingerprint, _season_categorical, read_temperature_file
+
+STORE_VERSION = 1
+INDEX_FILE = 'index.json'
+
+def _codes_dtype(n_categories):
+    """Тип кодов, который pandas использует для Categorical с n_categories"""
+    if n_categories < np.iinfo(np.int8).max:
+        return np.int8
+    if n_categories < np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
+def _partition_history(df):
+    """
+    Столбцы истории в порядке (город, время) и индекс блоков городов
+    Возвращает (arrays, index): arrays - temperature, timestamp, city, season
+    (коды категорий), index - rows, cities, seasons, offsets
+    """
+    cities = df['city'].astype('category').cat.remove_unused_categories()
+    seasons = _season_categorical(df['season'])
+    city_codes = cities.cat.codes.to_numpy()
+    timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]')
+    order = np.lexsort((timestamps.view(np.int64), city_codes))
+
+    counts = np.bincount(city_codes, minlength=len(cities.cat.categories))
+    arrays = {
+        'temperature': df['temperature'].to_numpy()[order],
+        'timestamp': timestamps[order],
+        'city': city_codes[order],
+        'season': seasons.cat.codes.to_numpy()[order]
+    }
+    index = {
+        'rows': len(df),
+        'cities': list(cities.cat.categories),
+        'seasons': SEASONS,
+        'offsets': np.concatenate(([0], np.cumsum(counts))).tolist()
+    }
+    return arrays, index
+
+def _history_frame(arrays, index):
+    """DataFrame в компактной схеме поверх готовых массивов (без копирования)"""
+    columns = [
+        pd.Series(pd.Categorical.from_codes(arrays['city'], categories=index['cities']),
+                  name='city', copy=False),
+        pd.Series(arrays['timestamp'], name='timestamp', copy=False),
+        pd.Series(arrays['temperature'], name='temperature', copy=False),
+        pd.Series(pd.Categorical.from_codes(arrays['season'], categories=index['seasons']),
+                  name='season', copy=False)
+    ]
+    return pd.concat(columns, axis=1, copy=False)
+
+def write_history_store(df, path=HISTORY_STORE_PATH, source_fingerprint=None):
+    """
+    Запись истории в бинарное хранилище фиксированной структуры
+    Строки упорядочены по городу и времени; каждый столбец - отдельный .npy
+    (temperature - float32), а offsets в index.json задают блок каждого города.
+    Файлы сначала пишутся во временный каталог, который затем подменяет
+    старый, поэтому уже открытые другими процессами отображения остаются целыми.
+    """
+    arrays, index = _partition_history(df)
+    arrays['temperature'] = arrays['temperature'].astype(np.float32)
+    arrays['city'] = arrays['city'].astype(_codes_dtype(len(index['cities'])))
+    arrays['season'] = arrays['season'].astype(_codes_dtype(len(index['seasons'])))
+    index.update(version=STORE_VERSION, source=source_fingerprint)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+    with open(os.path.join(tmp_path, INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def _read_index(path):
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        index = json.load(f)
+    return index if index.get('version') == STORE_VERSION else None
+
+class HistoryStore:
+    """Memory-mapped хранилище истории температур
+
+    Массивы открываются через numpy.memmap (np.load с mmap_mode='c'),
+    поэтому все процессы, открывшие хранилище, используют одни и те же
+    страницы кэша ОС без десериализации и без собственных копий данных.
+    Отображение копируется при записи: некоторые операции pandas пишут во
+    входной массив на месте (например, медиана), такие страницы становятся
+    частными для процесса, а файлы хранилища не изменяются.
+    """
+
+    def __init__(self, path=HISTORY_STORE_PATH):
+        self.path = path
+        self.index = _read_index(path)
+        if self.index is None:
+            raise FileNotFoundError(f"Хранилище истории не найдено: {path}")
+
+        self.cities = self.index['cities']
+        self.seasons = self.index['seasons']
+        self.offsets = self.index['offsets']
+        self._city_positions = {city: i for i, city in enumerate(self.cities)}
+        self.arrays = {
+            name: self._load(name) for name in ('temperature', 'timestamp', 'city', 'season')
+        }
+        self.temperature = self.arrays['temperature']
+        self.timestamp = self.arrays['timestamp']
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='c')
+
+    def __len__(self):
+        return self.index['rows']
+
+    def city_slice(self, city_name):
+        """Блок строк города (пустой для неизвестного города)"""
+        i = self._city_positions.get(city_name)
+        if i is None:
+            return slice(0, 0)
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def get_city_temperatures(self, city_name):
+        """Температуры города - представление memmap без копирования"""
+        return self.temperature[self.city_slice(city_name)]
+
+    def to_frame(self):
+        """
+        DataFrame в компактной схеме, столбцы которого ссылаются на memmap
+        Как и результат load_temperature_data, его нельзя изменять на месте
+        """
+        return _history_frame(self.arrays, self.index)
+
+def open_history_store(path=HISTORY_STORE_PATH, csv_path=DATA_FILE_PATH):
+    """
+    Открытие хранилища истории
+    Если его нет или исходный CSV изменился, хранилище пересобирается из CSV
+    """
+    fingerprint = _csv_fingerprint(csv_path)
+    index = _read_index(path)
+    source = index.get('source') if index else None
+    is_fresh = source is not None and all(
+        source.get(key) == fingerprint[key] for key in ('mtime_ns', 'size')
+    )
+    if not is_fresh:
+        df = read_temperature_file(csv_path)
+        write_history_store(df, path, _csv_fingerprint(csv_path, with_hash=True))
+    return HistoryStore(path)
@@ -0,0 +1,194 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from config import METRICS_ENABLED, METRICS_BUCKETS_MS
+
+class LatencyHistogram:
+    """Гистограмма длительностей операции с фиксированными границами (мс)
+
+    Хранятся только счетчики по интервалам, сумма, минимум и максимум, поэтому
+    память не растет с числом замеров. Перцентили оцениваются по интервалам.
+    """
+
+    def __init__(self, buckets_ms=METRICS_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)  # последний - выше всех границ
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_ms = float('inf')
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms):
+        self.counts[bisect_left(self.buckets_ms, elapsed_ms)] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+        if elapsed_ms < self.min_ms:
+            self.min_ms = elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def quantile(self, q):
+        """Оценка квантиля линейной интерполяцией внутри интервала"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets_ms[i - 1] if i > 0 else 0.0
+                upper = self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+                lower, upper = max(lower, self.min_ms), min(upper, self.max_ms)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max_ms
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum_ms': self.sum_ms,
+            'mean_ms': self.sum_ms / self.count if self.count else None,
+            'min_ms': self.min_ms if self.count else None,
+            'max_ms': self.max_ms if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets_ms + ('+Inf',), self.counts)}
+        }
+
+class MetricsRegistry:
+    """Гистограммы длительностей по операциям
+
+    Замеры - time.perf_counter_ns через декоратор timed или контекстный
+    менеджер timer. При enabled=False обертка сразу вызывает функцию:
+    накладные расходы - одна проверка флага.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, buckets_ms=METRICS_BUCKETS_MS):
+        self.enabled = enabled
+        self.buckets_ms = tuple(buckets_ms)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, elapsed_ns):
+        """Учет одного замера операции name (наносекунды)"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram(self.buckets_ms)
+            histogram.observe(elapsed_ns / 1e6)
+
+    @contextmanager
+    def timer(self, name):
+        """Замер блока кода: with metrics.timer('operation'): ..."""
+        if not self.enabled:
+            yield
+            return
+        start_time = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter_ns() - start_time)
+
+    def timed(self, name=None):
+        """
+        Декоратор замера функции (обычной или async)
+        По умолчанию операция называется по __qualname__ функции.
+        """
+        def decorate(func):
+            operation = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    start_time = time.perf_counter_ns()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(operation, time.perf_counter_ns() - start_time)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start_time = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(operation, time.perf_counter_ns() - start_time)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Сводка по операциям: {операция: count, перцентили, интервалы}"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._histograms.items())}
+
+    def to_json(self):
+        return json.dumps({'enabled': self.enabled, 'operations': self.snapshot()},
+                          ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, metric='weather_operation_duration_seconds'):
+        """Текстовый формат Prometheus (гистограмма в секундах, метка operation)"""
+        lines = [
+            f"# HELP {metric} Длительность операций приложения",
+            f"# TYPE {metric} histogram"
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets_ms + (None,), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound is None else repr(bound / 1000)
+                    lines.append(f'{metric}_bucket{{operation="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{operation="{label}"}} {histogram.sum_ms / 1000!r}')
+                lines.append(f'{metric}_count{{operation="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host='127.0.0.1', port=9100):
+        """
+        HTTP-эндпоинт метрик в фоновом потоке: /metrics (Prometheus) и
+        /metrics.json. Возвращает сервер (остановка - shutdown()).
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = registry.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+# Общий реестр процесса: им размечены загрузчик, анализатор, API и графики
+metrics = MetricsRegistry()
+timed = metrics.timed
+timer = metrics.timer
@@ -0,0 +1,211 @@
+import math
+import numpy as np
+import pandas as pd
+from config import ANOMALY_SIGMA_THRESHOLD, MONTH_TO_SEASON
+
+class HistogramSketch:
+    """Потоковая оценка квантилей по гистограмме с фиксированными корзинами
+
+    Диапазон температур ограничен, поэтому гистограмма с шагом resolution
+    дает квантили с точностью до шага, обновляется за O(новых значений)
+    и объединяется простым сложением счетчиков.
+    """
+
+    def __init__(self, low=-90.0, high=70.0, resolution=0.1):
+        self.low = low
+        self.high = high
+        self.resolution = resolution
+        self.counts = np.zeros(int(round((high - low) / resolution)), dtype=np.int64)
+
+    def add(self, value):
+        if not math.isfinite(value):
+            return
+        index = int((value - self.low) // self.resolution)
+        self.counts[min(max(index, 0), len(self.counts) - 1)] += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        bins = np.floor((values[np.isfinite(values)] - self.low) / self.resolution)
+        bins = np.clip(bins, 0, len(self.counts) - 1).astype(np.int64)
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def merge(self, other):
+        if (self.low, self.high, self.resolution) != (other.low, other.high, other.resolution):
+            raise ValueError("Нельзя объединить гистограммы с разными корзинами")
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q):
+        """Квантиль с линейной интерполяцией внутри корзины"""
+        total = self.counts.sum()
+        if total == 0:
+            return float('nan')
+        cumulative = np.cumsum(self.counts)
+        target = q * total
+        index = int(np.searchsorted(cumulative, target, side='left'))
+        index = min(index, len(self.counts) - 1)
+        previous = cumulative[index - 1] if index > 0 else 0
+        fraction = (target - previous) / self.counts[index] if self.counts[index] else 0.0
+        return self.low + (index + fraction) * self.resolution
+
+class RunningStats:
+    """Инкрементальная статистика одного ряда: count, mean, var (Welford), min, max, квантили
+
+    Пропуски (None, NaN, inf) не учитываются, как skipna в pandas: в потоке
+    показаний API они встречаются регулярно.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = HistogramSketch()
+
+    def add(self, value):
+        """Добавление одного значения за O(1)"""
+        if value is None or not math.isfinite(value):
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sketch.add(value)
+
+    def update(self, values):
+        """Добавление пачки значений за O(len(values))"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        batch.sketch.update(values)
+        return self.merge(batch)
+
+    def merge(self, other):
+        """Объединение со статистикой другого раздела (формула Чана)"""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count > 1 else float('nan')
+
+    def bounds(self, sigma_threshold=ANOMALY_SIGMA_THRESHOLD):
+        return {
+            'lower': self.mean - sigma_threshold * self.std,
+            'upper': self.mean + sigma_threshold * self.std
+        }
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+class OnlineTemperatureStats:
+    """Инкрементальная статистика температур по (город, сезон)
+
+    Новые измерения добавляются за O(новых строк) без пересчета истории;
+    границы аномалий сразу отражают добавленные значения.
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Начальное заполнение по историческим данным"""
+        online_stats = cls()
+        online_stats.update(df)
+        return online_stats
+
+    def _group(self, city_name, season):
+        key = (city_name, season)
+        if key not in self.groups:
+            self.groups[key] = RunningStats()
+        return self.groups[key]
+
+    def add(self, city_name, season, temperature):
+        """Добавление одного измерения"""
+        self._group(city_name, season).add(temperature)
+
+    def update(self, readings):
+        """
+        Добавление измерений из DataFrame со столбцами city, temperature
+        и season (или timestamp, по которому определяется сезон)
+        """
+        if 'season' in readings.columns:
+            seasons = readings['season']
+        else:
+            seasons = pd.to_datetime(readings['timestamp']).dt.month.map(MONTH_TO_SEASON)
+
+        grouped = readings['temperature'].groupby([readings['city'], seasons], sort=False, observed=True)
+        for (city_name, season), values in grouped:
+            self._group(city_name, season).update(values.to_numpy())
+        return self
+
+    def merge(self, other):
+        """Объединение со статистикой другого раздела данных"""
+        for (city_name, season), group_stats in other.groups.items():
+            self._group(city_name, season).merge(group_stats)
+        return self
+
+    def get(self, city_name, season):
+        return self.groups.get((city_name, season))
+
+    def check_temperature(self, city_name, current_temp, current_season,
+                          sigma_threshold=ANOMALY_SIGMA_THRESHOLD):
+        """Проверка температуры по текущим границам (формат как в TemperatureAnalyzer)"""
+        group_stats = self.get(city_name, current_season)
+        if group_stats is None or group_stats.count == 0:
+            return None
+
+        bounds = group_stats.bounds(sigma_threshold)
+        return {
+            'current_temp': current_temp,
+            'season_mean': group_stats.mean,
+            'season_std': group_stats.std,
+            'bounds': bounds,
+            'is_anomalous': current_temp < bounds['lower'] or current_temp > bounds['upper'],
+            'deviation': current_temp - group_stats.mean
+        }
+
+    def to_frame(self, sigma_threshold=ANOMALY_SIGMA_THRESHOLD):
+        """Сводная таблица по всем группам"""
+        rows = []
+        for (city_name, season), group_stats in self.groups.items():
+            bounds = group_stats.bounds(sigma_threshold)
+            rows.append({
+                'city': city_name,
+                'season': season,
+                'count': group_stats.count,
+                'mean': group_stats.mean,
+                'std': group_stats.std,
+                'min': group_stats.min,
+                'max': group_stats.max,
+                'q25': group_stats.quantile(0.25),
+                'q50': group_stats.quantile(0.5),
+                'q75': group_stats.quantile(0.75),
+                'lower': bounds['lower'],
+                'upper': bounds['upper']
+            })
+        return pd.DataFrame(rows)
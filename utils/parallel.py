@@ -0,0 +1,137 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from config import PARALLEL_MAX_WORKERS, PARALLEL_SHARDS_PER_WORKER
+from .analyzer import TemperatureAnalyzer
+from .history_store import _history_frame, _partition_history
+
+def analyze_city(analyzer, city_name):
+    """Полный набор анализа одного города: статистика, сезоны, аномалии, тренд"""
+    anomalies = analyzer.detect_anomalies(city_name)
+    return {
+        'basic_stats': analyzer.get_basic_stats(city_name),
+        'seasonal_stats': analyzer.get_seasonal_stats(city_name),
+        'anomalies': anomalies['stats'],
+        'n_anomalies': len(anomalies['anomalies']),
+        'trends': analyzer.calculate_trends(city_name)
+    }
+
+def analyze_cities(analyzer, cities):
+    """Последовательный анализ списка городов (эталон для параллельного режима)"""
+    return {city_name: analyze_city(analyzer, city_name) for city_name in cities}
+
+# Состояние рабочего процесса: анализатор поверх разделяемой памяти
+_worker_analyzer = None
+_worker_blocks = []
+
+def _init_worker(layout, index):
+    """Подключение к разделяемой памяти и создание анализатора (один раз на процесс)"""
+    global _worker_analyzer
+    arrays = {}
+    for column, (name, dtype, shape) in layout.items():
+        # Процессы spawn используют трекер ресурсов родителя, который и удаляет блоки
+        block = SharedMemory(name=name)
+        _worker_blocks.append(block)
+        arrays[column] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _worker_analyzer = TemperatureAnalyzer(_history_frame(arrays, index), copy=False)
+
+def _worker_ready():
+    return _worker_analyzer is not None
+
+def _analyze_shard(cities):
+    return analyze_cities(_worker_analyzer, cities)
+
+class ParallelAnalyzer:
+    """Параллельный анализ городов в пуле процессов
+
+    Данные, упорядоченные по городу и времени, один раз копируются в блоки
+    multiprocessing.shared_memory; рабочие процессы подключаются к ним
+    при старте и строят TemperatureAnalyzer без копирования, поэтому между
+    процессами передаются только списки городов и итоговые словари.
+    Города делятся на шарды (по PARALLEL_SHARDS_PER_WORKER на процесс),
+    сбалансированные по числу строк.
+    """
+
+    def __init__(self, df, max_workers=PARALLEL_MAX_WORKERS,
+                 shards_per_worker=PARALLEL_SHARDS_PER_WORKER):
+        self.max_workers = max_workers
+        self.shards_per_worker = shards_per_worker
+        self._blocks = []
+        self._executor = None
+
+        arrays, self.index = _partition_history(df)
+        offsets = self.index['offsets']
+        self.city_rows = {
+            city_name: offsets[i + 1] - offsets[i] for i, city_name in enumerate(self.index['cities'])
+        }
+        self._layout = {}
+        try:
+            for column, values in arrays.items():
+                block = SharedMemory(create=True, size=max(values.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+                self._layout[column] = (block.name, values.dtype.str, values.shape)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """
+        Запуск пула процессов (spawn - безопасно для многопоточного Streamlit)
+        Возвращает время запуска в секундах: оно не входит во время анализа
+        """
+        start_time = time.perf_counter()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self._layout, self.index)
+            )
+            # Одновременные задачи заставляют пул сразу поднять все процессы
+            futures = [self._executor.submit(_worker_ready) for _ in range(self.max_workers)]
+            for future in futures:
+                future.result()
+        return time.perf_counter() - start_time
+
+    def _make_shards(self, cities):
+        """Распределение городов по шардам: самый крупный город - в наименее загруженный шард"""
+        n_shards = min(len(cities), self.max_workers * self.shards_per_worker)
+        shards = [[] for _ in range(n_shards)]
+        loads = np.zeros(n_shards)
+        for city_name in sorted(cities, key=lambda city: -self.city_rows.get(city, 0)):
+            i = int(np.argmin(loads))
+            shards[i].append(city_name)
+            loads[i] += self.city_rows.get(city_name, 0)
+        return shards
+
+    def analyze(self, cities=None):
+        """Полный анализ городов (по умолчанию всех) в пуле; порядок - как в cities"""
+        if cities is None:
+            cities = self.index['cities']
+        if not cities:
+            return {}
+        self.start()
+
+        results = {}
+        for shard_results in self._executor.map(_analyze_shard, self._make_shards(cities)):
+            results.update(shard_results)
+        return {city_name: results[city_name] for city_name in cities}
+
+    def close(self):
+        """Остановка пула и освобождение разделяемой памяти"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
@@ -0,0 +1,166 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from config import OPENWEATHER_CACHE_TTL, OPENWEATHER_CACHE_SIZE, WEATHER_CACHE_FILE_PATH
+
+class ResponseCache(ABC):
+    """Базовый класс кэша ответов API с TTL, вытеснением LRU и счетчиками"""
+
+    def __init__(self, ttl=OPENWEATHER_CACHE_TTL, maxsize=OPENWEATHER_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(city_name, units, lang):
+        """Ключ кэша: (город, единицы, язык)"""
+        return (city_name.strip().lower(), units, lang)
+
+    def get(self, key):
+        """Значение по ключу или None, если его нет или истек TTL"""
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Сохранение значения с вытеснением давно не используемых записей"""
+        with self._lock:
+            self.evictions += self._set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """Счетчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self)
+        }
+
+    @abstractmethod
+    def __len__(self):
+        """Число записей в кэше"""
+
+    @abstractmethod
+    def _get(self, key):
+        """Значение по ключу или None (вызывается под блокировкой)"""
+
+    @abstractmethod
+    def _set(self, key, value):
+        """Сохранение значения; возвращает число вытесненных записей"""
+
+    @abstractmethod
+    def _clear(self):
+        """Удаление всех записей"""
+
+class MemoryResponseCache(ResponseCache):
+    """Кэш ответов в памяти процесса"""
+
+    def __init__(self, ttl=OPENWEATHER_CACHE_TTL, maxsize=OPENWEATHER_CACHE_SIZE):
+        super().__init__(ttl, maxsize)
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def _clear(self):
+        self._entries.clear()
+
+class SQLiteResponseCache(ResponseCache):
+    """Кэш ответов в файле SQLite, переживающий перезапуск приложения"""
+
+    def __init__(self, path=WEATHER_CACHE_FILE_PATH, ttl=OPENWEATHER_CACHE_TTL,
+                 maxsize=OPENWEATHER_CACHE_SIZE):
+        super().__init__(ttl, maxsize)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Кэш можно потерять без последствий - не ждем fsync на каждое обращение
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)"
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    @staticmethod
+    def _encode_key(key):
+        return '|'.join(map(str, key))
+
+    def _get(self, key):
+        db_key = self._encode_key(key)
+        row = self._conn.execute(
+            "SELECT value, expires FROM responses WHERE key = ?", (db_key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if row[1] < now:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (db_key,))
+            self._conn.commit()
+            return None
+
+        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, db_key))
+        self._conn.commit()
+        return pickle.loads(row[0])
+
+    def _set(self, key, value):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (self._encode_key(key), pickle.dumps(value), now + self.ttl, now)
+        )
+        evicted = self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,)
+        ).rowcount
+        self._conn.commit()
+        return evicted
+
+    def _clear(self):
+        self._conn.execute("DELETE FROM responses")
+        self._conn.commit()
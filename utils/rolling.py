@@ -0,0 +1,166 @@
+import math
+import numpy as np
+from config import ROLLING_WINDOWS, ROLLING_CACHE_SIZE
+from .response_cache import MemoryResponseCache
+
+ROLLING_STATS = ('mean', 'std', 'min', 'max')
+
+def _window_offsets(window):
+    """Границы центрированного окна как в pandas rolling(center=True)"""
+    left = window // 2
+    return left, window - 1 - left
+
+def _rows_matrix(values, lengths, pad_left, pad_right):
+    """
+    Ряды, записанные подряд в values, как строки матрицы с отступами слева
+    и справа; пустые места - NaN. Возвращает матрицу и позиции значений
+    в матрице результатов (строки x max(lengths)) или None, если ряды
+    одинаковой длины и позиции совпадают с порядком values.
+    """
+    width = int(lengths.max())
+    matrix = np.full((len(lengths), pad_left + width + pad_right), np.nan)
+    if len(lengths) * width == len(values):
+        matrix[:, pad_left:pad_left + width] = values.reshape(len(lengths), width)
+        return matrix, None
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    cols = np.arange(len(values)) - np.repeat(starts, lengths)
+    matrix[rows, pad_left + cols] = values
+    return matrix, rows * width + cols
+
+def _sliding_extreme(matrix, window, ufunc):
+    """
+    Экстремум по всем окнам длины window в каждой строке (алгоритм ван Херка -
+    Гил-Вермана): строки режутся на блоки длины window, окно покрывает хвост
+    одного блока и начало следующего, поэтому ответ - ufunc суффиксного и
+    префиксного накопления. O(n) независимо от длины окна, как и очередь
+    с монотонным деком, но без цикла по элементам. ufunc - np.fmin/np.fmax,
+    пропускающие NaN.
+    """
+    n_rows, width = matrix.shape
+    n_blocks = -(-width // window)
+    padded = np.full((n_rows, n_blocks * window), np.nan)
+    padded[:, :width] = matrix
+    blocks = padded.reshape(n_rows, n_blocks, window)
+    prefix = ufunc.accumulate(blocks, axis=2).reshape(n_rows, -1)
+    suffix = ufunc.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(n_rows, -1)
+    n_windows = width - window + 1
+    return ufunc(suffix[:, :n_windows], prefix[:, window - 1:window - 1 + n_windows])
+
+def rolling_window_stats(values, lengths=None, windows=ROLLING_WINDOWS, stats=ROLLING_STATS):
+    """
+    Центрированные скользящие статистики (как rolling(center=True,
+    min_periods=1) в pandas, std с ddof=1) для нескольких окон за один проход
+    values - ряды подряд (например, города в порядке индекса разделов),
+    lengths - длины рядов (по умолчанию один ряд). Окна не выходят за
+    границы ряда, NaN пропускаются. Суммы для mean и std берутся из
+    префиксных сумм, посчитанных один раз для всех окон; min и max -
+    см. _sliding_extreme.
+    Возвращает {окно: {статистика: массив той же длины, что values}}.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.asarray([len(values)] if lengths is None else lengths, dtype=np.int64)
+    if len(values) == 0:
+        return {window: {stat: np.empty(0) for stat in stats} for window in windows}
+
+    offsets = {window: _window_offsets(window) for window in windows}
+    pad_left = max(left for left, _ in offsets.values())
+    pad_right = max(right for _, right in offsets.values())
+    matrix, positions = _rows_matrix(values, lengths, pad_left, pad_right)
+    width = int(lengths.max())
+
+    def flatten(result):
+        return result.ravel() if positions is None else result.ravel()[positions]
+
+    results = {window: {} for window in windows}
+    if 'mean' in stats or 'std' in stats:
+        valid = ~np.isnan(matrix)
+        counts = np.zeros((matrix.shape[0], matrix.shape[1] + 1), dtype=np.int64)
+        np.cumsum(valid, axis=1, out=counts[:, 1:])
+        # Центрирование по среднему ряда сохраняет точность префиксных сумм
+        row_means = np.where(valid, matrix, 0.0).sum(axis=1) / np.maximum(counts[:, -1], 1)
+        centered = np.where(valid, matrix - row_means[:, None], 0.0)
+        sums = np.zeros(counts.shape)
+        np.cumsum(centered, axis=1, out=sums[:, 1:])
+        squares = np.zeros(counts.shape)
+        np.cumsum(centered ** 2, axis=1, out=squares[:, 1:])
+
+        for window, (left, right) in offsets.items():
+            lo = slice(pad_left - left, pad_left - left + width)
+            hi = slice(pad_left + right + 1, pad_left + right + 1 + width)
+            count = counts[:, hi] - counts[:, lo]
+            window_sum = sums[:, hi] - sums[:, lo]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if 'mean' in stats:
+                    results[window]['mean'] = flatten(window_sum / count + row_means[:, None])
+                if 'std' in stats:
+                    variance = (squares[:, hi] - squares[:, lo] - window_sum ** 2 / count) / (count - 1)
+                    variance[count < 2] = np.nan
+                    results[window]['std'] = flatten(np.sqrt(np.maximum(variance, 0.0)))
+
+    for stat, ufunc in (('min', np.fmin), ('max', np.fmax)):
+        if stat not in stats:
+            continue
+        for window, (left, right) in offsets.items():
+            window_matrix = matrix[:, pad_left - left:pad_left + width + right]
+            results[window][stat] = flatten(_sliding_extreme(window_matrix, window, ufunc))
+
+    return results
+
+class RollingStatsCache:
+    """Скользящие статистики городов с кэшем по (город, окно)
+
+    При первом промахе для города за один проход считается запрошенное окно
+    вместе с окнами ROLLING_WINDOWS; следующие промахи (новые положения
+    ползунка) считают только недостающее окно и добавляют его к уже
+    посчитанным, поэтому возврат к выбранным окнам не вызывает пересчета.
+    """
+
+    def __init__(self, values, city_slices, windows=ROLLING_WINDOWS, maxsize=ROLLING_CACHE_SIZE):
+        self.values = values
+        self.city_slices = city_slices
+        self.windows = tuple(windows)
+        self._cache = MemoryResponseCache(ttl=math.inf, maxsize=maxsize)
+        self._cities_with_windows = set()
+
+    def get(self, city_name, window):
+        """{статистика: массив} для города, выровненный по его срезу"""
+        city_stats = self._cache.get((city_name, window))
+        if city_stats is None:
+            windows = [window]
+            if city_name not in self._cities_with_windows:
+                windows += [w for w in self.windows if w != window]
+                self._cities_with_windows.add(city_name)
+            city_slice = self.city_slices.get(city_name, slice(0, 0))
+            results = rolling_window_stats(self.values[city_slice], windows=windows)
+            for w in windows:
+                self._cache.set((city_name, w), results[w])
+            city_stats = results[window]
+        return city_stats
+
+    def precompute(self, cities=None, windows=None):
+        """Расчет окон для всех (или выбранных) городов за один векторный проход"""
+        windows = self.windows if windows is None else tuple(windows)
+        cities = [
+            city_name for city_name in (self.city_slices if cities is None else cities)
+            if city_name in self.city_slices
+        ]
+        if not cities:
+            return
+        city_slices = [self.city_slices[city_name] for city_name in cities]
+        values = np.concatenate([self.values[city_slice] for city_slice in city_slices])
+        lengths = [city_slice.stop - city_slice.start for city_slice in city_slices]
+        results = rolling_window_stats(values, lengths, windows)
+
+        start = 0
+        for city_name, length in zip(cities, lengths):
+            for window in windows:
+                self._cache.set((city_name, window), {
+                    stat: series[start:start + length] for stat, series in results[window].items()
+                })
+            start += length
+        if set(self.windows) <= set(windows):
+            self._cities_with_windows.update(cities)
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Объединение одновременных одинаковых вызовов (потокобезопасный вариант)
+
+    Пока вызов по ключу выполняется, остальные потоки с тем же ключом
+    не запускают его повторно, а ждут и получают тот же результат.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Выполнение func() один раз на все одновременные вызовы с ключом key"""
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        """Число реальных вызовов и присоединившихся к ним запросов"""
+        return {'calls': self.calls, 'shared': self.shared}
+
+class AsyncSingleFlight:
+    """Объединение одновременных одинаковых корутин в рамках цикла событий
+
+    Вызов выполняется в отдельной задаче; отмена одного из ожидающих
+    не отменяет запрос для остальных.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._tasks = {}
+
+    async def do(self, key, func):
+        """Выполнение await func() один раз на все одновременные вызовы с ключом key"""
+        task = self._tasks.get(key)
+        # Задача от уже завершенного цикла событий (предыдущий asyncio.run) не подходит
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            task = None
+
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def stats(self):
+        """Число реальных вызовов и присоединившихся к ним запросов"""
+        return {'calls': self.calls, 'shared': self.shared}
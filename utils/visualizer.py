@@ -1,19 +1,40 @@
 import plotly.graph_objects as go
-import plotly.express as px
-import matplotlib.pyplot as plt
 import pandas as pd
-from config import PLOTLY_TEMPLATE, MATPLOTLIB_STYLE, SEASON_NAMES_RU
+import numpy as np
+from config import (
+    PLOTLY_TEMPLATE, MATPLOTLIB_STYLE, SEASON_NAMES_RU, PLOT_MAX_POINTS, PLOT_DOWNSAMPLING,
+    HISTOGRAM_BINS
+)
+from .distribution import box_summary, histogram_summary
+from .downsampling import downsample_timeseries
+from .instrumentation import timed
+
+def _plain_categories(df, columns):
+    """Категориальные столбцы -> обычные значения (plotly express
+    ломается на неиспользуемых категориях компактной схемы данных)"""
+    categorical = [col for col in columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    return df.astype({col: object for col in categorical})
 
 class DataVisualizer:
     """Класс для создания визуализаций"""
     
     @staticmethod
-    def plot_temperature_timeseries(city_data, show_moving_avg=True, show_anomalies=True):
-        """Построение графика временного ряда температуры"""
+    @timed()
+    def plot_temperature_timeseries(city_data, show_moving_avg=True, show_anomalies=True,
+                                    max_points=PLOT_MAX_POINTS, method=PLOT_DOWNSAMPLING,
+                                    date_range=None):
+        """
+        Построение графика временного ряда температуры
+        Ряд прореживается до max_points точек (None - без прореживания),
+        аномалии сохраняются всегда; date_range = (начало, конец) строит
+        график только за период - так при приближении возвращаются детали.
+        """
         fig = go.Figure()
         
-        # Сортируем данные по времени
-        city_data = city_data.sort_values('timestamp')
+        # Сортируем данные по времени, выбираем период и прореживаем
+        city_data = downsample_timeseries(city_data, max_points, method, date_range)
         
         # Основная температура
         fig.add_trace(go.Scatter(
@@ -62,33 +83,49 @@ class DataVisualizer:
         return fig
     
     @staticmethod
-    def plot_temperature_distribution(city_data):
-        """Гистограмма распределения температур"""
-        fig = px.histogram(
-            city_data, 
-            x='temperature',
-            nbins=50,
-            title='Распределение температур',
-            labels={'temperature': 'Температура (°C)', 'count': 'Количество дней'},
-            opacity=0.7
-        )
+    @timed()
+    def plot_histogram_summary(summary, title='Распределение температур', color=None):
+        """
+        Гистограмма из готовых счетчиков (histogram_summary): в фигуру
+        попадают только интервалы, а не все измерения
+        """
+        edges = summary['edges']
+        fig = go.Figure()
         
-        # Добавляем статистические линии
-        mean_temp = city_data['temperature'].mean()
-        std_temp = city_data['temperature'].std()
-        
-        fig.add_vline(
-            x=mean_temp, 
-            line_dash="dash", 
-            line_color="red",
-            annotation_text=f"Средняя: {mean_temp:.1f}°C",
-            annotation_position="top right"
-        )
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=summary['counts'],
+            width=np.diff(edges),
+            customdata=np.column_stack((edges[:-1], edges[1:])),
+            name='Распределение',
+            marker_color=color,
+            opacity=0.7,
+            hovertemplate='Температура: %{customdata[0]:.1f}..%{customdata[1]:.1f}°C'
+                          '<br>Количество дней: %{y}<extra></extra>'
+        ))
         
-        fig.add_vline(x=mean_temp - 2*std_temp, line_dash="dot", line_color="orange")
-        fig.add_vline(x=mean_temp + 2*std_temp, line_dash="dot", line_color="orange")
+        # Добавляем статистические линии
+        mean_temp = summary['mean']
+        std_temp = summary['std']
+        
+        if summary['count'] > 0:
+            fig.add_vline(
+                x=mean_temp, 
+                line_dash="dash", 
+                line_color="red",
+                annotation_text=f"Средняя: {mean_temp:.1f}°C",
+                annotation_position="top right"
+            )
+        
+        if summary['count'] > 1:
+            fig.add_vline(x=mean_temp - 2*std_temp, line_dash="dot", line_color="orange")
+            fig.add_vline(x=mean_temp + 2*std_temp, line_dash="dot", line_color="orange")
         
         fig.update_layout(
+            title=title,
+            xaxis_title='Температура (°C)',
+            yaxis_title='Количество дней',
+            bargap=0,
             template=PLOTLY_TEMPLATE,
             showlegend=False
         )
@@ -96,25 +133,49 @@ class DataVisualizer:
         return fig
     
     @staticmethod
-    def plot_seasonal_boxplot(city_data):
-        """Боксплот по сезонам"""
-        # Преобразуем названия сезонов на русский
-        city_data_display = city_data.copy()
-        city_data_display['season_ru'] = city_data_display['season'].map(
-            lambda x: SEASON_NAMES_RU.get(x, x)
-        )
+    @timed()
+    def plot_box_summaries(summaries, title, xaxis_title, colors=None):
+        """
+        Боксплоты из готовой статистики (box_summary) - {название: статистика}
+        Коробки строятся по квартилям и усам, выбросы - отдельными точками,
+        поэтому размер фигуры не зависит от числа измерений.
+        """
+        if colors is None:
+            import plotly.express as px
+            colors = px.colors.qualitative.Plotly
+        fig = go.Figure()
         
-        fig = px.box(
-            city_data_display,
-            x='season_ru',
-            y='temperature',
-            color='season_ru',
-            title='Распределение температур по сезонам',
-            labels={'season_ru': 'Сезон', 'temperature': 'Температура (°C)'},
-            category_orders={'season_ru': ['Зима', 'Весна', 'Лето', 'Осень']}
-        )
+        for i, (name, summary) in enumerate(summaries.items()):
+            if summary is None:
+                continue
+            color = colors[i % len(colors)]
+            fig.add_trace(go.Box(
+                x=[name],
+                q1=[summary['q1']],
+                median=[summary['median']],
+                q3=[summary['q3']],
+                lowerfence=[summary['lowerfence']],
+                upperfence=[summary['upperfence']],
+                mean=[summary['mean']],
+                sd=[summary['sd']],
+                boxmean=True,  # Показываем среднее значение
+                name=name,
+                marker_color=color
+            ))
+            if len(summary['outliers']) > 0:
+                fig.add_trace(go.Scatter(
+                    x=[name] * len(summary['outliers']),
+                    y=summary['outliers'],
+                    mode='markers',
+                    name=name,
+                    marker=dict(color=color, size=4),
+                    hovertemplate='%{x}<br>Выброс: %{y:.1f}°C<extra></extra>'
+                ))
         
         fig.update_layout(
+            title=title,
+            yaxis_title='Температура (°C)',
+            xaxis_title=xaxis_title,
             template=PLOTLY_TEMPLATE,
             showlegend=False
         )
@@ -122,6 +183,27 @@ class DataVisualizer:
         return fig
     
     @staticmethod
+    @timed()
+    def plot_temperature_distribution(city_data, bins=HISTOGRAM_BINS):
+        """Гистограмма распределения температур"""
+        return DataVisualizer.plot_histogram_summary(histogram_summary(city_data['temperature'], bins))
+    
+    @staticmethod
+    @timed()
+    def plot_seasonal_boxplot(city_data):
+        """Боксплот по сезонам"""
+        season_values = city_data['season'].to_numpy()
+        temperature = city_data['temperature'].to_numpy()
+        summaries = {
+            SEASON_NAMES_RU[season]: box_summary(temperature[season_values == season])
+            for season in ['winter', 'spring', 'summer', 'autumn']
+        }
+        return DataVisualizer.plot_box_summaries(
+            summaries, 'Распределение температур по сезонам', 'Сезон'
+        )
+    
+    @staticmethod
+    @timed()
     def plot_seasonal_profile(seasonal_stats, city_name):
         """Профиль средних температур по сезонам"""
         seasons = ['winter', 'spring', 'summer', 'autumn']
@@ -161,25 +243,19 @@ class DataVisualizer:
         return fig
     
     @staticmethod
+    @timed()
     def plot_city_comparison(compare_data):
         """Сравнение нескольких городов"""
-        fig = px.box(
-            compare_data,
-            x='city',
-            y='temperature',
-            color='city',
-            title='Сравнение распределения температур',
-            labels={'city': 'Город', 'temperature': 'Температура (°C)'}
+        summaries = {
+            city: box_summary(temperature)
+            for city, temperature in compare_data.groupby('city', observed=True, sort=False)['temperature']
+        }
+        return DataVisualizer.plot_box_summaries(
+            summaries, 'Сравнение распределения температур', 'Город'
         )
-        
-        fig.update_layout(
-            template=PLOTLY_TEMPLATE,
-            showlegend=False
-        )
-        
-        return fig
     
     @staticmethod
+    @timed()
     def plot_monthly_averages(compare_data):
         """Средние температуры по месяцам для нескольких городов"""
         if not pd.api.types.is_datetime64_any_dtype(compare_data['timestamp']):
@@ -187,8 +263,10 @@ class DataVisualizer:
             compare_data['timestamp'] = pd.to_datetime(compare_data['timestamp'])
         
         compare_data['month'] = compare_data['timestamp'].dt.month
-        monthly_avg = compare_data.groupby(['city', 'month'])['temperature'].mean().reset_index()
+        monthly_avg = compare_data.groupby(['city', 'month'], observed=True)['temperature'].mean().reset_index()
+        monthly_avg = _plain_categories(monthly_avg, ['city'])
         
+        import plotly.express as px
         fig = px.line(
             monthly_avg,
             x='month',
@@ -209,8 +287,11 @@ class DataVisualizer:
         return fig
     
     @staticmethod
+    @timed()
     def plot_current_temp_comparison(current_analysis, city_name, season):
         """Сравнение текущей температуры с историческими данными (matplotlib)"""
+        # matplotlib загружается только для этого графика
+        import matplotlib.pyplot as plt
         plt.style.use(MATPLOTLIB_STYLE)
         
         fig, ax = plt.subplots(figsize=(10, 4))